@@ -0,0 +1,168 @@
+"""Benchmark concurrent /code_interpreter calls.
+
+Runs N concurrent requests against the FastAPI app with a fake
+AIProjectClient whose agent calls block for a fixed latency, once with the
+SDK calls executed inline on the event loop (the previous behaviour) and once
+through the BlockingExecutor. With the executor the wall time should stay
+close to a single request instead of growing linearly with N.
+
+Usage:
+    poetry run python benchmarks/bench_code_interpreter_concurrency.py \
+        --concurrency 1 4 16 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+from types import SimpleNamespace
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+)
+
+os.environ.setdefault("PROJECT_CONNECTION_STRING", "localhost;sub;rg;project")
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp())
+os.environ.setdefault("RESULT_CACHE_DIR", tempfile.mkdtemp())
+os.environ.setdefault("ARTIFACT_DIR", tempfile.mkdtemp())
+
+import httpx
+from dependency_injector import providers
+
+from startup import create_app
+from utils.executor import BlockingExecutor
+
+
+class InlineExecutor(BlockingExecutor):
+    """Runs calls directly on the event loop, like the synchronous pipeline."""
+
+    async def run(self, func, *args, **kwargs):
+        return func(*args, **kwargs)
+
+
+class FakeMessages:
+    def __init__(self):
+        self.image_contents = [
+            SimpleNamespace(
+                image_file=SimpleNamespace(file_id=f"img-{uuid.uuid4()}")
+            )
+        ]
+
+    def get_last_text_message_by_role(self, role):
+        return None
+
+
+class FakeAgents:
+    """Stand-in for AIProjectClient.agents with a blocking latency per call."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def _call(self, **attrs):
+        time.sleep(self.latency)
+        return SimpleNamespace(**attrs)
+
+    def upload_file_and_poll(self, **kwargs):
+        return self._call(id="file-1")
+
+    def create_agent(self, **kwargs):
+        return self._call(id="asst-1")
+
+    def create_thread(self, **kwargs):
+        return self._call(id="thread-1")
+
+    def create_message(self, **kwargs):
+        return self._call(id="msg-1")
+
+    def create_and_process_run(self, **kwargs):
+        return self._call(status="completed", last_error=None)
+
+    def delete_file(self, file_id):
+        self._call()
+
+    def list_messages(self, **kwargs):
+        time.sleep(self.latency)
+        return FakeMessages()
+
+    def get_file_content(self, file_id):
+        time.sleep(self.latency)
+        return iter([b"\x89PNG fake"])
+
+
+async def measure_loop_lag(stop: asyncio.Event, samples: list):
+    """Record how late a 10ms heartbeat wakes up while requests run."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        samples.append(time.perf_counter() - started - 0.01)
+
+
+async def run_load(app, concurrency: int) -> tuple:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+
+        async def one(i: int):
+            # Unique messages keep the result cache and coalescing out of the
+            # way.
+            response = await client.post(
+                "/code_interpreter",
+                files={"file": (f"bench-{i}.csv", b"a,b\n1,2\n", "text/csv")},
+                data={"message": f"plot a against b ({uuid.uuid4()})"},
+            )
+            response.raise_for_status()
+
+        stop = asyncio.Event()
+        lag_samples: list = []
+        heartbeat = asyncio.create_task(measure_loop_lag(stop, lag_samples))
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await heartbeat
+    return elapsed, max(lag_samples, default=0.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--concurrency", type=int, nargs="+", default=[1, 4, 16]
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.05,
+        help="seconds each fake SDK call blocks",
+    )
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp())
+    app = create_app()
+    app.container.project_client.override(
+        providers.Object(SimpleNamespace(agents=FakeAgents(args.latency)))
+    )
+
+    print(
+        f"{'mode':<10}{'N':>5}{'wall s':>10}{'per req s':>12}{'max lag s':>12}"
+    )
+    for mode, executor in (
+        ("inline", InlineExecutor()),
+        ("executor", BlockingExecutor()),
+    ):
+        app.container.blocking_executor.override(providers.Object(executor))
+        for concurrency in args.concurrency:
+            elapsed, lag = asyncio.run(run_load(app, concurrency))
+            print(
+                f"{mode:<10}{concurrency:>5}{elapsed:>10.3f}"
+                f"{elapsed / concurrency:>12.3f}{lag:>12.3f}"
+            )
+        executor.shutdown()
+        app.container.blocking_executor.reset_override()
+
+
+if __name__ == "__main__":
+    main()
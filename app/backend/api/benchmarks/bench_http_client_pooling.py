@@ -0,0 +1,129 @@
+"""Benchmark per-call latency with and without pooled HTTP connections.
+
+Starts a local keep-alive HTTP server that answers like Ollama's
+/api/generate and calls it sequentially three ways:
+
+    requests       module-level requests.post (new connection per call)
+    httpx-new      a fresh httpx.AsyncClient per call
+    pooled         the shared client from HttpClientManager
+
+The difference between the first and last rows is the connection setup cost
+saved per call. Against a remote TLS endpoint the saving is larger.
+
+Usage:
+    poetry run python benchmarks/bench_http_client_pooling.py --calls 500
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+)
+
+import httpx
+import requests
+
+from utils.http_client import HttpClientManager
+
+RESPONSE = json.dumps(
+    {"model": "phi3", "response": "hello", "done": True}
+).encode()
+
+
+class GenerateHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Like uvicorn, avoid Nagle delays on the split header/body writes.
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(RESPONSE)))
+        self.end_headers()
+        self.wfile.write(RESPONSE)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), GenerateHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def summarize(name: str, samples: list, baseline: float = None):
+    mean = statistics.mean(samples) * 1000
+    p50 = statistics.median(samples) * 1000
+    p99 = statistics.quantiles(samples, n=100)[98] * 1000
+    saved = "" if baseline is None else f"{baseline - mean:>10.3f}"
+    print(f"{name:<12}{mean:>10.3f}{p50:>10.3f}{p99:>10.3f}{saved}")
+    return mean
+
+
+async def time_calls(calls: int, call) -> list:
+    samples = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        await call()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+async def run(url: str, calls: int) -> dict:
+    payload = {"model": "phi3", "prompt": "hi", "stream": False}
+
+    async def with_requests():
+        requests.post(url, json=payload).json()
+
+    async def with_new_client():
+        async with httpx.AsyncClient() as client:
+            (await client.post(url, json=payload)).json()
+
+    manager = HttpClientManager()
+
+    async def with_pool():
+        (await manager.get("sidecar").post(url, json=payload)).json()
+
+    results = {}
+    for name, call in (
+        ("requests", with_requests),
+        ("httpx-new", with_new_client),
+        ("pooled", with_pool),
+    ):
+        await call()  # warm up
+        results[name] = await time_calls(calls, call)
+    await manager.aclose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=500)
+    args = parser.parse_args()
+
+    server = start_server()
+    url = f"http://127.0.0.1:{server.server_address[1]}/api/generate"
+    results = asyncio.run(run(url, args.calls))
+    server.shutdown()
+
+    print(
+        f"{'client':<12}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}"
+        f"{'saved ms':>10}"
+    )
+    baseline = summarize("requests", results["requests"])
+    summarize("httpx-new", results["httpx-new"], baseline)
+    summarize("pooled", results["pooled"], baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,528 @@
+"""Load-test the API endpoints against local stand-ins for every downstream.
+
+Starts the FastAPI app under uvicorn in a child process and drives it over
+HTTP with a fixed number of concurrent clients per endpoint. Downstream
+services are replaced by local fakes with configurable latency:
+
+    agents API         an in-process fake AIProjectClient whose calls block
+                       for --agents-latency (the SDK refuses bearer tokens
+                       over plain HTTP, so it cannot be pointed at a server)
+    Dynamic Sessions   an HTTP server for /files/upload and /code/execute
+    Ollama             an HTTP server for /api/generate, streaming or not
+
+For each endpoint it reports requests/sec, p50/p95/p99 latency and the peak
+RSS of the app process, and writes the results as JSON so runs can be
+compared across versions.
+
+Usage:
+    poetry run python benchmarks/bench_load.py \
+        --endpoints code_interpreter slm --concurrency 16 --requests 400 \
+        --output benchmarks/results/load.json
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+CSV = (
+    b"name,sector,operating_profit\n"
+    b"A,Transport,\"1,057\"\n"
+    b"B,Energy,\"2,310\"\n"
+)
+
+
+# --- Fake downstream HTTP servers --------------------------------------------
+
+
+class FakeDownstreamHandler(BaseHTTPRequestHandler):
+    """Answers like the Dynamic Sessions pool management API and Ollama."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    latencies: Dict[str, float] = {}
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        path = self.path.split("?")[0]
+        if path.endswith("/files/upload"):
+            self._reply(
+                self.latencies["ds"],
+                {"value": [{"properties": {"filename": "upload"}}]},
+            )
+        elif path.endswith("/code/execute"):
+            self._reply(
+                self.latencies["ds"],
+                {
+                    "properties": {
+                        "status": "Success",
+                        "stdout": "",
+                        "stderr": "",
+                    }
+                },
+            )
+        elif path == "/api/generate":
+            self._generate(json.loads(body or b"{}"))
+        else:
+            self.send_error(404)
+
+    def _generate(self, payload: dict):
+        latency = self.latencies["slm"]
+        if not payload.get("stream"):
+            self._reply(
+                latency,
+                {
+                    "model": payload.get("model"),
+                    "response": "hello world",
+                    "done": True,
+                },
+            )
+            return
+        tokens = ["hello", " world"]
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for token in tokens:
+            time.sleep(latency / len(tokens))
+            self._chunk(
+                json.dumps({"response": token, "done": False}).encode() + b"\n"
+            )
+        self._chunk(
+            json.dumps(
+                {"response": "", "done": True, "eval_count": len(tokens)}
+            ).encode()
+            + b"\n"
+        )
+        self._chunk(b"")
+
+    def _reply(self, latency: float, data: dict):
+        time.sleep(latency)
+        body = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_downstream(
+    ds_latency: float, slm_latency: float
+) -> ThreadingHTTPServer:
+    handler = type(
+        "Handler",
+        (FakeDownstreamHandler,),
+        {"latencies": {"ds": ds_latency, "slm": slm_latency}},
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# --- Fake agents API, used inside the app process ----------------------------
+
+
+class FakeMessages:
+    def __init__(self):
+        self.image_contents = [
+            SimpleNamespace(
+                image_file=SimpleNamespace(file_id=f"img-{uuid.uuid4()}")
+            )
+        ]
+
+    def get_last_text_message_by_role(self, role):
+        code = (
+            "import pandas as pd\n"
+            "df = pd.read_csv('/mnt/data/assistant-abc')\n"
+            "print(df.head())"
+        )
+        return SimpleNamespace(text=SimpleNamespace(value=code))
+
+
+class FakeAgents:
+    """Stand-in for AIProjectClient.agents with a blocking latency per call."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def _call(self, **attrs):
+        time.sleep(self.latency)
+        return SimpleNamespace(**attrs)
+
+    def upload_file_and_poll(self, **kwargs):
+        return self._call(id=f"file-{uuid.uuid4()}")
+
+    def create_agent(self, **kwargs):
+        return self._call(id=f"asst-{uuid.uuid4()}")
+
+    def create_thread(self, **kwargs):
+        return self._call(id=f"thread-{uuid.uuid4()}")
+
+    def create_message(self, **kwargs):
+        return self._call(id="msg-1")
+
+    def create_and_process_run(self, **kwargs):
+        return self._call(status="completed", last_error=None)
+
+    def list_messages(self, **kwargs):
+        time.sleep(self.latency)
+        return FakeMessages()
+
+    def get_file_content(self, file_id):
+        time.sleep(self.latency)
+        return iter([b"\x89PNG fake"])
+
+    def delete_agent(self, agent_id):
+        self._call()
+
+    def delete_thread(self, thread_id):
+        self._call()
+
+    def delete_file(self, file_id):
+        self._call()
+
+
+class FakeCredential:
+    def get_token(self, *scopes, **kwargs):
+        return SimpleNamespace(
+            token="fake-token", expires_on=int(time.time()) + 3600
+        )
+
+
+def serve(port: int, agents_latency: float, env: Dict[str, str]):
+    """Run the app with fake downstreams; the target of the app process."""
+    os.environ.update(env)
+    sys.path.append(SRC_DIR)
+    os.chdir(tempfile.mkdtemp())
+
+    import logging
+    import uvicorn
+    from dependency_injector import providers
+    from startup import create_app
+
+    app = create_app()
+    logging.getLogger().setLevel(logging.WARNING)
+    app.container.project_client.override(
+        providers.Object(SimpleNamespace(agents=FakeAgents(agents_latency)))
+    )
+    app.container.credential.override(providers.Object(FakeCredential()))
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+# --- Load generation
+# ----------------------------------------------------------
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def read_rss_bytes(pid: int) -> Optional[int]:
+    """Return the resident set size of pid, or None without /proc."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+class RssSampler:
+    """Tracks the peak RSS of a process while a load phase runs."""
+
+    def __init__(self, pid: int, interval: float = 0.02):
+        self.pid = pid
+        self.interval = interval
+        self.peak: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            rss = read_rss_bytes(self.pid)
+            if rss is not None:
+                self.peak = max(self.peak or 0, rss)
+            if self._stop.wait(self.interval):
+                break
+
+
+def build_requests(
+    cacheable: bool,
+) -> Dict[str, Callable[[httpx.AsyncClient, int], "asyncio.Future"]]:
+    def message(i: int) -> str:
+        base = "アップロードされたCSVファイルから、運輸セクターの営業利益の棒グラフを作成してください。"
+        # Unique messages keep the result caches and coalescing out of the way.
+        return base if cacheable else f"{base} ({uuid.uuid4()})"
+
+    def upload(path: str):
+        def send(client: httpx.AsyncClient, i: int):
+            return client.post(
+                path,
+                files={"file": (f"load-{i}.csv", CSV, "text/csv")},
+                data={"message": message(i)},
+            )
+
+        return send
+
+    def slm(client: httpx.AsyncClient, i: int):
+        return client.post("/slm", json={"prompt": message(i)})
+
+    async def slm_stream(client: httpx.AsyncClient, i: int):
+        async with client.stream(
+            "POST", "/slm/stream", json={"prompt": message(i)}
+        ) as response:
+            async for _ in response.aiter_bytes():
+                pass
+            return response
+
+    return {
+        "code_interpreter": upload("/code_interpreter"),
+        "dynamic_sessions": upload("/dynamic_sessions"),
+        "slm": slm,
+        "slm_stream": slm_stream,
+    }
+
+
+def percentile(samples: List[float], q: int) -> float:
+    if len(samples) < 2:
+        return samples[0] if samples else 0.0
+    return statistics.quantiles(samples, n=100, method="inclusive")[q - 1]
+
+
+async def drive(base_url: str, send, requests: int, concurrency: int) -> dict:
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(requests))
+    limits = httpx.Limits(
+        max_connections=concurrency, max_keepalive_connections=concurrency
+    )
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=300
+    ) as client:
+
+        async def worker():
+            nonlocal errors
+            for i in counter:
+                started = time.perf_counter()
+                try:
+                    response = await send(client, i)
+                    ok = response.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                latencies.append(time.perf_counter() - started)
+                errors += not ok
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "duration_seconds": elapsed,
+        "requests_per_second": requests / elapsed if elapsed else 0.0,
+        "latency_seconds": {
+            "mean": statistics.mean(latencies) if latencies else 0.0,
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": max(latencies, default=0.0),
+        },
+    }
+
+
+def wait_until_ready(
+    base_url: str, process: multiprocessing.Process, timeout: float = 60
+):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if not process.is_alive():
+            raise RuntimeError("App process exited during startup")
+        try:
+            if httpx.get(f"{base_url}/metrics", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise TimeoutError("App did not become ready")
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--endpoints",
+        nargs="+",
+        default=["code_interpreter", "dynamic_sessions", "slm", "slm_stream"],
+    )
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument(
+        "--requests", type=int, default=200, help="requests per endpoint"
+    )
+    parser.add_argument(
+        "--warmup",
+        type=int,
+        default=4,
+        help="unmeasured requests per endpoint",
+    )
+    parser.add_argument(
+        "--agents-latency",
+        type=float,
+        default=0.05,
+        help="seconds per fake agents API call",
+    )
+    parser.add_argument(
+        "--ds-latency",
+        type=float,
+        default=0.05,
+        help="seconds per fake Dynamic Sessions call",
+    )
+    parser.add_argument(
+        "--slm-latency",
+        type=float,
+        default=0.1,
+        help="seconds per fake Ollama generation",
+    )
+    parser.add_argument(
+        "--cacheable",
+        action="store_true",
+        help="repeat identical payloads so caches can hit",
+    )
+    parser.add_argument("--tracing-profile", default="off")
+    parser.add_argument(
+        "--output",
+        default=None,
+        help="JSON results file, default: benchmarks/results/load-<time>.json",
+    )
+    args = parser.parse_args()
+
+    downstream = start_downstream(args.ds_latency, args.slm_latency)
+    downstream_url = f"http://127.0.0.1:{downstream.server_address[1]}"
+    port = free_port()
+    env = {
+        "PROJECT_CONNECTION_STRING": "localhost;sub;rg;project",
+        "DATA_DIR": tempfile.mkdtemp(),
+        "RESULT_CACHE_DIR": tempfile.mkdtemp(),
+        "ARTIFACT_DIR": tempfile.mkdtemp(),
+        "SIDECAR_SLM_URL": f"{downstream_url}/api/generate",
+        "ACA_DYNAMICSESSIONS_POOL_ENDPOINT": f"{downstream_url}/pool",
+        "TRACING_PROFILE": args.tracing_profile,
+    }
+    context = multiprocessing.get_context("spawn")
+    process = context.Process(
+        target=serve, args=(port, args.agents_latency, env), daemon=True
+    )
+    process.start()
+    base_url = f"http://127.0.0.1:{port}"
+    requests = build_requests(args.cacheable)
+    results = {}
+    try:
+        wait_until_ready(base_url, process)
+        for name in args.endpoints:
+            send = requests[name]
+            asyncio.run(
+                drive(
+                    base_url,
+                    send,
+                    args.warmup,
+                    min(args.warmup, args.concurrency) or 1,
+                )
+            )
+            with RssSampler(process.pid) as rss:
+                results[name] = asyncio.run(
+                    drive(base_url, send, args.requests, args.concurrency)
+                )
+            results[name]["peak_rss_bytes"] = rss.peak
+    finally:
+        process.terminate()
+        process.join()
+        downstream.shutdown()
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": vars(args),
+        "load_generator_max_rss_kb": resource.getrusage(
+            resource.RUSAGE_SELF
+        ).ru_maxrss,
+        "endpoints": results,
+    }
+    output = args.output or os.path.join(
+        os.path.dirname(__file__),
+        "results",
+        f"load-{datetime.now():%Y%m%d-%H%M%S}.json",
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    print(
+        f"{'endpoint':<18}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}"
+        f"{'p99 ms':>10}{'errors':>8}{'peak RSS MB':>13}"
+    )
+    for name, result in results.items():
+        latency = result["latency_seconds"]
+        rss = result["peak_rss_bytes"]
+        print(
+            f"{name:<18}{result['requests_per_second']:>9.1f}"
+            f"{latency['p50'] * 1000:>10.1f}"
+            f"{latency['p95'] * 1000:>10.1f}{latency['p99'] * 1000:>10.1f}"
+            f"{result['errors']:>8}"
+            f"{(rss / 2 ** 20 if rss else float('nan')):>13.1f}"
+        )
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
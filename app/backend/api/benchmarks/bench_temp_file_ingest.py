@@ -0,0 +1,126 @@
+"""Benchmark peak RSS of FileRepository temp-file ingestion.
+
+Each (mode, size) pair runs in a fresh subprocess so ru_maxrss reflects only
+that ingestion. "read_all" is the previous implementation that read the
+whole upload into memory; "streaming" is FileRepository.stream_temp_file.
+The streaming delta should stay around one chunk for every size.
+
+Usage:
+    poetry run python benchmarks/bench_temp_file_ingest.py --sizes 16 64 256
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+)
+
+MIB = 1024 * 1024
+
+
+def peak_rss_mib() -> float:
+    # ru_maxrss is reported in KiB on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def read_all(file, destination: str) -> str:
+    import aiofiles
+
+    file_location = os.path.join(destination, file.filename)
+    async with aiofiles.open(file_location, "wb") as f:
+        await f.write(await file.read())
+    return file_location
+
+
+def worker(mode: str, source: str, chunk_size: int) -> dict:
+    from fastapi import UploadFile
+
+    from repositories.file_repository import FileRepository
+
+    repository = FileRepository(chunk_size=chunk_size, max_upload_bytes=2**62)
+    destination = tempfile.mkdtemp()
+    with open(source, "rb") as f:
+        upload = UploadFile(f, filename="upload.bin")
+        baseline = peak_rss_mib()
+        started = time.perf_counter()
+        if mode == "streaming":
+            location = asyncio.run(
+                repository.stream_temp_file(upload, destination)
+            ).path
+        else:
+            location = asyncio.run(read_all(upload, destination))
+        elapsed = time.perf_counter() - started
+    os.remove(location)
+    return {
+        "baseline_mib": baseline,
+        "peak_mib": peak_rss_mib(),
+        "seconds": elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[16, 64, 256],
+        help="upload sizes in MiB",
+    )
+    parser.add_argument("--chunk-size", type=int, default=MIB)
+    parser.add_argument(
+        "--worker", nargs=2, metavar=("MODE", "SOURCE"), help=argparse.SUPPRESS
+    )
+    args = parser.parse_args()
+
+    if args.worker:
+        print(
+            json.dumps(worker(args.worker[0], args.worker[1], args.chunk_size))
+        )
+        return
+
+    print(
+        f"{'mode':<10}{'MiB':>6}{'peak RSS MiB':>14}{'delta MiB':>11}"
+        f"{'MiB/s':>9}"
+    )
+    for size in args.sizes:
+        with tempfile.NamedTemporaryFile(delete=False) as source:
+            for _ in range(size):
+                source.write(os.urandom(MIB))
+        try:
+            for mode in ("read_all", "streaming"):
+                output = subprocess.run(
+                    [
+                        sys.executable,
+                        __file__,
+                        "--chunk-size",
+                        str(args.chunk_size),
+                        "--worker",
+                        mode,
+                        source.name,
+                    ],
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                ).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                delta = result["peak_mib"] - result["baseline_mib"]
+                print(
+                    f"{mode:<10}{size:>6}{result['peak_mib']:>14.1f}"
+                    f"{delta:>11.1f}"
+                    f"{size / result['seconds']:>9.0f}"
+                )
+        finally:
+            os.remove(source.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Benchmark the per-request cost of each tracing profile.
+
+Simulates the spans one code interpreter request records (a root span with
+nested children and a few attributes each) and times it under:
+
+    none       the OpenTelemetry no-op tracer
+    off        TRACING_PROFILE=off
+    sampled    TRACING_PROFILE=sampled
+    full       TRACING_PROFILE=full
+
+By default spans are exported to a port nothing listens on, which is what
+happens when the local collector on localhost:4318 is down; pass
+--endpoint to export to a running collector instead.
+
+Usage:
+    poetry run python benchmarks/bench_tracing_overhead.py --requests 20000
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import sys
+import time
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+)
+
+from opentelemetry import trace
+from opentelemetry.sdk.resources import SERVICE_NAME, Resource
+from opentelemetry.sdk.trace import TracerProvider
+
+from tracing.profiles import PROFILES
+from tracing.tracing import create_tracer_provider
+
+SPAN_NAMES = [
+    "store_upload",
+    "create_thread",
+    "create_message",
+    "create_and_process_run",
+    "list_messages",
+    "download_generated_images",
+    "delete_uploaded_file",
+]
+
+
+def closed_port_endpoint() -> str:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    return f"http://127.0.0.1:{port}"
+
+
+def simulate_request(tracer: trace.Tracer):
+    with tracer.start_as_current_span("process_file_and_message") as root:
+        root.set_attributes(
+            {"file.name": "data.csv", "file.size": 1024, "message.length": 42}
+        )
+        for name in SPAN_NAMES:
+            with tracer.start_as_current_span(name) as span:
+                span.set_attribute("stage", name)
+
+
+def time_requests(tracer: trace.Tracer, requests: int) -> list:
+    samples = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        simulate_request(tracer)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def summarize(
+    name: str, samples: list, baseline: float = None, dropped: str = ""
+):
+    mean = statistics.mean(samples) * 1_000_000
+    p50 = statistics.median(samples) * 1_000_000
+    p99 = statistics.quantiles(samples, n=100)[98] * 1_000_000
+    overhead = "" if baseline is None else f"{mean - baseline:>12.1f}"
+    print(
+        f"{name:<10}{mean:>10.1f}{p50:>10.1f}{p99:>10.1f}"
+        f"{overhead:>12}{dropped:>10}"
+    )
+    return mean
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument(
+        "--endpoint",
+        default=None,
+        help="OTLP endpoint, default: a closed local port",
+    )
+    args = parser.parse_args()
+    endpoint = args.endpoint or closed_port_endpoint()
+    resource = Resource(attributes={SERVICE_NAME: "bench-tracing"})
+
+    print(
+        f"{'profile':<10}{'mean us':>10}{'p50 us':>10}{'p99 us':>10}"
+        f"{'overhead us':>12}{'dropped':>10}"
+    )
+    noop = trace.NoOpTracerProvider().get_tracer(__name__)
+    time_requests(noop, 100)  # warm up
+    baseline = summarize("none", time_requests(noop, args.requests))
+
+    for name, profile in PROFILES.items():
+        provider = create_tracer_provider(profile, resource, endpoint=endpoint)
+        tracer = provider.get_tracer(__name__)
+        time_requests(tracer, 100)
+        samples = time_requests(tracer, args.requests)
+        dropped = ""
+        if isinstance(provider, TracerProvider):
+            provider.shutdown()
+            processors = provider._active_span_processor._span_processors
+            dropped = str(
+                sum(getattr(p.span_exporter, "dropped", 0) for p in processors)
+            )
+        summarize(name, samples, baseline, dropped)
+
+
+if __name__ == "__main__":
+    main()
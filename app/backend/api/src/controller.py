@@ -1,34 +1,34 @@
+import json
 import logging
 import os
-import re
-import requests
-import uuid
-from pathlib import Path
+import time
+from typing import List, Optional
 
 from fastapi import (
     APIRouter, Depends, File, Form, HTTPException, UploadFile
 )
-from fastapi.responses import FileResponse
-from traceloop.sdk.decorators import workflow
+from fastapi.responses import (
+    FileResponse, PlainTextResponse, StreamingResponse
+)
+from opentelemetry import trace
+from starlette.background import BackgroundTask
 
 from di.containers import Container
 from models.prompt_request import PromptRequest
+from repositories.file_repository import FileTooLargeError
 from services.dynamic_sessions_service import DynamicSessionsService
 from services.sidecar_service import SidecarService
 from services.code_interpreter_service import CodeInterpreterService
 from services.file_upload_service import FileUploadService
-from tracing.tracing import tracer
+from services.job_queue import JobStatus, QueueFullError
+from services.job_service import CODE_INTERPRETER_JOB, JobService
+from tracing.metrics import render_prometheus
+from tracing.tracing import local_metric_reader, tracer, workflow
 from dependency_injector.wiring import inject, Provide
 
-from azure.identity import DefaultAzureCredential
-
 router = APIRouter()
 
 
-DATA_DIR = Path(os.getenv("DATA_DIR", "/data"))
-FILE_DIR = Path(os.getenv("FILE_DIR", "/files"))
-
-
 @router.post("/data")
 @inject
 async def upload_data(
@@ -40,7 +40,9 @@ async def upload_data(
     """Upload a file to the data directory."""
     try:
         with tracer.start_as_current_span("upload_data"):
-            filename = file_upload_service.upload_file(file, "data")
+            filename = await file_upload_service.upload_file_async(
+                file, "data"
+            )
             return {"filename": filename}
     except Exception as e:
         logging.error(e)
@@ -58,12 +60,14 @@ async def upload_files(
     """Upload a file to the data directory."""
     try:
         with tracer.start_as_current_span("upload_files"):
-            filename = file_upload_service.upload_file(file, "files")
+            filename = await file_upload_service.upload_file_async(
+                file, "files"
+            )
             return {"filename": filename}
     except Exception as e:
         logging.error(e)
         raise HTTPException(status_code=500, detail="Failed to upload file")
-        
+
 
 @router.post("/code_interpreter")
 @workflow(name="post_code_interpreter")
@@ -80,19 +84,117 @@ async def post_code_interpreter(
         file_name = await code_interpreter_service.process_file_and_message(
             file, user_message
         )
-        return FileResponse(path=file_name, filename=file_name)
+        return FileResponse(
+            path=file_name, filename=os.path.basename(file_name)
+        )
+    except FileTooLargeError as e:
+        logging.error(e)
+        raise HTTPException(status_code=413, detail="File too large")
+    except Exception as e:
+        logging.error(e)
+        raise HTTPException(status_code=500, detail="Failed to interpret code")
+
+
+@router.post("/code_interpreter/batch")
+@inject
+async def post_code_interpreter_batch(
+    file: UploadFile = File(...),
+    messages: List[str] = Form(...),
+    independent: bool = Form(True),
+    code_interpreter_service: CodeInterpreterService = Depends(
+        Provide[Container.code_interpreter_service]
+    ),
+):
+    """Run several messages against one file and return a zip of results."""
+    try:
+        archive_path = await code_interpreter_service.process_batch(
+            file, messages, independent
+        )
+        return FileResponse(
+            path=archive_path,
+            filename="results.zip",
+            media_type="application/zip",
+            background=BackgroundTask(os.remove, archive_path),
+        )
+    except FileTooLargeError as e:
+        logging.error(e)
+        raise HTTPException(status_code=413, detail="File too large")
+    except Exception as e:
+        logging.error(e)
+        raise HTTPException(status_code=500, detail="Failed to interpret code")
+
+
+@router.post("/code_interpreter/stream")
+@inject
+async def post_code_interpreter_stream(
+    file: UploadFile = File(...),
+    message: str = Form(...),
+    code_interpreter_service: CodeInterpreterService = Depends(
+        Provide[Container.code_interpreter_service]
+    ),
+):
+    """Stream run progress, partial text and images as Server-Sent Events."""
+    span = tracer.start_span("post_code_interpreter_stream")
+    span.set_attribute("span_type", "HTTP")
+    started = time.perf_counter()
+    events = code_interpreter_service.stream_file_and_message(file, message)
+    try:
+        # Setup failures (upload, thread creation) still return an error
+        # status.
+        with trace.use_span(span):
+            first_event = await anext(events)
+    except FileTooLargeError as e:
+        logging.error(e)
+        span.end()
+        raise HTTPException(status_code=413, detail="File too large")
     except Exception as e:
         logging.error(e)
+        span.record_exception(e)
+        span.end()
         raise HTTPException(status_code=500, detail="Failed to interpret code")
 
+    async def event_stream():
+        with trace.use_span(span, end_on_exit=True):
+            first_delta = True
+            try:
+                event, data = first_event
+                while True:
+                    if event == "delta" and first_delta:
+                        first_delta = False
+                        span.set_attribute(
+                            "code_interpreter.time_to_first_token",
+                            time.perf_counter() - started,
+                        )
+                    payload = json.dumps(data, ensure_ascii=False)
+                    yield f"event: {event}\ndata: {payload}\n\n"
+                    event, data = await anext(events)
+            except StopAsyncIteration:
+                pass
+            except Exception as e:
+                logging.error(e)
+                span.record_exception(e)
+                payload = json.dumps({"detail": "Failed to interpret code"})
+                yield f"event: error\ndata: {payload}\n\n"
+            finally:
+                await events.aclose()
+                span.set_attribute(
+                    "code_interpreter.duration", time.perf_counter() - started
+                )
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 
 @router.post("/slm")
 @inject
-def post_slm(
+async def post_slm(
     request_data: PromptRequest,
     sidecar_service: SidecarService = Depends(
         Provide[Container.sidecar_service]
-    )
+    ),
 ):
     try:
         with tracer.start_as_current_span("post_slm") as parent:
@@ -104,21 +206,108 @@ def post_slm(
                     "gen_ai.request.model": "phi4",
                 }
             )
-            result = sidecar_service.post_slm(request_data.prompt)
+            result = await sidecar_service.post_slm(request_data.prompt)
             return result
     except Exception as e:
         logging.error(e)
         raise HTTPException(status_code=500, detail="Failed to generate text")
-    
+
+
+@router.post("/slm/stream")
+@inject
+async def post_slm_stream(
+    request_data: PromptRequest,
+    sidecar_service: SidecarService = Depends(
+        Provide[Container.sidecar_service]
+    ),
+):
+    """Stream SLM tokens to the client as Server-Sent Events."""
+    span = tracer.start_span("post_slm")
+    span.set_attributes(
+        {
+            "span_type": "GenAI",
+            "gen_ai.operation.name": "chat",
+            "gen_ai.system": "_OTHER",
+            "gen_ai.request.model": "phi4",
+            "gen_ai.response.streaming": True,
+        }
+    )
+    started = time.perf_counter()
+    chunks = sidecar_service.stream_slm(request_data.prompt)
+    try:
+        # Wait for the first chunk so upstream failures still return a 500.
+        with trace.use_span(span):
+            first_chunk = await anext(chunks)
+    except Exception as e:
+        logging.error(e)
+        span.record_exception(e)
+        span.end()
+        raise HTTPException(status_code=500, detail="Failed to generate text")
+    span.set_attribute(
+        "gen_ai.response.time_to_first_token", time.perf_counter() - started
+    )
+
+    async def event_stream():
+        tokens = 0
+        last_chunk = first_chunk
+        with trace.use_span(span, end_on_exit=True):
+            try:
+                chunk = first_chunk
+                while True:
+                    if chunk.get("response"):
+                        tokens += 1
+                    last_chunk = chunk
+                    yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+                    if chunk.get("done"):
+                        break
+                    chunk = await anext(chunks)
+            except StopAsyncIteration:
+                pass
+            except Exception as e:
+                logging.error(e)
+                span.record_exception(e)
+                payload = json.dumps({"detail": "Failed to generate text"})
+                yield f"event: error\ndata: {payload}\n\n"
+            finally:
+                await chunks.aclose()
+                elapsed = time.perf_counter() - started
+                # Prefer Ollama's own generation counters when it reports them.
+                eval_count = last_chunk.get("eval_count", tokens)
+                eval_seconds = (
+                    last_chunk.get("eval_duration", 0) / 1e9 or elapsed
+                )
+                span.set_attributes(
+                    {
+                        "gen_ai.usage.output_tokens": eval_count,
+                        "gen_ai.response.tokens_per_second": (
+                            eval_count / eval_seconds if eval_seconds else 0.0
+                        ),
+                        "gen_ai.response.duration": elapsed,
+                    }
+                )
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 
 @router.post("/dynamic_sessions")
 @inject
 async def post_dynamic_sessions(
     file: UploadFile = File(...),
     message: str = Form(...),
-    code_interpreter_service: CodeInterpreterService = Depends(Provide[Container.code_interpreter_service]),
-    dynamic_sessions_service: DynamicSessionsService = Depends(Provide[Container.dynamic_sessions_service])
+    backend: Optional[str] = Form(None),
+    code_interpreter_service: CodeInterpreterService = Depends(
+        Provide[Container.code_interpreter_service]
+    ),
+    dynamic_sessions_service: DynamicSessionsService = Depends(
+        Provide[Container.dynamic_sessions_service]
+    ),
 ):
+    # Reject an unknown or disabled backend before paying for the agent run.
+    _check_backend(backend, dynamic_sessions_service)
     try:
         with tracer.start_as_current_span("post_dynamic_sessions") as parent:
             parent.set_attributes(
@@ -130,9 +319,134 @@ async def post_dynamic_sessions(
                 }
             )
             user_message = message
-        code = await code_interpreter_service.process_message_only(file, user_message)
-        session_id = dynamic_sessions_service.process_dynamic_session(file, code)
-        return {"session_id": session_id}
+            # Spool the upload once; the project upload for code generation
+            # and the session upload then read it independently and overlap.
+            async with code_interpreter_service.stored_upload(file) as stored:
+                result = await dynamic_sessions_service.run_stored(
+                    stored,
+                    file.filename,
+                    user_message,
+                    lambda: code_interpreter_service.generate_code(
+                        stored, user_message
+                    ),
+                    backend=backend,
+                )
+        return result.to_dict()
+    except FileTooLargeError as e:
+        logging.error(e)
+        raise HTTPException(status_code=413, detail="File too large")
+    except Exception as e:
+        logging.error(e)
+        raise HTTPException(
+            status_code=500, detail="Failed to process dynamic session"
+        )
+
+
+@router.post("/jobs/code_interpreter", status_code=202)
+@inject
+async def submit_code_interpreter_job(
+    file: UploadFile = File(...),
+    message: str = Form(...),
+    job_service: JobService = Depends(Provide[Container.job_service]),
+):
+    """Queue a code interpreter run and return its job ID immediately."""
+    return await _submit_job(
+        job_service.submit_code_interpreter, file, message
+    )
+
+
+@router.post("/jobs/dynamic_sessions", status_code=202)
+@inject
+async def submit_dynamic_sessions_job(
+    file: UploadFile = File(...),
+    message: str = Form(...),
+    backend: Optional[str] = Form(None),
+    job_service: JobService = Depends(Provide[Container.job_service]),
+    dynamic_sessions_service: DynamicSessionsService = Depends(
+        Provide[Container.dynamic_sessions_service]
+    ),
+):
+    """Queue code generation and Dynamic Sessions execution as one job."""
+    _check_backend(backend, dynamic_sessions_service)
+    return await _submit_job(
+        lambda file, message: job_service.submit_dynamic_sessions(
+            file, message, backend=backend
+        ),
+        file,
+        message,
+    )
+
+
+def _check_backend(
+    backend: Optional[str], dynamic_sessions_service: DynamicSessionsService
+):
+    if backend is not None and not dynamic_sessions_service.supports(backend):
+        raise HTTPException(
+            status_code=400, detail=f"Unsupported backend: {backend}"
+        )
+
+
+async def _submit_job(submit, file: UploadFile, message: str):
+    try:
+        with tracer.start_as_current_span("submit_job") as span:
+            job = await submit(file, message)
+            span.set_attributes(
+                {"job.id": job.identifier, "job.kind": job.kind}
+            )
+            return {"job_id": job.identifier, "status": job.status.value}
+    except QueueFullError as e:
+        logging.error(e)
+        raise HTTPException(
+            status_code=429,
+            detail="Too many queued jobs",
+            headers={"Retry-After": "5"},
+        )
+    except FileTooLargeError as e:
+        logging.error(e)
+        raise HTTPException(status_code=413, detail="File too large")
     except Exception as e:
         logging.error(e)
-        raise HTTPException(status_code=500, detail="Failed to process dynamic session")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Failed to submit job")
+
+
+@router.get("/jobs/{job_id}")
+@inject
+async def get_job(
+    job_id: str,
+    job_service: JobService = Depends(Provide[Container.job_service]),
+):
+    """Return a job's status and per-stage timings in seconds."""
+    job = job_service.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
+@router.get("/jobs/{job_id}/result")
+@inject
+async def get_job_result(
+    job_id: str,
+    job_service: JobService = Depends(Provide[Container.job_service]),
+):
+    """Return a finished job's result as the synchronous endpoint would."""
+    job = job_service.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if not job.done:
+        raise HTTPException(status_code=409, detail="Job not finished")
+    if job.status == JobStatus.FAILED:
+        raise HTTPException(status_code=500, detail="Job failed")
+    if job.kind == CODE_INTERPRETER_JOB:
+        return FileResponse(
+            path=job.result, filename=os.path.basename(job.result)
+        )
+    return job.result
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Expose per-stage latency histograms and counters for Prometheus."""
+    data = local_metric_reader.get_metrics_data()
+    return PlainTextResponse(
+        render_prometheus(data), media_type="text/plain; version=0.0.4"
+    )
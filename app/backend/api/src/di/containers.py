@@ -1,15 +1,46 @@
 import os
 from pathlib import Path
-from azure.ai.projects import AIProjectClient
-from azure.identity import DefaultAzureCredential
 from dependency_injector import containers, providers
 from repositories.dynamic_sessions_repository import DynamicSessionsRepository
 from repositories.file_repository import FileRepository
 from repositories.message_repository import MessageRepository
+from services.agent_pool import AgentPool
 from services.code_interpreter_service import CodeInterpreterService
+from services.csv_ingest import CsvIngestor
+from services.dynamic_sessions_pool import DynamicSessionsPool
 from services.dynamic_sessions_service import DynamicSessionsService
 from services.file_upload_service import FileUploadService
+from services.generated_code_cache import GeneratedCodeCache
+from services.job_queue import JobQueue
+from services.job_service import JobService
+from services.local_interpreter_pool import LocalInterpreterPool
+from services.project_file_cache import ProjectFileCache
+from services.remote_object_reaper import RemoteObjectReaper
 from services.sidecar_service import SidecarService
+from utils.cache import TTLCache
+from utils.disk_cache import DiskCache
+from utils.executor import BlockingExecutor
+from utils.http_client import HttpClientManager
+from utils.single_flight import SingleFlight
+from utils.temp_storage import TempStorage
+from utils.token_cache import AccessTokenCache
+
+
+def default_credential():
+    # azure.identity is imported on first use to keep startup fast.
+    from azure.identity import DefaultAzureCredential
+
+    return DefaultAzureCredential()
+
+
+def project_client_from_connection_string(conn_str: str, credential):
+    # azure.ai.projects is slow to import as well.
+    from azure.ai.projects import AIProjectClient
+
+    return AIProjectClient.from_connection_string(
+        conn_str=conn_str, credential=credential
+    )
+
 
 class Container(containers.DeclarativeContainer):
 
@@ -19,39 +50,116 @@ class Container(containers.DeclarativeContainer):
 
     base_dir = providers.Singleton(Path, "/")
 
-    ai_project_info = os.getenv("PROJECT_CONNECTION_STRING", "")
-    endpoint, subscription_id, resource_group_name, project_name = ai_project_info.split(';')
+    credential = providers.Singleton(default_credential)
 
+    # The connection string is read when the client is first needed, not at
+    # import.
     project_client = providers.Singleton(
-        AIProjectClient,
-        endpoint=f"https://{endpoint}",
-        subscription_id=subscription_id,
-        resource_group_name=resource_group_name,
-        project_name=project_name,
-        credential=DefaultAzureCredential()
+        project_client_from_connection_string,
+        conn_str=providers.Callable(
+            os.getenv, "PROJECT_CONNECTION_STRING", ""
+        ),
+        credential=credential,
     )
 
-    file_repository = providers.Factory(FileRepository)
-    
+    blocking_executor = providers.Singleton(BlockingExecutor)
+
+    temp_storage = providers.Singleton(TempStorage)
+
+    file_repository = providers.Factory(FileRepository, storage=temp_storage)
+
     message_repository = providers.Factory(
         MessageRepository,
         project_client=project_client
     )
 
+    agent_pool = providers.Singleton(AgentPool, project_client=project_client)
+
+    project_file_cache = providers.Singleton(
+        ProjectFileCache,
+        project_client=project_client,
+        executor=blocking_executor,
+    )
+
+    result_cache = providers.Singleton(DiskCache)
+    csv_ingestor = providers.Singleton(CsvIngestor)
+
+    code_interpreter_single_flight = providers.Singleton(SingleFlight)
+
+    remote_object_reaper = providers.Singleton(
+        RemoteObjectReaper,
+        project_client=project_client,
+        executor=blocking_executor,
+    )
+
     code_interpreter_service = providers.Factory(
         CodeInterpreterService,
         project_client=project_client,
         file_repository=file_repository,
-        message_repository=message_repository
+        message_repository=message_repository,
+        executor=blocking_executor,
+        agent_pool=agent_pool,
+        file_cache=project_file_cache,
+        result_cache=result_cache,
+        single_flight=code_interpreter_single_flight,
+        reaper=remote_object_reaper,
+        ingestor=csv_ingestor,
     )
     file_upload_service = providers.Factory(
-        FileUploadService,
-        base_dir=base_dir
+        FileUploadService, base_dir=base_dir, executor=blocking_executor
+    )
+    http_clients = providers.Singleton(HttpClientManager)
+
+    slm_cache = providers.Singleton(
+        TTLCache,
+        maxsize=int(os.getenv("SLM_CACHE_MAX_ENTRIES", "256")),
+        ttl=float(os.getenv("SLM_CACHE_TTL_SECONDS", "600")),
+    )
+
+    slm_single_flight = providers.Singleton(SingleFlight)
+
+    sidecar_service = providers.Factory(
+        SidecarService,
+        http_client=http_clients.provided.get.call(
+            "sidecar",
+            read_timeout=float(os.getenv("SIDECAR_READ_TIMEOUT", "300")),
+        ),
+        cache=slm_cache,
+        single_flight=slm_single_flight,
+    )
+
+    access_token_cache = providers.Singleton(
+        AccessTokenCache,
+        credential_factory=credential.provider,
+        executor=blocking_executor,
     )
-    sidecar_service = providers.Factory(SidecarService)
-    
-    dynamic_sessions_repository = providers.Factory(DynamicSessionsRepository)
+
+    dynamic_sessions_repository = providers.Factory(
+        DynamicSessionsRepository,
+        http_client=http_clients.provided.get.call("dynamic_sessions"),
+        token_cache=access_token_cache,
+    )
+    dynamic_sessions_pool = providers.Singleton(
+        DynamicSessionsPool, repository=dynamic_sessions_repository
+    )
+    local_interpreter_pool = providers.Singleton(
+        LocalInterpreterPool, executor=blocking_executor
+    )
+    generated_code_cache = providers.Singleton(GeneratedCodeCache)
     dynamic_sessions_service = providers.Factory(
         DynamicSessionsService,
-        repository=dynamic_sessions_repository
-    )
\ No newline at end of file
+        repository=dynamic_sessions_repository,
+        pool=dynamic_sessions_pool,
+        executor=blocking_executor,
+        local_pool=local_interpreter_pool,
+        code_cache=generated_code_cache,
+    )
+
+    job_queue = providers.Singleton(JobQueue)
+
+    job_service = providers.Factory(
+        JobService,
+        job_queue=job_queue,
+        code_interpreter_service=code_interpreter_service,
+        dynamic_sessions_service=dynamic_sessions_service,
+    )
@@ -1,3 +1,10 @@
+import time
+
+started = time.perf_counter()
+
 from startup import create_app
+from utils.startup_profile import StartupProfile
 
-app = create_app()
\ No newline at end of file
+profile = StartupProfile()
+profile.record("import", time.perf_counter() - started)
+app = create_app(profile)
@@ -1,6 +1,11 @@
 """Repositories package."""
 
-from .file_repository import FileRepository
+from .file_repository import FileRepository, FileTooLargeError, StoredFile
 from .message_repository import MessageRepository
 
-__all__ = ["FileRepository", "MessageRepository"]
\ No newline at end of file
+__all__ = [
+    "FileRepository",
+    "FileTooLargeError",
+    "MessageRepository",
+    "StoredFile",
+]
@@ -1,38 +1,55 @@
 import os
 import re
 import uuid
-import requests
-from azure.identity import DefaultAzureCredential
+from typing import Optional
+import httpx
+from utils.http_client import borrow_client
+from utils.token_cache import AccessTokenCache
+
+DYNAMIC_SESSIONS_SCOPE = "https://dynamicsessions.io/.default"
 
 class DynamicSessionsRepository:
-    def __init__(self):
-        self.credential = DefaultAzureCredential()
-        self.access_token = self._get_access_token()
+    def __init__(
+        self,
+        http_client: Optional[httpx.AsyncClient] = None,
+        token_cache: Optional[AccessTokenCache] = None,
+    ):
+        # Tokens come from a shared cache so constructing the repository per
+        # request costs no credential discovery or token round trip.
+        self.token_cache = token_cache or AccessTokenCache()
+        self.http_client = http_client
         self.region = os.getenv("REGION", "eastasia")
         self.subscription_id = os.getenv("SUBSCRIPTION_ID")
         self.resource_group = os.getenv("RESOURCE_GROUP")
         self.pool_name = os.getenv("ACA_DYNAMICSESSIONS_POOL_NAME", "pool-azure101day-demo-ce-001")
-        self.base_url = (
+        # The pool management endpoint can be set directly, e.g. to point at a
+        # local fake.
+        self.base_url = os.getenv("ACA_DYNAMICSESSIONS_POOL_ENDPOINT") or (
             f"https://{self.region}.dynamicsessions.io/subscriptions/{self.subscription_id}"
             f"/resourceGroups/{self.resource_group}/sessionPools/{self.pool_name}"
         )
 
-    def _get_access_token(self) -> str:
-        token = self.credential.get_token("https://dynamicsessions.io/.default")
-        return token.token
+    async def _get_access_token(self) -> str:
+        return await self.token_cache.get_token_async(DYNAMIC_SESSIONS_SCOPE)
 
-    def upload_file(self, session_id: str, file) -> None:
+    async def upload_file(self, session_id: str, file) -> None:
         url = f"{self.base_url}/files/upload?api-version=2024-02-02-preview&identifier={session_id}"
-        headers = {"Authorization": f"Bearer {self.access_token}"}
+        headers = {"Authorization": f"Bearer {await self._get_access_token()}"}
         files = {"file": (file.filename, file.file, "application/octet-stream")}
-        response = requests.post(url, headers=headers, files=files)
-        response.raise_for_status()  # 例外発生時は上位でキャッチ
+        async with borrow_client(self.http_client) as client:
+            response = await client.post(url, headers=headers, files=files)
+            response.raise_for_status()  # 例外発生時は上位でキャッチ
+
+    async def execute_code(self, session_id: str, code: str) -> dict:
+        """Run code in the session and return the result's properties.
 
-    def execute_code(self, session_id: str, code: str) -> None:
+        The properties include "status", which is "Failure" when the code
+        raised, along with "stdout" and "stderr".
+        """
         url = f"{self.base_url}/code/execute?api-version=2024-02-02-preview&identifier={session_id}"
         headers = {
-            "Authorization": f"Bearer {self.access_token}",
-            "Content-Type": "application/json"
+            "Authorization": f"Bearer {await self._get_access_token()}",
+            "Content-Type": "application/json",
         }
         payload = {
             "properties": {
@@ -41,5 +58,10 @@ class DynamicSessionsRepository:
                 "code": code
             }
         }
-        response = requests.post(url, headers=headers, json=payload)
-        response.raise_for_status()
\ No newline at end of file
+        async with borrow_client(self.http_client) as client:
+            response = await client.post(url, headers=headers, json=payload)
+            response.raise_for_status()
+        try:
+            return response.json().get("properties") or {}
+        except ValueError:
+            return {}
@@ -1,18 +1,103 @@
+import hashlib
 import os
+import uuid
+from typing import NamedTuple, Optional
+
 import aiofiles
 
+from utils.temp_storage import TempStorage
+
+
+class FileTooLargeError(Exception):
+    """Raised when an upload exceeds the configured maximum size."""
+
+
+class StoredFile(NamedTuple):
+    """A file written to local storage with its SHA-256 digest and size."""
+
+    path: str
+    content_hash: str
+    size: int
+
 
 class FileRepository:
     """Repository class for file operations."""
 
+    def __init__(
+        self,
+        chunk_size: Optional[int] = None,
+        max_upload_bytes: Optional[int] = None,
+        storage: Optional[TempStorage] = None,
+    ):
+        if chunk_size is None:
+            chunk_size = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+        if max_upload_bytes is None:
+            max_upload_bytes = int(
+                os.getenv("MAX_UPLOAD_BYTES", str(512 * 1024 * 1024))
+            )
+        self.chunk_size = chunk_size
+        self.max_upload_bytes = max_upload_bytes
+        # Without a storage manager files are written as destination/filename.
+        self.storage = storage
+
     async def save_temp_file(self, file, destination: str) -> str:
         """Save a temporary file to the specified destination."""
-        file_location = os.path.join(destination, file.filename)
-        async with aiofiles.open(file_location, "wb") as f:
-            await f.write(await file.read())
-        return file_location
+        stored = await self.stream_temp_file(file, destination)
+        return stored.path
+
+    async def stream_temp_file(self, file, destination: str) -> StoredFile:
+        """Stream an upload to destination in chunks, hashing it on the way.
+
+        Memory use is bounded by chunk_size regardless of the upload size.
+        Uploads larger than max_upload_bytes raise FileTooLargeError and
+        leave no partial file behind. With a storage manager the file gets a
+        unique, leased path and destination is ignored.
+        """
+        size = getattr(file, "size", None)
+        if size is not None and size > self.max_upload_bytes:
+            raise FileTooLargeError(
+                f"Upload of {size} bytes exceeds the "
+                f"{self.max_upload_bytes} byte limit"
+            )
+        if self.storage is not None:
+            file_location = self.storage.allocate(file.filename)
+        else:
+            file_location = os.path.join(destination, file.filename)
+        digest = hashlib.sha256()
+        written = 0
+        try:
+            async with aiofiles.open(file_location, "wb") as f:
+                while chunk := await file.read(self.chunk_size):
+                    written += len(chunk)
+                    if written > self.max_upload_bytes:
+                        raise FileTooLargeError(
+                            "Upload exceeds the "
+                            f"{self.max_upload_bytes} byte limit"
+                        )
+                    digest.update(chunk)
+                    await f.write(chunk)
+        except BaseException:
+            self.delete_file(file_location)
+            raise
+        if self.storage is not None:
+            self.storage.record(file_location, written)
+        return StoredFile(file_location, digest.hexdigest(), written)
+
+    def allocate_temp_file(self, filename: str, destination: str) -> str:
+        """Return a new path for a file the caller writes itself.
+
+        With a storage manager the path is leased like an upload's; without
+        one it is a unique name under destination. Remove it with delete_file.
+        """
+        if self.storage is not None:
+            return self.storage.allocate(filename)
+        return os.path.join(
+            destination, f"{uuid.uuid4().hex}-{os.path.basename(filename)}"
+        )
 
     def delete_file(self, file_path: str):
         """Delete the specified file."""
-        if os.path.exists(file_path):
-            os.remove(file_path)
\ No newline at end of file
+        if self.storage is not None:
+            self.storage.delete(file_path)
+        elif os.path.exists(file_path):
+            os.remove(file_path)
@@ -0,0 +1,94 @@
+import hashlib
+import json
+import logging
+import threading
+from typing import TYPE_CHECKING, Dict, List
+
+from opentelemetry import trace
+
+if TYPE_CHECKING:
+    from azure.ai.projects import AIProjectClient
+
+
+class AgentPool:
+    """Cache of reusable agents keyed by model, instructions and tools.
+
+    Agents hold no per-request state once files are attached to threads, so
+    a single agent per definition can serve any number of concurrent runs.
+    """
+
+    def __init__(self, project_client: "AIProjectClient"):
+        self.project_client = project_client
+        self.hits = 0
+        self.misses = 0
+        self._agents: Dict[str, object] = {}
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model: str, instructions: str, tools: List) -> str:
+        """Return a stable key for an agent definition."""
+        definitions = [
+            tool.as_dict() if hasattr(tool, "as_dict") else tool
+            for tool in tools
+        ]
+        payload = json.dumps(
+            {
+                "model": model,
+                "instructions": instructions,
+                "tools": definitions,
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get_or_create(
+        self, model: str, name: str, instructions: str, tools: List
+    ):
+        """Return the pooled agent for a definition, creating it if needed."""
+        key = self.make_key(model, instructions, tools)
+        with self._lock:
+            agent = self._agents.get(key)
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        hit = agent is not None
+        if not hit:
+            # Only one caller creates the agent; the others wait and reuse it.
+            with key_lock:
+                agent = self._agents.get(key)
+                hit = agent is not None
+                if not hit:
+                    agent = self.project_client.agents.create_agent(
+                        model=model,
+                        name=name,
+                        instructions=instructions,
+                        tools=tools,
+                    )
+                    logging.info(f"Created pooled agent, agent ID: {agent.id}")
+                    with self._lock:
+                        self._agents[key] = agent
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            trace.get_current_span().set_attributes(
+                {
+                    "agent_pool.hit": hit,
+                    "agent_pool.hits": self.hits,
+                    "agent_pool.misses": self.misses,
+                    "agent_pool.size": len(self._agents),
+                }
+            )
+        return agent
+
+    def close(self):
+        """Delete every pooled agent from the project."""
+        with self._lock:
+            agents = list(self._agents.values())
+            self._agents.clear()
+        for agent in agents:
+            try:
+                self.project_client.agents.delete_agent(agent.id)
+                logging.info(f"Deleted pooled agent, agent ID: {agent.id}")
+            except Exception as e:
+                logging.error(e)
@@ -1,21 +1,76 @@
+import asyncio
+import base64
+import hashlib
+import json
 import logging
 import os
-from typing import Optional
-from azure.ai.projects import AIProjectClient
-from azure.ai.projects.models import FilePurpose
-from repositories.file_repository import FileRepository
+import shutil
+import tempfile
+import time
+import unicodedata
+import zipfile
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, AsyncIterator, List, Optional, Tuple
+from opentelemetry import trace
+from repositories.file_repository import FileRepository, StoredFile
 from repositories.message_repository import MessageRepository
+from services.agent_pool import AgentPool
+from services.csv_ingest import CsvIngestor
+from services.project_file_cache import ProjectFileCache
+from services.remote_object_reaper import RemoteObjectReaper
 from tools.action.code_interpreter_tool import create_code_interpreter_tool
-from pathlib import Path
 from tracing.tracing import tracer
+from utils.disk_cache import DiskCache
+from utils.executor import BlockingExecutor
+from utils.hashing import hash_file
+from utils.single_flight import SingleFlight
+from utils.timing import stage
+
+if TYPE_CHECKING:
+    # The agents SDK is slow to import, so it loads on first use.
+    from azure.ai.projects import AIProjectClient
+    from services.run_event_forwarder import RunEventForwarder
+
+AGENT_MODEL = "gpt-4o-mini"
+AGENT_NAME = "code_interpreter"
+AGENT_INSTRUCTIONS = "You are helpful agent"
+# Under DATA_DIR by default so the temp storage sweep removes uncached results.
+ARTIFACT_DIR = os.getenv(
+    "ARTIFACT_DIR", os.path.join(os.getenv("DATA_DIR", "/data"), "artifacts")
+)
 
 
 class CodeInterpreterService:
-    def __init__(self, project_client: AIProjectClient, file_repository: FileRepository, message_repository: MessageRepository):
+    def __init__(
+        self,
+        project_client: "AIProjectClient",
+        file_repository: FileRepository,
+        message_repository: MessageRepository,
+        executor: Optional[BlockingExecutor] = None,
+        agent_pool: Optional[AgentPool] = None,
+        file_cache: Optional[ProjectFileCache] = None,
+        result_cache: Optional[DiskCache] = None,
+        single_flight: Optional[SingleFlight] = None,
+        reaper: Optional[RemoteObjectReaper] = None,
+        ingestor: Optional[CsvIngestor] = None,
+    ):
         self.project_client = project_client
         self.file_repository = file_repository
         self.message_repository = message_repository
-
+        # AIProjectClient.agents is synchronous, so every SDK call runs on
+        # this pool to keep the event loop free for other requests.
+        self.executor = executor or BlockingExecutor()
+        self.agent_pool = agent_pool or AgentPool(project_client)
+        self.file_cache = file_cache or ProjectFileCache(
+            project_client, self.executor
+        )
+        # Generated images are only cached when a result cache is injected.
+        self.result_cache = result_cache
+        self.single_flight = single_flight or SingleFlight()
+        # Threads are left in the project unless a reaper is injected.
+        self.reaper = reaper
+        # CSVs are uploaded as is unless an ingestor is injected.
+        self.ingestor = ingestor
 
     async def process_file_and_message(self, file, user_message: str):
         with tracer.start_as_current_span("process_file_and_message") as span:
@@ -24,23 +79,523 @@ class CodeInterpreterService:
                     "span_type": "HTTP"
                 }
             )
-            destination: str = os.getenv("DATA_DIR", "/data")
-            file_location = await self.file_repository.save_temp_file(file, destination)
+            stored = await self.store_upload(file)
+            return await self.process_stored_file(stored, user_message)
+
+    async def store_upload(self, file) -> StoredFile:
+        """Write an upload to DATA_DIR so it outlives the request."""
+        destination: str = os.getenv("DATA_DIR", "/data")
+        with stage("store_upload"):
+            return await self.file_repository.stream_temp_file(
+                file, destination
+            )
+
+    @asynccontextmanager
+    async def stored_upload(self, file) -> AsyncIterator[StoredFile]:
+        """Write an upload with store_upload and delete it after the block."""
+        stored = await self.store_upload(file)
+        try:
+            yield stored
+        finally:
+            self.delete_stored(stored.path)
+
+    async def upload_stored(self, stored: StoredFile):
+        """Upload stored; return the project file and a summary to send.
+
+        CSVs are replaced by their ingested copy when an ingestor is set. The
+        copy is linked into this request's storage first, so the ingest cache
+        can evict it while it uploads, and deleted once it is uploaded.
+
+        The upload runs on in the executor if the caller is cancelled, such
+        as when every request sharing a run has gone away; the project file
+        lease it takes is then released as soon as it finishes.
+        """
+        upload, summary, pinned = stored, None, None
+        if self.ingestor is not None:
+            with stage("ingest_csv"):
+                ingested = await self.executor.run(
+                    self.ingestor.ingest, stored
+                )
+            if ingested is not None:
+                pinned = await self.executor.run(
+                    self._pin_ingested, stored, ingested.path
+                )
+            if pinned is not None:
+                upload, summary = (
+                    StoredFile(pinned, ingested.content_hash, ingested.size),
+                    ingested.summary,
+                )
+        upload_future = self.executor.submit(
+            self.upload_file_to_project,
+            upload.path,
+            upload.content_hash,
+            upload.size,
+        )
+        if pinned is not None:
+            upload_future.add_done_callback(
+                lambda _: self.file_repository.delete_file(pinned)
+            )
+        try:
+            with stage("upload_file_to_project"):
+                uploaded_file = await asyncio.wrap_future(upload_future)
+        except asyncio.CancelledError:
+            upload_future.add_done_callback(self._release_abandoned_upload)
+            raise
+        return uploaded_file, summary
+
+    def _release_abandoned_upload(self, future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        self.delete_uploaded_file(future.result().id)
+
+    def _pin_ingested(
+        self, stored: StoredFile, cached_path: str
+    ) -> Optional[str]:
+        """Link the cached copy of stored to a path of its own.
+
+        Returns None if the copy was evicted in the meantime.
+        """
+        path = self.file_repository.allocate_temp_file(
+            os.path.basename(cached_path), os.getenv("DATA_DIR", "/data")
+        )
+        try:
+            linked = self.ingestor.link(stored, path)
+        except BaseException:
+            self.file_repository.delete_file(path)
+            raise
+        if not linked:
+            self.file_repository.delete_file(path)
+            return None
+        return path
+
+    @staticmethod
+    def compose_message(user_message: str, summary: Optional[str]) -> str:
+        """Append a file summary, if any, to the user's message."""
+        return f"{user_message}\n\n{summary}" if summary else user_message
+
+    async def process_stored_file(self, stored: StoredFile, user_message: str):
+        """Interpret a file written by store_upload, then delete it."""
+        span = trace.get_current_span()
+        file_location = stored.path
+        # The shared run outlives this request if it is cancelled, so once
+        # it starts it owns the stored file and deletes it when done.
+        handed_off = False
+
+        async def interpret():
+            try:
+                return await self._interpret_file(
+                    file_location, content_hash, size, user_message, key
+                )
+            finally:
+                self.delete_stored(file_location)
+
+        def start():
+            nonlocal handed_off
+            handed_off = True
+            return interpret()
+
+        try:
+            content_hash, size = stored.content_hash, stored.size
+            key = self.result_key(content_hash, user_message)
+            if self.result_cache is not None:
+                cached = await self.executor.run(self._cached_result, key)
+                self._record_result_cache(span, hit=cached is not None)
+                if cached is not None:
+                    logging.info(f"Reused cached result: {cached}")
+                    return cached
+            # Identical requests already running share that run's result.
+            span.set_attribute(
+                "result_cache.coalesced", key in self.single_flight
+            )
+            return await self.single_flight.run(key, start)
+        except Exception as e:
+            logging.error(e)
+            raise Exception(e)
+        finally:
+            if not handed_off:
+                self.delete_stored(file_location)
+
+    def delete_stored(self, file_location: str):
+        """Delete a file written by store_upload."""
+        self.file_repository.delete_file(file_location)
+        logging.debug("Deleted stored upload")
+
+    async def _interpret_file(
+        self,
+        file_location: str,
+        content_hash: str,
+        size: int,
+        user_message: str,
+        key: str,
+    ):
+        uploaded_file, summary = await self.upload_stored(
+            StoredFile(file_location, content_hash, size)
+        )
+        run = None
+        try:
+            with stage("create_agent"):
+                agent = await self.executor.run(self.create_agent)
+            with stage("create_thread"):
+                thread = await self.executor.run(
+                    self.create_thread, uploaded_file.id
+                )
+            with stage("send_user_message_to_thread"):
+                await self.executor.run(
+                    self.send_user_message_to_thread,
+                    thread.id,
+                    self.compose_message(user_message, summary),
+                )
+            with stage("execute_run"):
+                run = await self.executor.run(
+                    self.execute_run, thread.id, agent.id
+                )
+        finally:
+            # handle_run_completion deletes the file once the run is over.
+            if run is None:
+                await self.executor.run(
+                    self.delete_uploaded_file, uploaded_file.id
+                )
+        with stage("handle_run_completion"):
+            await self.executor.run(
+                self.handle_run_completion, run, thread.id, uploaded_file.id
+            )
+        with stage("save_generated_images"):
+            file_name = await self.save_generated_images(thread.id)
+        if self.result_cache is not None:
+            await self.executor.run(self._cache_result, key, file_name)
+        return file_name
+
+    def _cached_result(self, key: str) -> Optional[str]:
+        """Link the cached result for key into ARTIFACT_DIR; None on a miss.
+
+        Results are served from their own path, never the cache's, so an
+        eviction while the response is being sent cannot remove the file.
+        """
+        cached = self.result_cache.get(key)
+        if cached is None:
+            return None
+        os.makedirs(ARTIFACT_DIR, exist_ok=True)
+        directory = tempfile.mkdtemp(dir=ARTIFACT_DIR)
+        path = os.path.join(directory, os.path.basename(cached))
+        if not self.result_cache.link(key, path):
+            os.rmdir(directory)
+            return None
+        # The link shares the entry's mtime; the temp storage sweep goes by it.
+        os.utime(path)
+        return path
+
+    def _cache_result(self, key: str, file_name: str):
+        """Store a copy of file_name in the result cache, keeping file_name."""
+        fd, copy_path = tempfile.mkstemp(
+            dir=self.result_cache.directory, suffix=".tmp"
+        )
+        os.close(fd)
+        shutil.copyfile(file_name, copy_path)
+        self.result_cache.put(key, copy_path, os.path.splitext(file_name)[1])
+
+    async def process_batch(
+        self, file, user_messages: List[str], independent: bool = True
+    ) -> str:
+        """Run several messages against one upload and return a zip of results.
+
+        Independent messages each get their own thread and run concurrently;
+        otherwise they are sent in order to a single thread so later messages
+        can build on earlier answers. The zip holds every generated image and
+        a manifest.json describing each message's outcome.
+        """
+        with tracer.start_as_current_span("process_batch") as span:
+            span.set_attributes(
+                {
+                    "span_type": "HTTP",
+                    "batch.size": len(user_messages),
+                    "batch.independent": independent,
+                }
+            )
+            stored = await self.store_upload(file)
+            uploaded_file = None
             try:
-                uploaded_file = self.upload_file_to_project(file_location)
-                agent = self.create_agent(uploaded_file.id)
-                thread = self.create_thread()
-                self.send_user_message_to_thread(thread.id, user_message)
-                run = self.execute_run(thread.id, agent.id)
-                self.handle_run_completion(run, thread.id, uploaded_file.id)
-                file_name = self.save_generated_images(thread.id)
-                return file_name
+                uploaded_file, summary = await self.upload_stored(stored)
+                with stage("create_agent"):
+                    agent = await self.executor.run(self.create_agent)
+                if independent:
+                    results = await asyncio.gather(
+                        *(
+                            self._run_batch_message(
+                                index, message, agent.id, uploaded_file.id,
+                                summary=summary,
+                            )
+                            for index, message in enumerate(user_messages)
+                        )
+                    )
+                else:
+                    with stage("create_thread"):
+                        thread = await self.executor.run(
+                            self.create_thread, uploaded_file.id
+                        )
+                    seen_images = set()
+                    results = []
+                    for index, message in enumerate(user_messages):
+                        # Later messages share the thread, so the summary is
+                        # sent once.
+                        results.append(
+                            await self._run_batch_message(
+                                index, message, agent.id, uploaded_file.id,
+                                thread.id, seen_images,
+                                summary=summary if index == 0 else None,
+                            )
+                        )
+                span.set_attribute(
+                    "batch.failed",
+                    sum(1 for r in results if r["status"] != "completed"),
+                )
+                return await self.executor.run(
+                    self._write_batch_archive, results
+                )
+            finally:
+                try:
+                    if uploaded_file is not None:
+                        await self.executor.run(
+                            self.delete_uploaded_file, uploaded_file.id
+                        )
+                finally:
+                    self.file_repository.delete_file(stored.path)
+
+    async def _run_batch_message(
+        self,
+        index: int,
+        user_message: str,
+        agent_id: str,
+        file_id: str,
+        thread_id: Optional[str] = None,
+        seen_images: Optional[set] = None,
+        summary: Optional[str] = None,
+    ) -> dict:
+        with tracer.start_as_current_span("run_batch_message") as span:
+            span.set_attribute("batch.index", index)
+            result = {
+                "index": index,
+                "message": user_message,
+                "status": "failed",
+                "text": None,
+                "images": [],
+                "error": None,
+            }
+            try:
+                if thread_id is None:
+                    with stage("create_thread"):
+                        thread_id = (
+                            await self.executor.run(
+                                self.create_thread, file_id
+                            )
+                        ).id
+                with stage("send_user_message_to_thread"):
+                    await self.executor.run(
+                        self.send_user_message_to_thread,
+                        thread_id,
+                        self.compose_message(user_message, summary),
+                    )
+                with stage("execute_run"):
+                    run = await self.executor.run(
+                        self.execute_run, thread_id, agent_id
+                    )
+                result["status"] = run.status
+                if run.status == "failed":
+                    result["error"] = str(run.last_error)
+                text, images = await self.download_generated_images(
+                    thread_id, seen_images
+                )
+                result["text"] = text
+                result["images"] = images
             except Exception as e:
                 logging.error(e)
-                raise Exception(e)
+                span.record_exception(e)
+                result["error"] = str(e)
+            span.set_attributes(
+                {
+                    "batch.status": result["status"],
+                    "batch.images": len(result["images"]),
+                }
+            )
+            return result
+
+    def _write_batch_archive(self, results: List[dict]) -> str:
+        with tracer.start_as_current_span("write_batch_archive"):
+            fd, archive_path = tempfile.mkstemp(suffix=".zip")
+            with os.fdopen(fd, "wb") as f, zipfile.ZipFile(f, "w") as archive:
+                for result in results:
+                    names = []
+                    for file_id, content in result["images"]:
+                        name = (
+                            f"{result['index']:02d}_{file_id}_image_file.png"
+                        )
+                        archive.writestr(name, content)
+                        names.append(name)
+                    result["images"] = names
+                archive.writestr(
+                    "manifest.json",
+                    json.dumps(results, ensure_ascii=False, indent=2),
+                )
+            return archive_path
+
+    async def stream_file_and_message(
+        self, file, user_message: str
+    ) -> AsyncIterator[Tuple[str, dict]]:
+        """Run the agent in streaming mode and yield (event, data) pairs.
+
+        The first event is "thread" once the upload and thread are ready.
+        Run progress, partial text and image IDs follow as the SDK reports
+        them, and each image is downloaded as soon as its message completes
+        and yielded as an "artifact" event with base64 content. "done" is
+        yielded last with the run status and full reply text.
+        """
+        stored = await self.store_upload(file)
+        uploaded_file = None
+        run_future = None
+        try:
+            uploaded_file, summary = await self.upload_stored(stored)
+            with stage("create_agent"):
+                agent = await self.executor.run(self.create_agent)
+            with stage("create_thread"):
+                thread = await self.executor.run(
+                    self.create_thread, uploaded_file.id
+                )
+            with stage("send_user_message_to_thread"):
+                await self.executor.run(
+                    self.send_user_message_to_thread,
+                    thread.id,
+                    self.compose_message(user_message, summary),
+                )
+            yield "thread", {"thread_id": thread.id}
+
+            loop = asyncio.get_running_loop()
+            events: asyncio.Queue = asyncio.Queue()
+
+            def emit(event: str, data: dict):
+                loop.call_soon_threadsafe(events.put_nowait, (event, data))
+
+            def download(file_id: str):
+                future = self.executor.submit(self.download_image, file_id)
+                future.add_done_callback(
+                    lambda f: emit(
+                        "artifact", self._artifact_event(file_id, f)
+                    )
+                )
+
+            from services.run_event_forwarder import RunEventForwarder
+
+            forwarder = RunEventForwarder(emit, on_image=download)
+            run_future = self.executor.submit(
+                self.stream_run, thread.id, agent.id, forwarder
+            )
+            run_task = asyncio.wrap_future(run_future)
+            # Emitted events are queued before the task's own completion.
+            run_task.add_done_callback(lambda _: events.put_nowait(None))
+            pending_artifacts = 0
+            run_finished = False
+            while not run_finished or pending_artifacts:
+                item = await events.get()
+                if item is None:
+                    run_finished = True
+                    continue
+                event, data = item
+                if event == "image":
+                    pending_artifacts += 1
+                elif event == "artifact":
+                    pending_artifacts -= 1
+                yield event, data
+            run = run_task.result()
+            yield "done", {
+                "status": run.status if run is not None else None,
+                "text": forwarder.text,
+                "images": forwarder.image_ids,
+            }
+        finally:
+            try:
+                if uploaded_file is not None:
+                    if run_future is not None and not run_future.done():
+                        # The client went away mid-run; the run still reads
+                        # the file, so release it once the run ends.
+                        file_id = uploaded_file.id
+                        run_future.add_done_callback(
+                            lambda _: self.delete_uploaded_file(file_id)
+                        )
+                    else:
+                        await self.executor.run(
+                            self.delete_uploaded_file, uploaded_file.id
+                        )
+            finally:
+                self.file_repository.delete_file(stored.path)
+
+    def stream_run(
+        self, thread_id: str, agent_id: str, event_handler: "RunEventForwarder"
+    ):
+        with (
+            tracer.start_as_current_span("stream_run") as span,
+            stage("execute_run"),
+        ):
+            try:
+                with self.project_client.agents.create_stream(
+                    thread_id=thread_id,
+                    assistant_id=agent_id,
+                    event_handler=event_handler,
+                ) as stream:
+                    stream.until_done()
             finally:
-                self.file_repository.delete_file(file_location)
-                print("Deleted file")
+                self._track_thread(thread_id)
+            run = event_handler.run
+            span.set_attributes({"run.images": len(event_handler.image_ids)})
+            logging.info(
+                f"Run finished with status: {run.status if run else None}"
+            )
+            return run
+
+    def download_image(self, file_id: str) -> bytes:
+        with (
+            tracer.start_as_current_span("download_image") as span,
+            stage("download_artifact"),
+        ):
+            started = time.perf_counter()
+            content = b"".join(
+                self.project_client.agents.get_file_content(file_id)
+            )
+            span.set_attributes(
+                {
+                    "artifact.file_id": file_id,
+                    "artifact.bytes": len(content),
+                    "artifact.download_seconds": time.perf_counter() - started,
+                }
+            )
+            return content
+
+    @staticmethod
+    def _artifact_event(file_id: str, future) -> dict:
+        try:
+            content = future.result()
+        except Exception as e:
+            logging.error(f"Failed to download {file_id}: {e}")
+            return {"file_id": file_id, "error": str(e)}
+        return {
+            "file_id": file_id,
+            "size": len(content),
+            "content": base64.b64encode(content).decode("ascii"),
+        }
+
+    @staticmethod
+    def result_key(
+        content_hash: str, user_message: str, model: str = AGENT_MODEL
+    ) -> str:
+        """Return the result cache key for a file, message and model."""
+        normalized = " ".join(
+            unicodedata.normalize("NFKC", user_message).split()
+        )
+        payload = "\0".join([content_hash, normalized, model])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _record_result_cache(self, span, hit: bool):
+        attributes = {"result_cache.hit": hit}
+        for name, value in self.result_cache.stats().items():
+            attributes[f"result_cache.{name}"] = value
+        span.set_attributes(attributes)
 
     async def process_message_only(self, file, user_message: str):
         with tracer.start_as_current_span("process_message_only") as span:
@@ -49,50 +604,120 @@ class CodeInterpreterService:
                     "span_type": "HTTP"
                 }
             )
-            destination: str = os.getenv("DATA_DIR", "/data")
-            file_location = await self.file_repository.save_temp_file(file, destination)
+            stored = await self.store_upload(file)
             try:
-                uploaded_file = self.upload_file_to_project(file_location)
-                agent = self.create_agent(uploaded_file.id)
-                thread = self.create_thread()
-                self.send_user_message_to_thread(thread.id, user_message)
-                run = self.execute_run(thread.id, agent.id)
-                logging.info(f"Run finished with status: {run.status}")
-                messages = self.project_client.agents.list_messages(thread_id=thread.id)
-                logging.info(f"Messages: {messages}")
-                last_msg = messages.get_last_text_message_by_role("assistant")
-                if last_msg:
-                    return last_msg.text.value
+                return await self.generate_code(stored, user_message)
             finally:
-                self.file_repository.delete_file(file_location)
-                print("Deleted file")
+                self.delete_stored(stored.path)
 
-    def upload_file_to_project(self, file_location: str):
+    async def generate_code(self, stored: StoredFile, user_message: str):
+        """Return the assistant's reply for a file written by store_upload.
+
+        The raw file is uploaded rather than an ingested copy, because the
+        code is executed elsewhere against the original upload.
+        """
+        with stage("upload_file_to_project"):
+            uploaded_file = await self.executor.run(
+                self.upload_file_to_project,
+                stored.path,
+                stored.content_hash,
+                stored.size,
+            )
+        try:
+            with stage("create_agent"):
+                agent = await self.executor.run(self.create_agent)
+            with stage("create_thread"):
+                thread = await self.executor.run(
+                    self.create_thread, uploaded_file.id
+                )
+            with stage("send_user_message_to_thread"):
+                await self.executor.run(
+                    self.send_user_message_to_thread, thread.id, user_message
+                )
+            with stage("execute_run"):
+                run = await self.executor.run(
+                    self.execute_run, thread.id, agent.id
+                )
+        finally:
+            await self.executor.run(
+                self.delete_uploaded_file, uploaded_file.id
+            )
+        logging.info(f"Run finished with status: {run.status}")
+        messages = await self.executor.run(
+            self.project_client.agents.list_messages, thread_id=thread.id
+        )
+        logging.info(f"Messages: {messages}")
+        last_msg = messages.get_last_text_message_by_role("assistant")
+        if last_msg:
+            return last_msg.text.value
+
+    def upload_file_to_project(
+        self,
+        file_location: str,
+        content_hash: Optional[str] = None,
+        size: Optional[int] = None,
+    ):
         with tracer.start_as_current_span("upload_file_to_project"):
+            if content_hash is None:
+                content_hash, size = hash_file(file_location)
+            # The returned file is leased; delete_uploaded_file releases it.
+            uploaded_file = self.file_cache.acquire(content_hash, size)
+            if uploaded_file is not None:
+                logging.info(
+                    f"Reused uploaded file, file ID: {uploaded_file.id}"
+                )
+                return uploaded_file
+            from azure.ai.projects.models import FilePurpose
+
             uploaded_file = self.project_client.agents.upload_file_and_poll(
                 file_path=file_location, purpose=FilePurpose.AGENTS
             )
             logging.info(f"Uploaded file, file ID: {uploaded_file.id}")
-            return uploaded_file
-        
-    def create_agent(self, file_id: Optional[str] = None):
+            cached_file = self.file_cache.put(content_hash, uploaded_file)
+            if cached_file is not uploaded_file:
+                # A concurrent upload of the same content was cached first.
+                logging.info(
+                    f"Using cached file {cached_file.id} instead of duplicate "
+                    f"{uploaded_file.id}"
+                )
+                self.delete_uploaded_file(uploaded_file.id)
+            return cached_file
+
+    def create_agent(self):
         with tracer.start_as_current_span("create_agent"):
-            code_interpreter = create_code_interpreter_tool(file_ids=[file_id] if file_id else [])
-            agent = self.project_client.agents.create_agent(
-                model="gpt-4o-mini",
-                name="code_interpreter",
-                instructions="You are helpful agent",
+            # Files are attached per thread, so the agent itself can be shared.
+            code_interpreter = create_code_interpreter_tool(file_ids=[])
+            agent = self.agent_pool.get_or_create(
+                model=AGENT_MODEL,
+                name=AGENT_NAME,
+                instructions=AGENT_INSTRUCTIONS,
                 tools=code_interpreter.definitions,
-                tool_resources=code_interpreter.resources,
             )
             return agent
-        
-    def create_thread(self):
+
+    def warm_agent_pool(self):
+        """Create the default agent ahead of the first request."""
+        with tracer.start_as_current_span("warm_agent_pool"):
+            return self.create_agent()
+
+    def create_thread(self, file_id: Optional[str] = None):
         with tracer.start_as_current_span("create_thread"):
-            thread = self.project_client.agents.create_thread()
+            code_interpreter = create_code_interpreter_tool(
+                file_ids=[file_id] if file_id else []
+            )
+            thread = self.project_client.agents.create_thread(
+                tool_resources=code_interpreter.resources
+            )
             logging.info(f"Created thread, thread ID: {thread.id}")
+            self._track_thread(thread.id)
             return thread
 
+    def _track_thread(self, thread_id: str):
+        # Tracked when created, in case the request dies, and again when a
+        # run ends so the grace period never expires under a long run.
+        if self.reaper is not None:
+            self.reaper.track("thread", thread_id)
+
     def send_user_message_to_thread(self, thread_id: str, user_message: str):
         with tracer.start_as_current_span("send_user_message_to_thread"):
             message = self.project_client.agents.create_message(
@@ -104,7 +729,12 @@ class CodeInterpreterService:
 
     def execute_run(self, thread_id: str, agent_id: str):
         with tracer.start_as_current_span("execute_run"):
-            run = self.project_client.agents.create_and_process_run(thread_id=thread_id, assistant_id=agent_id)
+            try:
+                run = self.project_client.agents.create_and_process_run(
+                    thread_id=thread_id, assistant_id=agent_id
+                )
+            finally:
+                self._track_thread(thread_id)
             logging.info(f"Run finished with status: {run.status}")
             return run
 
@@ -112,29 +742,92 @@ class CodeInterpreterService:
         with tracer.start_as_current_span("handle_run_completion"):
             if run.status == "failed":
                 logging.error(f"Run failed: {run.last_error}")
-            self.project_client.agents.delete_file(file_id)
-            logging.info(f"Deleted file, file ID: {file_id}")
+            self.delete_uploaded_file(file_id)
 
-    def save_generated_images(self, thread_id: str):
-        with tracer.start_as_current_span("save_generated_images"):
-            messages = self.project_client.agents.list_messages(thread_id=thread_id)
-            logging.info(f"Messages: {messages}")
+    def delete_uploaded_file(self, file_id: str):
+        if self.file_cache.release(file_id):
+            # Cached uploads are deleted once evicted and no longer leased.
+            return
+        if self.reaper is not None:
+            self.reaper.track("file", file_id, grace_period=0)
+            return
+        self.project_client.agents.delete_file(file_id)
+        logging.info(f"Deleted file, file ID: {file_id}")
 
-            last_msg = messages.get_last_text_message_by_role("assistant")
-            if last_msg:
-                logging.info(f"Last Message: {last_msg.text.value}")
-
-            file_name = None
-            for image_content in messages.image_contents:
-                logging.info(f"Image File ID: {image_content.image_file.file_id}")
-                file_name = f"{image_content.image_file.file_id}_image_file.png"
-                self.project_client.agents.save_file(file_id=image_content.image_file.file_id, file_name=file_name)
-                logging.info(f"Saved image file to: {Path.cwd() / file_name}")
+    async def save_generated_images(self, thread_id: str) -> str:
+        """Download all generated images concurrently and spool them to a file.
 
-            if file_name is None:
+        A single image is written as a PNG; several are zipped together.
+        """
+        with tracer.start_as_current_span("save_generated_images") as span:
+            text, images = await self.download_generated_images(thread_id)
+            if text:
+                logging.info(f"Last Message: {text}")
+            if not images:
                 raise Exception("No generated images found.")
+            file_name = await self.executor.run(
+                self._spool_images, thread_id, images
+            )
+            span.set_attributes(
+                {
+                    "artifact.count": len(images),
+                    "artifact.bytes": sum(
+                        len(content) for _, content in images
+                    ),
+                }
+            )
+            logging.info(f"Saved image file to: {file_name}")
             return file_name
-        
+
+    async def download_generated_images(
+        self, thread_id: str, seen_images: Optional[set] = None
+    ) -> Tuple[Optional[str], List[Tuple[str, bytes]]]:
+        """Return the last reply and every image not in seen_images."""
+        messages = await self.executor.run(
+            self.project_client.agents.list_messages, thread_id=thread_id
+        )
+        last_msg = messages.get_last_text_message_by_role("assistant")
+        file_ids = []
+        for image_content in messages.image_contents:
+            file_id = image_content.image_file.file_id
+            if file_id in file_ids or (
+                seen_images is not None and file_id in seen_images
+            ):
+                continue
+            file_ids.append(file_id)
+        if seen_images is not None:
+            seen_images.update(file_ids)
+        contents = await asyncio.gather(
+            *(
+                self.executor.run(self.download_image, file_id)
+                for file_id in file_ids
+            )
+        )
+        return (last_msg.text.value if last_msg else None), list(
+            zip(file_ids, contents)
+        )
+
+    def _spool_images(
+        self, thread_id: str, images: List[Tuple[str, bytes]]
+    ) -> str:
+        os.makedirs(ARTIFACT_DIR, exist_ok=True)
+        if len(images) == 1:
+            file_id, content = images[0]
+            target = os.path.join(ARTIFACT_DIR, f"{file_id}_image_file.png")
+        else:
+            target = os.path.join(ARTIFACT_DIR, f"{thread_id}_images.zip")
+        fd, tmp_path = tempfile.mkstemp(dir=ARTIFACT_DIR, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            if len(images) == 1:
+                f.write(content)
+            else:
+                with zipfile.ZipFile(f, "w") as archive:
+                    for file_id, content in images:
+                        archive.writestr(f"{file_id}_image_file.png", content)
+        # Readers never see a partially written result.
+        os.replace(tmp_path, target)
+        return target
+
     def get_generated_code(self, thread_id: str):
         with tracer.start_as_current_span("get_generated_code"):
             messages = self.project_client.agents.list_messages(thread_id=thread_id)
@@ -143,4 +836,4 @@ class CodeInterpreterService:
             last_msg = messages.get_last_text_message_by_role("assistant")
             if last_msg:
                 logging.info(f"Last Message: {last_msg.text.value}")
-                return last_msg.text.value
\ No newline at end of file
+                return last_msg.text.value
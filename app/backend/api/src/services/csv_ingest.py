@@ -0,0 +1,416 @@
+import csv
+import logging
+import math
+import os
+import re
+import tempfile
+from typing import List, NamedTuple, Optional
+
+from repositories.file_repository import StoredFile
+from tracing.tracing import tracer
+from utils.disk_cache import DiskCache
+from utils.hashing import hash_file
+
+CSV_SUFFIX = ".csv"
+# Keeps the summary short for wide files; later columns are only counted.
+SUMMARY_MAX_COLUMNS = 60
+# "1,057", "-1,282.1", "18.48%" and plain numbers.
+NUMBER_PATTERN = re.compile(
+    r"^[+-]?(\d{1,3}(,\d{3})+|\d+)?(\.\d+)?([eE][+-]?\d+)?%?$"
+)
+# Exports sometimes garble a few cells, such as "7,9" for 7,900. Columns
+# where at least this share of values parse, and the rest still look like
+# numbers, are treated as numeric with the garbled cells left empty and
+# counted as unparsed in the summary. Codes like "ASM" keep a column textual.
+NUMERIC_MIN_RATIO = 0.95
+GARBLED_NUMBER_PATTERN = re.compile(r"^[\d,.%+-]+$")
+
+
+class ColumnSummary(NamedTuple):
+    name: str
+    kind: str
+    missing: int
+    percent: bool = False
+    distinct: Optional[int] = None
+    minimum: Optional[float] = None
+    maximum: Optional[float] = None
+    mean: Optional[float] = None
+    unparsed: int = 0
+
+    def describe(self) -> str:
+        details = [self.kind]
+        if self.percent:
+            details.append("percent, % removed")
+        if self.distinct is not None:
+            details.append(f"{self.distinct} distinct")
+        if self.minimum is not None:
+            details.append(
+                f"min {self.minimum:g}, max {self.maximum:g}, "
+                f"mean {self.mean:g}"
+            )
+        if self.missing:
+            details.append(f"{self.missing} missing")
+        if self.unparsed:
+            details.append(f"{self.unparsed} unparsed, left empty")
+        return f"- {self.name} ({', '.join(details)})"
+
+
+class IngestedFile(NamedTuple):
+    """A normalized copy of an uploaded CSV and a summary for the prompt."""
+
+    path: str
+    # Digest of the copy, so it never shares a project upload with the raw
+    # file.
+    content_hash: str
+    size: int
+    summary: str
+
+
+def parse_number(value: str) -> Optional[float]:
+    """Return value as a float without thousands separators and %, or None."""
+    value = value.strip()
+    if (
+        not value
+        or not NUMBER_PATTERN.match(value)
+        or value in ("%", "+", "-")
+    ):
+        return None
+    try:
+        return float(value.rstrip("%").replace(",", ""))
+    except ValueError:
+        return None
+
+
+def _pandas():
+    try:
+        import pandas
+    except ImportError:
+        return None
+    return pandas
+
+
+def _has_pyarrow() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class CsvIngestor:
+    """Parses uploaded CSVs once into a normalized copy keyed by content hash.
+
+    Numeric columns written with thousands separators or as percentages are
+    converted to numbers, so generated code does not have to clean them up.
+    The file is parsed column-wise with pandas and stored as Parquet via
+    pyarrow. Both are imported on first use to keep startup fast; an install
+    without them falls back to the csv module and a normalized CSV. Copies
+    and their summaries live in a DiskCache, so repeated uploads of the same
+    file are not parsed again. pandas holds the whole file in memory, several
+    times its size on disk, so files over max_source_bytes are uploaded as
+    is rather than parsed.
+    """
+
+    def __init__(
+        self,
+        cache: Optional[DiskCache] = None,
+        enabled: Optional[bool] = None,
+        max_source_bytes: Optional[int] = None,
+    ):
+        if enabled is None:
+            enabled = os.getenv("CSV_INGEST_ENABLED", "true").lower() == "true"
+        if max_source_bytes is None:
+            max_source_bytes = int(
+                os.getenv("CSV_INGEST_MAX_SOURCE_BYTES", str(64 * 1024 * 1024))
+            )
+        self.enabled = enabled
+        self.max_source_bytes = max_source_bytes
+        self._cache = cache
+        self.parsed = 0
+        self.too_large = 0
+        self.reused = 0
+        self.failed = 0
+        self.bytes_saved = 0
+
+    @property
+    def cache(self) -> DiskCache:
+        if self._cache is None:
+            self._cache = DiskCache(
+                directory=os.getenv(
+                    "CSV_INGEST_DIR",
+                    os.path.join(tempfile.gettempdir(), "csv_ingest"),
+                ),
+                max_bytes=int(
+                    os.getenv("CSV_INGEST_MAX_BYTES", str(512 * 1024 * 1024))
+                ),
+                max_entries=int(os.getenv("CSV_INGEST_MAX_ENTRIES", "512")),
+                ttl_seconds=float(
+                    os.getenv("CSV_INGEST_TTL_SECONDS", "86400")
+                ),
+            )
+        return self._cache
+
+    def stats(self) -> dict:
+        """Return counters suitable for span attributes."""
+        return {
+            "parsed": self.parsed,
+            "reused": self.reused,
+            "failed": self.failed,
+            "too_large": self.too_large,
+            "bytes_saved": self.bytes_saved,
+        }
+
+    def ingest(self, stored: StoredFile) -> Optional[IngestedFile]:
+        """Return a normalized copy of a stored CSV, or None to send it raw."""
+        filename = os.path.basename(stored.path)
+        if not self.enabled or not filename.lower().endswith(CSV_SUFFIX):
+            return None
+        if stored.size > self.max_source_bytes:
+            logging.info(
+                f"Uploading {filename} as is: {stored.size} bytes is over "
+                "the ingest limit"
+            )
+            self.too_large += 1
+            return None
+        with tracer.start_as_current_span("ingest_csv") as span:
+            try:
+                ingested = self._cached(stored.content_hash)
+                if ingested is None:
+                    ingested = self._parse(
+                        stored.path, filename, stored.content_hash
+                    )
+                    self.parsed += 1
+                else:
+                    self.reused += 1
+                self.bytes_saved += max(stored.size - ingested.size, 0)
+                span.set_attributes(
+                    {
+                        "csv_ingest.size": ingested.size,
+                        "csv_ingest.source_size": stored.size,
+                    }
+                )
+                return ingested
+            except Exception as e:
+                # An unparseable file is still worth sending to the agent raw.
+                logging.error(f"Failed to ingest {filename}: {e}")
+                span.record_exception(e)
+                self.failed += 1
+                return None
+            finally:
+                span.set_attributes(
+                    {f"csv_ingest.{k}": v for k, v in self.stats().items()}
+                )
+
+    def link(self, stored: StoredFile, destination: str) -> bool:
+        """Link the cached copy of stored to destination; False if evicted."""
+        return self.cache.link(stored.content_hash, destination)
+
+    def _cached(self, content_hash: str) -> Optional[IngestedFile]:
+        summary_path = self.cache.get(f"{content_hash}-summary")
+        path = self.cache.get(content_hash)
+        if summary_path is None or path is None:
+            return None
+        try:
+            with open(summary_path, encoding="utf-8") as f:
+                summary = f.read()
+            copy_hash, size = hash_file(path)
+        except FileNotFoundError:
+            # Evicted since the lookup; parse the file again.
+            return None
+        return IngestedFile(path, copy_hash, size, summary)
+
+    def _parse(
+        self, path: str, filename: str, content_hash: str
+    ) -> IngestedFile:
+        fd, copy_path = tempfile.mkstemp(
+            dir=self.cache.directory, suffix=".tmp"
+        )
+        os.close(fd)
+        try:
+            pandas = _pandas()
+            if pandas is not None:
+                rows, columns, suffix = self._parse_with_pandas(
+                    pandas, path, copy_path
+                )
+            else:
+                rows, columns, suffix = self._parse_with_csv(path, copy_path)
+        except BaseException:
+            os.remove(copy_path)
+            raise
+        summary = render_summary(filename, suffix, rows, columns)
+        fd, summary_path = tempfile.mkstemp(
+            dir=self.cache.directory, suffix=".tmp"
+        )
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(summary)
+        self.cache.put(f"{content_hash}-summary", summary_path, ".txt")
+        copy_path = self.cache.put(content_hash, copy_path, suffix)
+        copy_hash, size = hash_file(copy_path)
+        return IngestedFile(copy_path, copy_hash, size, summary)
+
+    @staticmethod
+    def _parse_with_pandas(pandas, path: str, copy_path: str):
+        frame = pandas.read_csv(
+            path, dtype=str, keep_default_na=False, encoding="utf-8-sig"
+        )
+        columns = []
+        for name in frame.columns:
+            values = frame[name].str.strip()
+            present = values != ""
+            cleaned = values.str.replace(",", "", regex=False).str.rstrip("%")
+            numbers = pandas.to_numeric(
+                cleaned.where(present), errors="coerce"
+            )
+            parsed = (
+                present
+                & values.str.fullmatch(NUMBER_PATTERN.pattern)
+                & numbers.notna()
+            )
+            garbled = present & ~parsed
+            if (
+                present.any()
+                and parsed.sum() >= NUMERIC_MIN_RATIO * present.sum()
+                and values[garbled]
+                .str.fullmatch(GARBLED_NUMBER_PATTERN.pattern)
+                .all()
+            ):
+                numbers = numbers.where(parsed)
+                frame[name] = numbers
+                columns.append(
+                    ColumnSummary(
+                        str(name),
+                        "float",
+                        int((~present).sum()),
+                        percent=bool(values[parsed].str.endswith("%").any()),
+                        minimum=float(numbers.min()),
+                        maximum=float(numbers.max()),
+                        mean=float(numbers.mean()),
+                        unparsed=int((present & ~parsed).sum()),
+                    )
+                )
+            else:
+                frame[name] = values.where(present)
+                columns.append(
+                    ColumnSummary(
+                        str(name),
+                        "str",
+                        int((~present).sum()),
+                        distinct=int(values[present].nunique()),
+                    )
+                )
+        if _has_pyarrow():
+            frame.to_parquet(copy_path, index=False)
+            return len(frame), columns, ".parquet"
+        frame.to_csv(copy_path, index=False)
+        return len(frame), columns, CSV_SUFFIX
+
+    @staticmethod
+    def _parse_with_csv(path: str, copy_path: str):
+        # Two passes: the first decides which columns are numeric, the second
+        # writes them, so rows are never held in memory.
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            parsed = [0] * len(header)
+            textual = [False] * len(header)
+            percent = [False] * len(header)
+            missing = [0] * len(header)
+            distinct = [set() for _ in header]
+            totals = [0.0] * len(header)
+            minimum = [math.inf] * len(header)
+            maximum = [-math.inf] * len(header)
+            rows = 0
+            for row in reader:
+                rows += 1
+                for i in range(len(header)):
+                    value = row[i].strip() if i < len(row) else ""
+                    if not value:
+                        missing[i] += 1
+                        continue
+                    distinct[i].add(value)
+                    number = parse_number(value)
+                    if number is None:
+                        textual[i] = textual[
+                            i
+                        ] or not GARBLED_NUMBER_PATTERN.match(value)
+                        continue
+                    parsed[i] += 1
+                    percent[i] = percent[i] or value.endswith("%")
+                    totals[i] += number
+                    minimum[i] = min(minimum[i], number)
+                    maximum[i] = max(maximum[i], number)
+        columns = []
+        numeric = []
+        for i, name in enumerate(header):
+            present = rows - missing[i]
+            numeric.append(
+                present > 0
+                and not textual[i]
+                and parsed[i] >= NUMERIC_MIN_RATIO * present
+            )
+            if numeric[i]:
+                columns.append(
+                    ColumnSummary(
+                        name,
+                        "float",
+                        missing[i],
+                        percent=percent[i],
+                        minimum=minimum[i],
+                        maximum=maximum[i],
+                        mean=totals[i] / parsed[i],
+                        unparsed=present - parsed[i],
+                    )
+                )
+            else:
+                columns.append(
+                    ColumnSummary(
+                        name, "str", missing[i], distinct=len(distinct[i])
+                    )
+                )
+        with (
+            open(path, newline="", encoding="utf-8-sig") as source,
+            open(copy_path, "w", newline="", encoding="utf-8") as target,
+        ):
+            reader = csv.reader(source)
+            writer = csv.writer(target)
+            writer.writerow(next(reader, []))
+            for row in reader:
+                writer.writerow(
+                    [
+                        (
+                            _normalize(value)
+                            if i < len(numeric) and numeric[i]
+                            else value.strip()
+                        )
+                        for i, value in enumerate(row)
+                    ]
+                )
+        return rows, columns, CSV_SUFFIX
+
+
+def _normalize(value: str) -> str:
+    number = parse_number(value)
+    if number is None:
+        return ""
+    return str(int(number)) if number.is_integer() else repr(number)
+
+
+def render_summary(
+    filename: str, suffix: str, rows: int, columns: List[ColumnSummary]
+) -> str:
+    """Describe an ingested file in a few lines for the prompt."""
+    if suffix == ".parquet":
+        reader = "a Parquet copy of {name}; read it with pandas.read_parquet"
+    else:
+        reader = "a normalized copy of {name}; read it with pandas.read_csv"
+    lines = [
+        f"The attached file is {reader.format(name=filename)}. "
+        f"It has {rows} rows and {len(columns)} columns. "
+        "Thousands separators and % signs "
+        f"were removed from numeric columns.",
+        "Columns:",
+    ]
+    lines.extend(column.describe() for column in columns[:SUMMARY_MAX_COLUMNS])
+    if len(columns) > SUMMARY_MAX_COLUMNS:
+        lines.append(f"- ... and {len(columns) - SUMMARY_MAX_COLUMNS} more")
+    return "\n".join(lines)
@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from repositories.dynamic_sessions_repository import DynamicSessionsRepository
+
+WARM_UP_CODE = "print('ready')"
+
+
+@dataclass
+class Session:
+    """A Dynamic Sessions identifier and the files already uploaded to it."""
+
+    identifier: str
+    last_used: float
+    # content hash -> file name under /mnt/data
+    files: Dict[str, str] = field(default_factory=dict)
+
+    def add_file(self, content_hash: str, filename: str):
+        """Record an upload, forgetting any older file it overwrote."""
+        for known_hash, known_name in list(self.files.items()):
+            if known_name == filename:
+                del self.files[known_hash]
+        self.files[content_hash] = filename
+
+
+class DynamicSessionsPool:
+    """Warm Dynamic Sessions identifiers leased one request at a time.
+
+    Requests for a file that is already uploaded to an idle session are
+    routed to that session so the upload can be skipped. Any other request
+    gets a session without files, so generated code never sees another
+    request's uploads under /mnt/data. Sessions idle for
+    longer than idle_ttl are dropped before the pool's own cooldown
+    reclaims them remotely.
+    """
+
+    def __init__(
+        self,
+        repository: DynamicSessionsRepository,
+        warm_size: Optional[int] = None,
+        idle_ttl: Optional[float] = None,
+        max_idle: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if warm_size is None:
+            warm_size = int(os.getenv("DYNAMIC_SESSIONS_WARM_SIZE", "2"))
+        if idle_ttl is None:
+            idle_ttl = float(
+                os.getenv("DYNAMIC_SESSIONS_IDLE_TTL_SECONDS", "240")
+            )
+        if max_idle is None:
+            max_idle = int(os.getenv("DYNAMIC_SESSIONS_MAX_IDLE", "16"))
+        self.repository = repository
+        self.warm_size = warm_size
+        self.idle_ttl = idle_ttl
+        self.max_idle = max(max_idle, warm_size)
+        self.clock = clock
+        self.affinity_hits = 0
+        self.warm_hits = 0
+        self.cold_starts = 0
+        self.recycled = 0
+        self._idle: List[Session] = []
+        self._leased = 0
+        self._warming = 0
+        self._started = False
+        self._tasks = set()
+
+    def stats(self) -> dict:
+        """Return counters suitable for span attributes."""
+        return {
+            "idle": len(self._idle),
+            "leased": self._leased,
+            "affinity_hits": self.affinity_hits,
+            "warm_hits": self.warm_hits,
+            "cold_starts": self.cold_starts,
+            "recycled": self.recycled,
+        }
+
+    def start(self):
+        """Warm warm_size sessions in the background and keep them warm."""
+        self._started = True
+        self._schedule_top_up()
+
+    async def close(self):
+        """Stop warming and forget every idle session."""
+        self._started = False
+        for task in list(self._tasks):
+            task.cancel()
+        self._idle.clear()
+
+    def acquire(self, content_hash: Optional[str] = None) -> Session:
+        """Lease a session, preferring one that already has the file."""
+        self._recycle_idle()
+        session = None
+        if content_hash is not None:
+            # Most recently used first, so hot files stay on warm sessions.
+            for candidate in reversed(self._idle):
+                if set(candidate.files) == {content_hash}:
+                    session = candidate
+                    self.affinity_hits += 1
+                    break
+        if session is None:
+            blank = [s for s in self._idle if not s.files]
+            if blank:
+                session = max(blank, key=lambda s: s.last_used)
+                self.warm_hits += 1
+        if session is None:
+            session = Session(
+                identifier=str(uuid.uuid4()), last_used=self.clock()
+            )
+            self.cold_starts += 1
+        else:
+            self._idle.remove(session)
+        self._leased += 1
+        self._schedule_top_up()
+        return session
+
+    def release(self, session: Session, healthy: bool = True):
+        """Return a leased session to the pool, or drop it if it failed."""
+        self._leased -= 1
+        if not healthy:
+            return
+        session.last_used = self.clock()
+        self._idle.append(session)
+        while len(self._idle) > self.max_idle:
+            oldest = min(self._idle, key=lambda s: s.last_used)
+            self._idle.remove(oldest)
+            self.recycled += 1
+
+    def _recycle_idle(self):
+        deadline = self.clock() - self.idle_ttl
+        expired = [s for s in self._idle if s.last_used <= deadline]
+        for session in expired:
+            self._idle.remove(session)
+        self.recycled += len(expired)
+
+    def _blank_idle(self) -> int:
+        # Only sessions without files can serve any request.
+        return sum(1 for s in self._idle if not s.files)
+
+    def _schedule_top_up(self):
+        if (
+            not self._started
+            or self._blank_idle() + self._warming >= self.warm_size
+        ):
+            return
+        task = asyncio.get_running_loop().create_task(self._top_up())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _top_up(self):
+        self._recycle_idle()
+        missing = self.warm_size - self._blank_idle() - self._warming
+        if missing <= 0:
+            return
+        self._warming += missing
+        try:
+            sessions = await asyncio.gather(
+                *(self._warm_session() for _ in range(missing)),
+                return_exceptions=True,
+            )
+        finally:
+            self._warming -= missing
+        for session in sessions:
+            if isinstance(session, Session) and self._started:
+                self._idle.append(session)
+            elif isinstance(session, BaseException):
+                logging.error(f"Failed to warm dynamic session: {session}")
+
+    async def _warm_session(self) -> Session:
+        session = Session(identifier=str(uuid.uuid4()), last_used=self.clock())
+        # The first call to an identifier allocates the remote session.
+        await self.repository.execute_code(session.identifier, WARM_UP_CODE)
+        session.last_used = self.clock()
+        return session
@@ -1,16 +1,284 @@
-import uuid
+import asyncio
+import os
+import time
 import re
+from typing import Awaitable, Callable, Optional, Tuple
+
+from starlette.datastructures import UploadFile
+
 from repositories.dynamic_sessions_repository import DynamicSessionsRepository
+from repositories.file_repository import StoredFile
+from services.dynamic_sessions_pool import DynamicSessionsPool, Session
+from services.generated_code_cache import GeneratedCodeCache
+from services.local_interpreter_pool import (
+    ExecutionResult, LocalInterpreterPool
+)
+from tracing.tracing import tracer
+from utils.csv_schema import csv_schema_fingerprint
+from utils.executor import BlockingExecutor
+from utils.hashing import hash_fileobj
+from utils.timing import stage
+
+REMOTE_BACKEND = "remote"
+LOCAL_BACKEND = "local"
+BACKENDS = (REMOTE_BACKEND, LOCAL_BACKEND)
+
+
+def rewrite_file_paths(
+    code: str, filename: str, directory: str = "/mnt/data"
+) -> str:
+    """Point the assistant's file ID path at filename inside directory."""
+    code = re.sub(r'/mnt/data/assistant-[\w-]+', f'/mnt/data/{filename}', code)
+    if directory != "/mnt/data":
+        code = code.replace("/mnt/data", directory)
+    return code
+
 
 class DynamicSessionsService:
-    def __init__(self, repository: DynamicSessionsRepository):
+    def __init__(
+        self,
+        repository: DynamicSessionsRepository,
+        pool: Optional[DynamicSessionsPool] = None,
+        executor: Optional[BlockingExecutor] = None,
+        local_pool: Optional[LocalInterpreterPool] = None,
+        default_backend: Optional[str] = None,
+        code_cache: Optional[GeneratedCodeCache] = None,
+    ):
+        if default_backend is None:
+            default_backend = os.getenv(
+                "DYNAMIC_SESSIONS_BACKEND", REMOTE_BACKEND
+            )
         self.repository = repository
+        self.pool = pool or DynamicSessionsPool(repository, warm_size=0)
+        self.executor = executor or BlockingExecutor()
+        # Only the remote backend is available unless an enabled local pool is
+        # injected.
+        self.local_pool = local_pool
+        self.default_backend = default_backend
+        # Generated code is always regenerated unless a cache is injected.
+        self.code_cache = code_cache
+
+    async def run(
+        self,
+        file,
+        message: str,
+        generate_code: Callable[[], Awaitable[str]],
+        content_hash: Optional[str] = None,
+        backend: Optional[str] = None,
+    ) -> ExecutionResult:
+        """Run code for message against file, generating it on a cache miss.
+
+        Code is cached by the file's CSV schema and the normalized message
+        once it has run without error, and dropped again if a later run of
+        it fails. On the remote backend the file is uploaded to a session
+        while the code is generated, so generate_code must not read file.
+        """
+        backend = self._backend(backend)
+        with tracer.start_as_current_span("generate_and_execute") as span:
+            key = None
+            if self.code_cache is not None:
+                fingerprint = await self.executor.run(
+                    csv_schema_fingerprint, file.file, file.filename
+                )
+                if fingerprint is not None:
+                    key = self.code_cache.key(fingerprint, message)
+            code = self.code_cache.get(key) if key is not None else None
+            cached = code is not None
+            span.set_attribute("code_cache.hit", cached)
+            started = time.perf_counter()
+            staging = None
+            upload_finished = [started]
+            if backend == REMOTE_BACKEND:
+                staging = asyncio.ensure_future(
+                    self.stage_remote(file, content_hash)
+                )
+                staging.add_done_callback(
+                    lambda _: upload_finished.append(time.perf_counter())
+                )
+            try:
+                if not cached:
+                    with tracer.start_as_current_span("generate_code"):
+                        code = await generate_code()
+                generate_seconds = time.perf_counter() - started
+                if staging is not None:
+                    session, filename = await staging
+            except BaseException:
+                if staging is not None:
+                    await self._abandon(staging)
+                raise
+            # Run one after the other, generation and upload would have
+            # taken their sum; overlapped, only the longer one counts.
+            upload_seconds = upload_finished[-1] - started
+            span.set_attributes(
+                {
+                    "overlap.generate_seconds": generate_seconds,
+                    "overlap.upload_seconds": upload_seconds,
+                    "overlap.saved_seconds": generate_seconds
+                    + upload_seconds
+                    - max(generate_seconds, upload_seconds),
+                }
+            )
+            succeeded = False
+            try:
+                if staging is not None:
+                    result = await self.execute_staged(session, filename, code)
+                else:
+                    result = await self.execute(
+                        file, code, content_hash, backend
+                    )
+                succeeded = result.error is None
+                return result
+            finally:
+                if key is not None:
+                    if succeeded and not cached:
+                        self.code_cache.put(key, code)
+                    elif not succeeded:
+                        self.code_cache.invalidate(key)
+                    span.set_attributes(
+                        {
+                            f"code_cache.{k}": v
+                            for k, v in self.code_cache.stats().items()
+                        }
+                    )
+
+    async def run_stored(
+        self,
+        stored: StoredFile,
+        filename: str,
+        message: str,
+        generate_code: Callable[[], Awaitable[str]],
+        backend: Optional[str] = None,
+    ) -> ExecutionResult:
+        """Like run, for an upload already spooled to disk by store_upload.
+
+        The session upload reads its own handle on the spooled file, so
+        generate_code can read stored.path at the same time.
+        """
+        with open(stored.path, "rb") as f:
+            return await self.run(
+                UploadFile(file=f, filename=filename),
+                message,
+                generate_code,
+                content_hash=stored.content_hash,
+                backend=backend,
+            )
+
+    async def execute(
+        self,
+        file,
+        code: str,
+        content_hash: Optional[str] = None,
+        backend: Optional[str] = None,
+    ) -> ExecutionResult:
+        """Run code against file on the named backend, or the default one."""
+        backend = self._backend(backend)
+        if backend == REMOTE_BACKEND:
+            return await self.execute_remote(file, code, content_hash)
+        # The worker runs in a directory holding the file, so paths are
+        # relative.
+        code = rewrite_file_paths(
+            code, os.path.basename(file.filename or "") or "upload", "."
+        )
+        with stage("local_interpreter_execute"):
+            return await self.local_pool.execute(code, file)
+
+    async def process_dynamic_session(
+        self, file, code: str, content_hash: Optional[str] = None
+    ) -> str:
+        result = await self.execute_remote(file, code, content_hash)
+        return result.session_id
+
+    async def execute_remote(
+        self, file, code: str, content_hash: Optional[str] = None
+    ) -> ExecutionResult:
+        """Run code against file in a pooled Dynamic Sessions session."""
+        with tracer.start_as_current_span("process_dynamic_session"):
+            session, filename = await self.stage_remote(file, content_hash)
+            return await self.execute_staged(session, filename, code)
+
+    async def stage_remote(
+        self, file, content_hash: Optional[str] = None
+    ) -> Tuple[Session, str]:
+        """Lease a session holding file; return it and the file's name there.
+
+        The caller must pass the session to execute_staged, or release it.
+        """
+        with tracer.start_as_current_span(
+            "stage_dynamic_session_file"
+        ) as span:
+            if content_hash is None:
+                content_hash, _ = await self.executor.run(
+                    hash_fileobj, file.file
+                )
+            session = self.pool.acquire(content_hash)
+            try:
+                filename = session.files.get(content_hash)
+                span.set_attribute(
+                    "dynamic_sessions.file_reused", filename is not None
+                )
+                if filename is None:
+                    file.file.seek(0)
+                    with stage("dynamic_sessions_upload"):
+                        await self.repository.upload_file(
+                            session.identifier, file
+                        )
+                    filename = file.filename
+                    session.add_file(content_hash, filename)
+            except BaseException:
+                self.pool.release(session, healthy=False)
+                raise
+            return session, filename
+
+    async def execute_staged(
+        self, session: Session, filename: str, code: str
+    ) -> ExecutionResult:
+        """Run code in a session from stage_remote, then release it."""
+        with tracer.start_as_current_span("execute_in_session") as span:
+            healthy = False
+            try:
+                code = rewrite_file_paths(code, filename)
+                with stage("dynamic_sessions_execute"):
+                    properties = await self.repository.execute_code(
+                        session.identifier, code
+                    )
+                healthy = True
+            finally:
+                # Sessions that failed are dropped rather than reused.
+                self.pool.release(session, healthy=healthy)
+                span.set_attributes(
+                    {
+                        f"dynamic_sessions.pool.{k}": v
+                        for k, v in self.pool.stats().items()
+                    }
+                )
+            # The session itself is fine when the code raised.
+            error = None
+            if properties and properties.get("status") == "Failure":
+                error = properties.get("stderr") or "Execution failed"
+            return ExecutionResult(
+                backend=REMOTE_BACKEND,
+                session_id=session.identifier,
+                error=error,
+            )
+
+    def supports(self, backend: str) -> bool:
+        """Return whether backend is known and, if local, enabled here."""
+        if backend == LOCAL_BACKEND:
+            return self.local_pool is not None and self.local_pool.enabled
+        return backend in BACKENDS
+
+    def _backend(self, backend: Optional[str]) -> str:
+        backend = backend or self.default_backend
+        if not self.supports(backend):
+            raise ValueError(f"Unsupported execution backend: {backend}")
+        return backend
 
-    def process_dynamic_session(self, file, code: str) -> str:
-        session_id = str(uuid.uuid4())
-        self.repository.upload_file(session_id, file)
-        file_path_pattern = r'/mnt/data/assistant-[\w-]+'
-        file_path_replacement = f'/mnt/data/{file.filename}'
-        code = re.sub(file_path_pattern, file_path_replacement, code)
-        self.repository.execute_code(session_id, code)
-        return session_id
\ No newline at end of file
+    async def _abandon(self, staging: "asyncio.Future"):
+        # Generation failed: stop the upload, or return its session unused.
+        staging.cancel()
+        try:
+            session, _ = await staging
+        except BaseException:
+            # stage_remote already dropped the session.
+            return
+        self.pool.release(session)
@@ -1,11 +1,28 @@
 import logging
-import shutil
+import os
 from pathlib import Path
+from typing import Optional
 from fastapi import UploadFile
+from tracing.tracing import tracer
+from utils.executor import BlockingExecutor
+from utils.file_copy import copy_upload
 
 class FileUploadService:
-    def __init__(self, base_dir: Path):
+    def __init__(
+        self,
+        base_dir: Path,
+        executor: Optional[BlockingExecutor] = None,
+        chunk_size: Optional[int] = None,
+    ):
         self.base_dir = base_dir
+        self.executor = executor or BlockingExecutor()
+        if chunk_size is None:
+            chunk_size = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+        self.chunk_size = chunk_size
+
+    async def upload_file_async(self, file: UploadFile, sub_dir: str) -> str:
+        """Upload a file without blocking the event loop."""
+        return await self.executor.run(self.upload_file, file, sub_dir)
 
     def upload_file(self, file: UploadFile, sub_dir: str) -> str:
         target_dir: Path = self.base_dir / sub_dir
@@ -13,9 +30,18 @@ class FileUploadService:
             target_dir.mkdir(parents=True, exist_ok=True)
         save_path: Path = target_dir / file.filename
         try:
-            with open(save_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
+            with tracer.start_as_current_span("upload_file") as span:
+                with open(save_path, "wb") as buffer:
+                    size, method = copy_upload(
+                        file.file, buffer, self.chunk_size
+                    )
+                span.set_attributes(
+                    {
+                        "upload.bytes": size,
+                        "upload.copy_method": method,
+                    }
+                )
         except Exception as e:
             logging.error(e)
             raise Exception(e)
-        return file.filename
\ No newline at end of file
+        return file.filename
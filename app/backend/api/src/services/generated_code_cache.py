@@ -0,0 +1,69 @@
+import hashlib
+import os
+import re
+import unicodedata
+from typing import Optional
+
+from utils.cache import TTLCache
+
+
+def normalize_message(message: str) -> str:
+    """Fold width, case and whitespace so equivalent questions match."""
+    message = unicodedata.normalize("NFKC", message).casefold()
+    return re.sub(r"\s+", " ", message).strip()
+
+
+class GeneratedCodeCache:
+    """Map from (CSV schema, normalized message) to code that ran successfully.
+
+    Files with the same columns asked the same question usually get the same
+    code back from the agent, so a hit lets the caller skip the agent run.
+    Entries expire after ttl_seconds and are evicted least recently used
+    first; callers invalidate entries whose code later fails.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+    ):
+        if max_entries is None:
+            max_entries = int(
+                os.getenv("GENERATED_CODE_CACHE_MAX_ENTRIES", "256")
+            )
+        if ttl_seconds is None:
+            ttl_seconds = float(
+                os.getenv("GENERATED_CODE_CACHE_TTL_SECONDS", "86400")
+            )
+        self.invalidations = 0
+        self._cache = TTLCache(max_entries, ttl_seconds)
+
+    @staticmethod
+    def key(schema_fingerprint: str, message: str) -> str:
+        """Return the cache key for a schema fingerprint and a user message."""
+        payload = f"{schema_fingerprint}\n{normalize_message(message)}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached code for key, or None."""
+        return self._cache.get(key)
+
+    def put(self, key: str, code: str):
+        """Remember code as the answer for key."""
+        self._cache.put(key, code)
+
+    def invalidate(self, key: str):
+        """Forget key, for example after its code failed to run."""
+        if self._cache.pop(key) is not None:
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        """Return counters suitable for span attributes."""
+        return {
+            "entries": len(self._cache),
+            "hits": self._cache.hits,
+            "misses": self._cache.misses,
+            "hit_ratio": self._cache.hit_ratio,
+            "evictions": self._cache.evictions,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,215 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from tracing.tracing import tracer
+from utils.timing import collect_stage_timings
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue already holds max_queue_depth jobs."""
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+@dataclass
+class Job:
+    """A unit of background work and how long each part of it took."""
+
+    identifier: str
+    kind: str
+    submitted_at: float
+    status: JobStatus = JobStatus.QUEUED
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Any = None
+    error: Optional[str] = None
+    # stage name -> seconds
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def done(self) -> bool:
+        return self.status in (JobStatus.SUCCEEDED, JobStatus.FAILED)
+
+    def to_dict(self) -> dict:
+        """Return the status view exposed by the API, without the result."""
+        timings = dict(self.timings)
+        if self.started_at is not None:
+            timings["queue_wait"] = self.started_at - self.submitted_at
+        if self.finished_at is not None:
+            timings["run"] = self.finished_at - self.started_at
+            timings["total"] = self.finished_at - self.submitted_at
+        return {
+            "job_id": self.identifier,
+            "kind": self.kind,
+            "status": self.status.value,
+            "error": self.error,
+            "timings": timings,
+        }
+
+
+@dataclass
+class _Entry:
+    job: Job
+    func: Callable[[], Awaitable[Any]]
+    cleanup: Optional[Callable[[], None]]
+
+
+class JobQueue:
+    """In-memory job queue drained by a fixed number of asyncio workers.
+
+    At most max_workers jobs run at once; submit() rejects new jobs once
+    max_queue_depth are waiting. Finished jobs are kept for retention
+    seconds so their status and result can be fetched.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        max_queue_depth: Optional[int] = None,
+        retention: Optional[float] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        if max_workers is None:
+            max_workers = int(os.getenv("JOB_MAX_WORKERS", "4"))
+        if max_queue_depth is None:
+            max_queue_depth = int(os.getenv("JOB_MAX_QUEUE_DEPTH", "100"))
+        if retention is None:
+            retention = float(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+        self.max_workers = max_workers
+        self.max_queue_depth = max_queue_depth
+        self.retention = retention
+        self.clock = clock
+        self.rejected = 0
+        self._jobs: Dict[str, Job] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers = []
+
+    def stats(self) -> dict:
+        """Return counters suitable for span attributes."""
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "running": sum(
+                1
+                for job in self._jobs.values()
+                if job.status == JobStatus.RUNNING
+            ),
+            "jobs": len(self._jobs),
+            "rejected": self.rejected,
+        }
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def full(self) -> bool:
+        return self._queue is not None and self._queue.full()
+
+    def submit(
+        self,
+        kind: str,
+        func: Callable[[], Awaitable[Any]],
+        cleanup: Optional[Callable[[], None]] = None,
+        timings: Optional[Dict[str, float]] = None,
+    ) -> Job:
+        """Queue func to run on a worker and return its job immediately.
+
+        cleanup runs if the job is dropped at shutdown before it started.
+        """
+        self._start()
+        self._purge_finished()
+        job = Job(
+            identifier=str(uuid.uuid4()),
+            kind=kind,
+            submitted_at=self.clock(),
+            timings=dict(timings or {}),
+        )
+        try:
+            self._queue.put_nowait(_Entry(job, func, cleanup))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise QueueFullError(
+                f"{self.max_queue_depth} jobs are already queued"
+            )
+        self._jobs[job.identifier] = job
+        return job
+
+    async def close(self):
+        """Stop the workers and release jobs that never started."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        while self._queue is not None and not self._queue.empty():
+            entry = self._queue.get_nowait()
+            entry.job.status = JobStatus.FAILED
+            entry.job.error = "Cancelled at shutdown"
+            if entry.cleanup is not None:
+                entry.cleanup()
+        self._queue = None
+
+    def _start(self):
+        # The queue is bound to the running loop, so create it on first use.
+        if self._queue is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_depth)
+        loop = asyncio.get_running_loop()
+        self._workers = [
+            loop.create_task(self._work()) for _ in range(self.max_workers)
+        ]
+
+    async def _work(self):
+        while True:
+            entry = await self._queue.get()
+            try:
+                await self._run(entry.job, entry.func)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job, func: Callable[[], Awaitable[Any]]):
+        job.status = JobStatus.RUNNING
+        job.started_at = self.clock()
+        with tracer.start_as_current_span("run_job") as span:
+            span.set_attributes(
+                {
+                    "job.id": job.identifier,
+                    "job.kind": job.kind,
+                    "job.queue_wait": job.started_at - job.submitted_at,
+                }
+            )
+            try:
+                with collect_stage_timings(job.timings):
+                    job.result = await func()
+                job.status = JobStatus.SUCCEEDED
+            except asyncio.CancelledError:
+                # The worker was cancelled, as at shutdown; finish the job so
+                # it can be reported and purged.
+                job.error = "Cancelled while running"
+                job.status = JobStatus.FAILED
+                raise
+            except Exception as e:
+                logging.error(f"Job {job.identifier} failed: {e}")
+                span.record_exception(e)
+                job.error = str(e)
+                job.status = JobStatus.FAILED
+            finally:
+                job.finished_at = self.clock()
+
+    def _purge_finished(self):
+        deadline = self.clock() - self.retention
+        expired = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.done and job.finished_at <= deadline
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
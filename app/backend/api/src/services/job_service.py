@@ -0,0 +1,82 @@
+from typing import Optional
+
+from repositories.file_repository import StoredFile
+from services.code_interpreter_service import CodeInterpreterService
+from services.dynamic_sessions_service import DynamicSessionsService
+from services.job_queue import Job, JobQueue, QueueFullError
+from utils.timing import collect_stage_timings, stage
+
+CODE_INTERPRETER_JOB = "code_interpreter"
+DYNAMIC_SESSIONS_JOB = "dynamic_sessions"
+
+
+class JobService:
+    """Submits code interpreter and Dynamic Sessions work as background jobs.
+
+    The upload is written to disk before the job is queued, because the
+    request's UploadFile is closed as soon as the response is sent.
+    """
+
+    def __init__(
+        self,
+        job_queue: JobQueue,
+        code_interpreter_service: CodeInterpreterService,
+        dynamic_sessions_service: DynamicSessionsService,
+    ):
+        self.job_queue = job_queue
+        self.code_interpreter_service = code_interpreter_service
+        self.dynamic_sessions_service = dynamic_sessions_service
+
+    async def submit_code_interpreter(self, file, user_message: str) -> Job:
+        async def run(stored: StoredFile):
+            return await self.code_interpreter_service.process_stored_file(
+                stored, user_message
+            )
+
+        return await self._submit(CODE_INTERPRETER_JOB, file, run)
+
+    async def submit_dynamic_sessions(
+        self, file, user_message: str, backend: Optional[str] = None
+    ) -> Job:
+        filename = file.filename
+
+        async def run(stored: StoredFile):
+            try:
+                with stage("process_dynamic_session"):
+                    result = await self.dynamic_sessions_service.run_stored(
+                        stored,
+                        filename,
+                        user_message,
+                        lambda: self.code_interpreter_service.generate_code(
+                            stored, user_message
+                        ),
+                        backend=backend,
+                    )
+                return result.to_dict()
+            finally:
+                self.code_interpreter_service.delete_stored(stored.path)
+
+        return await self._submit(DYNAMIC_SESSIONS_JOB, file, run)
+
+    def get(self, job_id: str):
+        return self.job_queue.get(job_id)
+
+    async def _submit(self, kind: str, file, run) -> Job:
+        if self.job_queue.full():
+            # Reject before spending time and disk on the upload.
+            self.job_queue.rejected += 1
+            raise QueueFullError(
+                f"{self.job_queue.max_queue_depth} jobs are already queued"
+            )
+        with collect_stage_timings() as timings:
+            stored = await self.code_interpreter_service.store_upload(file)
+        delete = lambda: self.code_interpreter_service.delete_stored(
+            stored.path
+        )
+        try:
+            return self.job_queue.submit(
+                kind, lambda: run(stored), cleanup=delete, timings=timings
+            )
+        except QueueFullError:
+            delete()
+            raise
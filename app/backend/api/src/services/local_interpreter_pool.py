@@ -0,0 +1,430 @@
+import asyncio
+import base64
+import json
+import logging
+import os
+import shutil
+import signal
+import sys
+import tempfile
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from tracing.tracing import tracer
+from utils.executor import BlockingExecutor
+
+WORKER_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "local_interpreter_worker.py"
+)
+# Replies carry base64 images, so allow long lines.
+REPLY_LIMIT_BYTES = 64 * 1024 * 1024
+# Importing pandas and matplotlib can take a while on a cold disk.
+SPAWN_TIMEOUT_SECONDS = 60
+# How long a worker may take to report a child killed on timeout.
+CHILD_EXIT_TIMEOUT_SECONDS = 5
+
+
+class ExecutionError(Exception):
+    """Raised when an interpreter failed to start, or hit a limit mid-run."""
+
+
+@dataclass
+class ExecutionResult:
+    """What running generated code produced."""
+
+    backend: str
+    session_id: Optional[str] = None
+    stdout: str = ""
+    stderr: str = ""
+    error: Optional[str] = None
+    # (file name, content)
+    images: List[Tuple[str, bytes]] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        """Return the API view; remote runs only report their session."""
+        if self.backend != "local":
+            return {"session_id": self.session_id}
+        return {
+            "session_id": self.session_id,
+            "backend": self.backend,
+            "stdout": self.stdout,
+            "stderr": self.stderr,
+            "error": self.error,
+            "images": [
+                {
+                    "name": name,
+                    "content": base64.b64encode(content).decode("ascii"),
+                }
+                for name, content in self.images
+            ],
+        }
+
+
+@dataclass
+class _Worker:
+    """A warm parent process that forks one child per execution."""
+
+    process: asyncio.subprocess.Process
+    # The pid of the child running the current execution, if any.
+    child: Optional[int] = None
+
+
+class LocalInterpreterPool:
+    """Warm local Python processes that run generated code under limits.
+
+    Each worker is a parent process with pandas and matplotlib imported
+    already. It never runs generated code itself: every execution runs in a
+    fresh child forked from it, in its own directory, with an empty
+    environment, an address-space cap of memory_bytes and cpu_seconds of CPU
+    time, and is killed after timeout seconds. Each concurrent execution
+    also gets its own uid from uid_base onwards, so runs cannot read the
+    service's environment through /proc, each other's files or other
+    requests' uploads, or signal each other's processes, and whatever a run
+    started is killed when it ends; the Python install and its packages
+    must be readable by those uids. Switching uids needs root, so without
+    it the pool stays disabled unless allow_shared_uid (default
+    LOCAL_INTERPRETER_ALLOW_SHARED_UID) accepts runs that can read the
+    service's credentials. Even with separate uids this is not an isolation
+    boundary like the remote sessions, so the pool refuses to run anything
+    unless enabled, which defaults to LOCAL_INTERPRETER_ENABLED.
+    """
+
+    def __init__(
+        self,
+        enabled: Optional[bool] = None,
+        warm_size: Optional[int] = None,
+        max_workers: Optional[int] = None,
+        cpu_seconds: Optional[int] = None,
+        memory_bytes: Optional[int] = None,
+        timeout: Optional[float] = None,
+        uid_base: Optional[int] = None,
+        allow_shared_uid: Optional[bool] = None,
+        work_dir: Optional[str] = None,
+        executor: Optional[BlockingExecutor] = None,
+    ):
+        if enabled is None:
+            enabled = (
+                os.getenv("LOCAL_INTERPRETER_ENABLED", "false").lower()
+                == "true"
+            )
+        if warm_size is None:
+            warm_size = int(os.getenv("LOCAL_INTERPRETER_WARM_SIZE", "2"))
+        if max_workers is None:
+            max_workers = int(
+                os.getenv(
+                    "LOCAL_INTERPRETER_MAX_WORKERS", str(os.cpu_count() or 2)
+                )
+            )
+        if cpu_seconds is None:
+            cpu_seconds = int(os.getenv("LOCAL_INTERPRETER_CPU_SECONDS", "30"))
+        if memory_bytes is None:
+            memory_bytes = int(
+                os.getenv(
+                    "LOCAL_INTERPRETER_MEMORY_BYTES",
+                    str(2 * 1024 * 1024 * 1024),
+                )
+            )
+        if timeout is None:
+            timeout = float(
+                os.getenv("LOCAL_INTERPRETER_TIMEOUT_SECONDS", "60")
+            )
+        if uid_base is None:
+            uid_base = int(os.getenv("LOCAL_INTERPRETER_UID_BASE", "100000"))
+        if allow_shared_uid is None:
+            allow_shared_uid = (
+                os.getenv(
+                    "LOCAL_INTERPRETER_ALLOW_SHARED_UID", "false"
+                ).lower()
+                == "true"
+            )
+        if work_dir is None:
+            work_dir = os.getenv(
+                "LOCAL_INTERPRETER_WORK_DIR",
+                os.path.join(tempfile.gettempdir(), "interpreter"),
+            )
+        self.warm_size = min(warm_size, max_workers)
+        self.max_workers = max_workers
+        self.cpu_seconds = cpu_seconds
+        self.memory_bytes = memory_bytes
+        self.timeout = timeout
+        # Only root can switch users.
+        self.uid_base = (
+            uid_base if uid_base > 0 and os.geteuid() == 0 else None
+        )
+        if enabled and self.uid_base is None and not allow_shared_uid:
+            logging.error(
+                "Local interpreter off: runs would share the service uid; "
+                "run as root or set LOCAL_INTERPRETER_ALLOW_SHARED_UID=true"
+            )
+            enabled = False
+        self.enabled = enabled
+        self.work_dir = work_dir
+        self.executor = executor or BlockingExecutor()
+        self.spawned = 0
+        self.executions = 0
+        self.killed = 0
+        self._idle: List[_Worker] = []
+        self._busy = 0
+        self._warming = 0
+        self._started = False
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._free_uids: List[int] = []
+        if self.uid_base is not None:
+            self._free_uids = list(
+                range(self.uid_base, self.uid_base + max_workers)
+            )
+        self._tasks = set()
+
+    def stats(self) -> dict:
+        """Return counters suitable for span attributes."""
+        return {
+            "idle": len(self._idle),
+            "busy": self._busy,
+            "spawned": self.spawned,
+            "executions": self.executions,
+            "killed": self.killed,
+        }
+
+    def start(self):
+        """Spawn warm_size workers in the background and keep them warm."""
+        if not self.enabled:
+            return
+        self._started = True
+        self._schedule_top_up()
+
+    async def close(self):
+        """Stop warming and end every idle worker."""
+        self._started = False
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        idle, self._idle = self._idle, []
+        for worker in idle:
+            await self._kill(worker)
+
+    async def execute(self, code: str, file=None) -> ExecutionResult:
+        """Run code in a fresh child, in a directory holding file if given."""
+        if not self.enabled:
+            raise ExecutionError(
+                "The local interpreter is disabled; "
+                "set LOCAL_INTERPRETER_ENABLED=true"
+            )
+        if not self._started:
+            self.start()
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)
+        with tracer.start_as_current_span("execute_local") as span:
+            async with self._slots:
+                # There are as many uids as slots, so one is always free.
+                uid = self._free_uids.pop() if self._free_uids else None
+                directory = await self.executor.run(
+                    self._prepare_directory, file
+                )
+                self._busy += 1
+                worker = None
+                try:
+                    worker = await self._acquire()
+                    self.executions += 1
+                    try:
+                        return await self._run(worker, code, directory, uid)
+                    except ExecutionError as e:
+                        # The run hit a limit or died; report it like any other
+                        # error.
+                        span.record_exception(e)
+                        return ExecutionResult(backend="local", error=str(e))
+                finally:
+                    if worker is not None:
+                        if (
+                            worker.child is None
+                            and worker.process.returncode is None
+                        ):
+                            self._idle.append(worker)
+                        else:
+                            await self._kill(worker)
+                    if uid is not None:
+                        self._free_uids.append(uid)
+                    self._busy -= 1
+                    self._schedule_top_up()
+                    await self.executor.run(shutil.rmtree, directory, True)
+                    span.set_attributes(
+                        {
+                            f"local_interpreter.{k}": v
+                            for k, v in self.stats().items()
+                        }
+                    )
+
+    async def _acquire(self) -> _Worker:
+        while self._idle:
+            worker = self._idle.pop()
+            if worker.process.returncode is None:
+                return worker
+        return await self._spawn()
+
+    async def _run(
+        self, worker: _Worker, code: str, directory: str, uid: Optional[int]
+    ) -> ExecutionResult:
+        """Run code in a child of worker, clearing worker.child on exit."""
+        request = (
+            json.dumps({"code": code, "cwd": directory, "uid": uid}) + "\n"
+        )
+        worker.process.stdin.write(request.encode("utf-8"))
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        try:
+            await worker.process.stdin.drain()
+            line = await asyncio.wait_for(
+                worker.process.stdout.readline(), self.timeout
+            )
+            if line:
+                worker.child = json.loads(line)["pid"]
+                line = await asyncio.wait_for(
+                    worker.process.stdout.readline(),
+                    max(deadline - loop.time(), 0),
+                )
+        except asyncio.TimeoutError:
+            if worker.child is not None:
+                await self._kill_child(worker)
+            raise ExecutionError(f"Time limit of {self.timeout}s exceeded")
+        except (BrokenPipeError, ConnectionResetError):
+            line = b""
+        if not line:
+            returncode = await worker.process.wait()
+            raise ExecutionError(f"Interpreter exited with code {returncode}")
+        worker.child = None
+        reply = json.loads(line)
+        if "exit_code" in reply:
+            if reply["exit_code"] == -signal.SIGXCPU:
+                raise ExecutionError(
+                    f"CPU time limit of {self.cpu_seconds}s exceeded"
+                )
+            raise ExecutionError(
+                f"Interpreter exited with code {reply['exit_code']}"
+            )
+        return ExecutionResult(
+            backend="local",
+            stdout=reply["stdout"],
+            stderr=reply["stderr"],
+            error=reply["error"],
+            images=[
+                (image["name"], base64.b64decode(image["content"]))
+                for image in reply["images"]
+            ],
+        )
+
+    async def _kill_child(self, worker: _Worker):
+        self.killed += 1
+        try:
+            os.killpg(worker.child, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        # The parent reports the killed child, and stays usable once it has.
+        try:
+            line = await asyncio.wait_for(
+                worker.process.stdout.readline(), CHILD_EXIT_TIMEOUT_SECONDS
+            )
+        except asyncio.TimeoutError:
+            return
+        if line:
+            worker.child = None
+
+    async def _spawn(self) -> _Worker:
+        os.makedirs(self.work_dir, mode=0o700, exist_ok=True)
+        env = {
+            "PATH": os.environ.get("PATH", ""),
+            "HOME": self.work_dir,
+            "LC_ALL": "C.UTF-8",
+            "MPLBACKEND": "Agg",
+            "MPLCONFIGDIR": os.path.join(self.work_dir, ".matplotlib"),
+            "OMP_NUM_THREADS": "1",
+            "OPENBLAS_NUM_THREADS": "1",
+        }
+        process = await asyncio.create_subprocess_exec(
+            sys.executable,
+            "-I",
+            WORKER_PATH,
+            str(self.memory_bytes),
+            str(self.cpu_seconds),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            cwd=self.work_dir,
+            env=env,
+            start_new_session=True,
+            limit=REPLY_LIMIT_BYTES,
+        )
+        worker = _Worker(process)
+        try:
+            ready = await asyncio.wait_for(
+                process.stdout.readline(), SPAWN_TIMEOUT_SECONDS
+            )
+        except BaseException:
+            await self._kill(worker)
+            raise
+        error = json.loads(ready).get("error") if ready else None
+        if not ready or error:
+            await self._kill(worker)
+            raise ExecutionError(
+                error
+                or f"Interpreter failed to start with code "
+                f"{process.returncode}"
+            )
+        self.spawned += 1
+        return worker
+
+    async def _kill(self, worker: _Worker):
+        if worker.child is not None:
+            # Children lead their own process groups.
+            try:
+                os.killpg(worker.child, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        if worker.process.returncode is None:
+            self.killed += 1
+            try:
+                # The worker leads its own session, so this also ends its
+                # children.
+                os.killpg(worker.process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        await worker.process.wait()
+
+    def _prepare_directory(self, file) -> str:
+        os.makedirs(self.work_dir, mode=0o700, exist_ok=True)
+        directory = tempfile.mkdtemp(dir=self.work_dir)
+        if file is not None:
+            name = os.path.basename(file.filename or "") or "upload"
+            file.file.seek(0)
+            with open(os.path.join(directory, name), "wb") as f:
+                shutil.copyfileobj(file.file, f)
+        return directory
+
+    def _schedule_top_up(self):
+        if (
+            not self._started
+            or len(self._idle) + self._warming >= self.warm_size
+        ):
+            return
+        task = asyncio.get_running_loop().create_task(self._top_up())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _top_up(self):
+        missing = self.warm_size - len(self._idle) - self._warming
+        if missing <= 0:
+            return
+        self._warming += missing
+        try:
+            workers = await asyncio.gather(
+                *(self._spawn() for _ in range(missing)),
+                return_exceptions=True,
+            )
+        finally:
+            self._warming -= missing
+        for worker in workers:
+            if isinstance(worker, _Worker):
+                if self._started:
+                    self._idle.append(worker)
+                else:
+                    await self._kill(worker)
+            elif isinstance(worker, BaseException):
+                logging.error(f"Failed to start local interpreter: {worker}")
@@ -0,0 +1,251 @@
+"""Warm parent process used by LocalInterpreterPool.
+
+Runs standalone (python -I local_interpreter_worker.py MEMORY CPU) and talks
+JSON lines: one request per line on stdin, and for each request a line with
+the pid of the child running it followed by a line with its result on
+stdout. The protocol uses private copies of the original stdin and stdout.
+
+The parent imports pandas and matplotlib once and never runs generated code
+itself. Every request runs in a child forked from it, which moves into the
+request's directory, drops to the request's uid when one is given, caps its
+own memory and CPU time and exits when done, so nothing a run leaves behind
+reaches the next one.
+"""
+
+import base64
+import io
+import json
+import os
+import resource
+import select
+import signal
+import sys
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+
+MAX_OUTPUT_CHARS = 1_000_000
+IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg", ".svg")
+# Processes a run may have at once when it has its own uid.
+MAX_PROCESSES = 64
+# How often the parent checks whether a silent child has exited.
+POLL_SECONDS = 0.1
+RESULT_FD = 3
+
+
+def warm_up():
+    """Import what generated code usually needs so requests skip the cost.
+
+    Raises ImportError when one is missing: data frames and charts are what
+    the local backend is for, so an install without them is broken.
+    """
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    for name in ("numpy", "pandas", "matplotlib.pyplot"):
+        __import__(name)
+
+
+def drop_privileges(uid: int):
+    """Hand the current directory to uid and become it, for good."""
+    for name in os.listdir("."):
+        os.chown(name, uid, uid, follow_symlinks=False)
+    os.chown(".", uid, uid)
+    os.setgroups([])
+    os.setgid(uid)
+    os.setuid(uid)
+    resource.setrlimit(resource.RLIMIT_NPROC, (MAX_PROCESSES, MAX_PROCESSES))
+
+
+def limit_resources(memory_bytes: int, cpu_seconds: int):
+    """Cap this child's memory and CPU time.
+
+    A fresh child has used no CPU time yet. The soft limit sends SIGXCPU,
+    which ends the process; without root the hard limits cannot be raised
+    again, so generated code cannot lift them.
+    """
+    if memory_bytes > 0:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+    if cpu_seconds > 0:
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+
+
+def collect_images(before: set) -> list:
+    """Return new image files in the current directory.
+
+    Without any, open matplotlib figures are rendered instead.
+    """
+    images = []
+    for name in sorted(set(os.listdir(".")) - before):
+        if name.lower().endswith(IMAGE_SUFFIXES):
+            with open(name, "rb") as f:
+                images.append(
+                    {
+                        "name": name,
+                        "content": base64.b64encode(f.read()).decode("ascii"),
+                    }
+                )
+    pyplot = sys.modules.get("matplotlib.pyplot")
+    if pyplot is None or images:
+        return images
+    for number in pyplot.get_fignums():
+        buffer = io.BytesIO()
+        pyplot.figure(number).savefig(buffer, format="png")
+        images.append(
+            {
+                "name": f"figure_{number}.png",
+                "content": base64.b64encode(buffer.getvalue()).decode("ascii"),
+            }
+        )
+    return images
+
+
+def run(code: str) -> dict:
+    before = set(os.listdir("."))
+    stdout, stderr = io.StringIO(), io.StringIO()
+    error = None
+    with redirect_stdout(stdout), redirect_stderr(stderr):
+        try:
+            exec(
+                compile(code, "<generated>", "exec"), {"__name__": "__main__"}
+            )
+        except MemoryError:
+            error = "Memory limit exceeded"
+        except BaseException:
+            # SystemExit and KeyboardInterrupt are reported like any error.
+            error = traceback.format_exc()
+    try:
+        images = collect_images(before)
+    except Exception:
+        images = []
+        error = error or traceback.format_exc()
+    return {
+        "stdout": stdout.getvalue()[:MAX_OUTPUT_CHARS],
+        "stderr": stderr.getvalue()[:MAX_OUTPUT_CHARS],
+        "error": error,
+        "images": images,
+    }
+
+
+def child(request: dict, memory_bytes: int, cpu_seconds: int, result_fd: int):
+    # Keep only the result pipe, so the run cannot touch the protocol.
+    os.dup2(result_fd, RESULT_FD)
+    os.closerange(RESULT_FD + 1, os.sysconf("SC_OPEN_MAX"))
+    os.setpgid(0, 0)
+    os.umask(0o077)
+    # Relative paths keep working after dropping privileges, even though
+    # the new uid cannot reach the directory from /.
+    os.chdir(request["cwd"])
+    if request.get("uid") is not None:
+        drop_privileges(request["uid"])
+    limit_resources(memory_bytes, cpu_seconds)
+    reply = json.dumps(run(request["code"])).encode("utf-8")
+    while reply:
+        reply = reply[os.write(RESULT_FD, reply) :]
+
+
+def wait_for_child(pid: int, result_fd: int):
+    """Read the child's result until it exits and return (output, exit code).
+
+    Processes the child started may hold the pipe open after it exits, so
+    the child's exit, not end of file, ends the read.
+    """
+    chunks = []
+    status = None
+    while status is None:
+        ready, _, _ = select.select([result_fd], [], [], POLL_SECONDS)
+        if ready:
+            chunk = os.read(result_fd, 65536)
+            if chunk:
+                chunks.append(chunk)
+                continue
+            _, status = os.waitpid(pid, 0)
+            break
+        done, status = os.waitpid(pid, os.WNOHANG)
+        if not done:
+            status = None
+    while select.select([result_fd], [], [], 0)[0]:
+        chunk = os.read(result_fd, 65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    os.close(result_fd)
+    return b"".join(chunks), os.waitstatus_to_exitcode(status)
+
+
+def kill_leftovers(pid: int, uid):
+    """End whatever the child started that is still running."""
+    if uid is None:
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+        return
+    # A process running as uid can signal every process of that uid, even
+    # ones that left the child's process group.
+    killer = os.fork()
+    if killer == 0:
+        try:
+            os.setuid(uid)
+            os.kill(-1, signal.SIGKILL)
+        finally:
+            os._exit(0)
+    os.waitpid(killer, 0)
+
+
+def result(output: bytes, exit_code: int) -> dict:
+    if exit_code == 0:
+        try:
+            reply = json.loads(output)
+            return {
+                key: reply[key]
+                for key in ("stdout", "stderr", "error", "images")
+            }
+        except (ValueError, KeyError, TypeError):
+            pass
+    return {"exit_code": exit_code}
+
+
+def main():
+    memory_bytes, cpu_seconds = (int(arg) for arg in sys.argv[1:3])
+    requests = os.fdopen(os.dup(0), "r")
+    replies = os.fdopen(os.dup(1), "w")
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+
+    try:
+        warm_up()
+    except ImportError as e:
+        replies.write(
+            json.dumps({"error": f"Cannot import {e.name}: {e}"}) + "\n"
+        )
+        replies.flush()
+        sys.exit(1)
+    replies.write(json.dumps({"ready": True}) + "\n")
+    replies.flush()
+    for line in requests:
+        request = json.loads(line)
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 1
+            try:
+                os.close(read_fd)
+                child(request, memory_bytes, cpu_seconds, write_fd)
+                exit_code = 0
+            finally:
+                os._exit(exit_code)
+        os.close(write_fd)
+        try:
+            os.setpgid(pid, pid)
+        except OSError:
+            # The child already did, or has exited.
+            pass
+        replies.write(json.dumps({"pid": pid}) + "\n")
+        replies.flush()
+        output, exit_code = wait_for_child(pid, read_fd)
+        kill_leftovers(pid, request.get("uid"))
+        replies.write(json.dumps(result(output, exit_code)) + "\n")
+        replies.flush()
+
+
+if __name__ == "__main__":
+    main()
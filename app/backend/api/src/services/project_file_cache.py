@@ -0,0 +1,138 @@
+import logging
+import os
+import threading
+from typing import TYPE_CHECKING, Dict, Optional
+
+from opentelemetry import trace
+
+from utils.cache import TTLCache
+from utils.executor import BlockingExecutor
+
+if TYPE_CHECKING:
+    from azure.ai.projects import AIProjectClient
+
+
+class ProjectFileCache:
+    """Content-addressed map from upload hash to an uploaded project file.
+
+    Files referenced by the cache stay in the project until they are evicted
+    by size or TTL, at which point they are deleted remotely. Callers lease
+    a file through acquire() or put() and hand it back with release(); a
+    file evicted while leased is only deleted once its last lease ends.
+    """
+
+    def __init__(
+        self,
+        project_client: "AIProjectClient",
+        executor: Optional[BlockingExecutor] = None,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+    ):
+        self.project_client = project_client
+        self.executor = executor
+        if max_entries is None:
+            max_entries = int(
+                os.getenv("PROJECT_FILE_CACHE_MAX_ENTRIES", "128")
+            )
+        if ttl_seconds is None:
+            ttl_seconds = float(
+                os.getenv("PROJECT_FILE_CACHE_TTL_SECONDS", "3600")
+            )
+        self.bytes_saved = 0
+        self._cache = TTLCache(
+            max_entries, ttl_seconds, on_evict=self._on_evict
+        )
+        self._owned_file_ids = set()
+        # file ID -> active leases, and files evicted while still leased.
+        self._leases: Dict[str, int] = {}
+        self._evicted_while_leased = set()
+        # Reentrant because evictions triggered under the lock call _on_evict.
+        self._lock = threading.RLock()
+
+    def acquire(self, content_hash: str, size: int):
+        """Return and lease the cached upload for content_hash, or None."""
+        self._cache.purge_expired()
+        with self._lock:
+            # Leased under the lock, so a concurrent eviction sees the lease.
+            uploaded_file = self._cache.get(content_hash)
+            hit = uploaded_file is not None
+            if hit:
+                self._lease(uploaded_file.id)
+                self.bytes_saved += size
+            trace.get_current_span().set_attributes(
+                {
+                    "file_cache.hit": hit,
+                    "file_cache.hits": self._cache.hits,
+                    "file_cache.misses": self._cache.misses,
+                    "file_cache.hit_ratio": self._cache.hit_ratio,
+                    "file_cache.bytes_saved": size if hit else 0,
+                    "file_cache.bytes_saved_total": self.bytes_saved,
+                }
+            )
+        return uploaded_file
+
+    def put(self, content_hash: str, uploaded_file):
+        """Cache uploaded_file for content_hash; return the leased file to use.
+
+        If a concurrent upload of the same content was cached first, that
+        file is returned instead and uploaded_file is left to the caller to
+        delete.
+        """
+        with self._lock:
+            existing = self._cache.peek(content_hash)
+            if existing is not None:
+                self._lease(existing.id)
+                return existing
+            self._owned_file_ids.add(uploaded_file.id)
+            self._lease(uploaded_file.id)
+            self._cache.put(content_hash, uploaded_file)
+        return uploaded_file
+
+    def release(self, file_id: str) -> bool:
+        """End a lease from acquire() or put(); False if file_id had none."""
+        with self._lock:
+            leases = self._leases.get(file_id)
+            if leases is None:
+                return False
+            if leases > 1:
+                self._leases[file_id] = leases - 1
+                return True
+            del self._leases[file_id]
+            if file_id not in self._evicted_while_leased:
+                return True
+            self._evicted_while_leased.discard(file_id)
+        self._schedule_delete(file_id)
+        return True
+
+    def owns(self, file_id: str) -> bool:
+        """Return True if file_id is kept alive by the cache or a lease."""
+        with self._lock:
+            return file_id in self._owned_file_ids or file_id in self._leases
+
+    def close(self):
+        """Evict every entry, deleting unleased files from the project."""
+        self._cache.clear()
+
+    def _lease(self, file_id: str):
+        self._leases[file_id] = self._leases.get(file_id, 0) + 1
+
+    def _on_evict(self, content_hash: str, uploaded_file):
+        with self._lock:
+            self._owned_file_ids.discard(uploaded_file.id)
+            if uploaded_file.id in self._leases:
+                self._evicted_while_leased.add(uploaded_file.id)
+                return
+        self._schedule_delete(uploaded_file.id)
+
+    def _schedule_delete(self, file_id: str):
+        if self.executor is None:
+            self._delete_file(file_id)
+        else:
+            self.executor.submit(self._delete_file, file_id)
+
+    def _delete_file(self, file_id: str):
+        try:
+            self.project_client.agents.delete_file(file_id)
+            logging.info(f"Deleted evicted file, file ID: {file_id}")
+        except Exception as e:
+            logging.error(e)
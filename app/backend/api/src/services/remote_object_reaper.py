@@ -0,0 +1,234 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from typing import (
+    TYPE_CHECKING, Callable, Dict, List, NamedTuple, Optional, Tuple
+)
+
+from tracing.tracing import tracer
+from utils.executor import BlockingExecutor
+
+if TYPE_CHECKING:
+    from azure.ai.projects import AIProjectClient
+
+
+class RemoteObject(NamedTuple):
+    kind: str
+    identifier: str
+    due_at: float
+    attempts: int = 0
+
+
+class RemoteObjectReaper:
+    """Deletes agents, threads and files from the project after a grace period.
+
+    Callers record every remote object they create with track(), and may
+    track it again to restart its grace period, for example once a run on
+    a thread has finished. A background task deletes objects whose grace
+    period has passed in
+    batches of batch_size, running up to concurrency deletes at once and
+    starting no more than rate_limit deletes per second.
+    """
+
+    KINDS = ("agent", "thread", "file")
+
+    def __init__(
+        self,
+        project_client: "AIProjectClient",
+        executor: Optional[BlockingExecutor] = None,
+        grace_period: Optional[float] = None,
+        interval: Optional[float] = None,
+        batch_size: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        rate_limit: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if grace_period is None:
+            grace_period = float(os.getenv("REAPER_GRACE_SECONDS", "600"))
+        if interval is None:
+            interval = float(os.getenv("REAPER_INTERVAL_SECONDS", "10"))
+        if batch_size is None:
+            batch_size = int(os.getenv("REAPER_BATCH_SIZE", "50"))
+        if concurrency is None:
+            concurrency = int(os.getenv("REAPER_CONCURRENCY", "4"))
+        if rate_limit is None:
+            rate_limit = float(
+                os.getenv("REAPER_MAX_DELETES_PER_SECOND", "10")
+            )
+        if max_attempts is None:
+            max_attempts = int(os.getenv("REAPER_MAX_ATTEMPTS", "3"))
+        self.project_client = project_client
+        self.executor = executor or BlockingExecutor()
+        self.grace_period = grace_period
+        self.interval = interval
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.rate_limit = rate_limit
+        self.max_attempts = max_attempts
+        self.clock = clock
+        self.reclaimed = 0
+        self.failed = 0
+        self.last_throughput = 0.0
+        # (due_at, sequence, object), soonest due first. Entries whose
+        # sequence no longer matches _pending were superseded by a later
+        # track() and are skipped.
+        self._backlog: List[Tuple[float, int, RemoteObject]] = []
+        self._pending: Dict[Tuple[str, str], int] = {}
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def backlog(self) -> int:
+        return len(self._pending)
+
+    def stats(self) -> dict:
+        """Return counters suitable for span attributes."""
+        return {
+            "backlog": self.backlog,
+            "reclaimed": self.reclaimed,
+            "failed": self.failed,
+            "throughput": self.last_throughput,
+        }
+
+    def track(
+        self, kind: str, identifier: str, grace_period: Optional[float] = None
+    ):
+        """Schedule a remote object for deletion once its grace period ends.
+
+        Tracking an object that is already scheduled moves its deadline.
+        """
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown remote object kind: {kind}")
+        if grace_period is None:
+            grace_period = self.grace_period
+        self._push(RemoteObject(kind, identifier, self.clock() + grace_period))
+
+    def start(self):
+        """Reap every interval seconds in the background."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def close(self, timeout: Optional[float] = None):
+        """Stop the background task and try to delete whatever is left."""
+        if timeout is None:
+            timeout = float(os.getenv("REAPER_SHUTDOWN_TIMEOUT_SECONDS", "10"))
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await asyncio.wait_for(self._drain(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        if self._pending:
+            logging.warning(
+                f"Left {self.backlog} remote objects undeleted at shutdown"
+            )
+
+    async def reap(self, force: bool = False) -> int:
+        """Delete one batch of due objects; return how many were reclaimed."""
+        batch = self._take_due(force)
+        if not batch:
+            return 0
+        with tracer.start_as_current_span("reap_remote_objects") as span:
+            started = self.clock()
+            semaphore = asyncio.Semaphore(self.concurrency)
+
+            async def delete(item: RemoteObject) -> bool:
+                async with semaphore:
+                    await self._throttle()
+                    return await self.executor.run(self._delete, item)
+
+            results = await asyncio.gather(*(delete(item) for item in batch))
+            reclaimed = sum(results)
+            self.reclaimed += reclaimed
+            elapsed = self.clock() - started
+            self.last_throughput = (
+                reclaimed / elapsed if elapsed > 0 else float(reclaimed)
+            )
+            span.set_attributes({"reaper.batch": len(batch)})
+            span.set_attributes(
+                {f"reaper.{k}": v for k, v in self.stats().items()}
+            )
+            return reclaimed
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                # Keep going while full batches are due so a backlog drains.
+                while await self.reap() >= self.batch_size:
+                    pass
+            except Exception as e:
+                logging.error(f"Failed to reap remote objects: {e}")
+
+    async def _drain(self):
+        while self._pending and await self.reap(force=True):
+            pass
+
+    def _take_due(self, force: bool) -> List[RemoteObject]:
+        now = self.clock()
+        batch = []
+        with self._lock:
+            while self._backlog and len(batch) < self.batch_size:
+                if not force and self._backlog[0][0] > now:
+                    break
+                _, sequence, item = heapq.heappop(self._backlog)
+                key = (item.kind, item.identifier)
+                if self._pending.get(key) == sequence:
+                    del self._pending[key]
+                    batch.append(item)
+        return batch
+
+    def _push(self, item: RemoteObject):
+        with self._lock:
+            sequence = next(self._sequence)
+            self._pending[(item.kind, item.identifier)] = sequence
+            heapq.heappush(self._backlog, (item.due_at, sequence, item))
+
+    async def _throttle(self):
+        if self.rate_limit <= 0:
+            return
+        now = self.clock()
+        wait = self._next_slot - now
+        self._next_slot = max(now, self._next_slot) + 1 / self.rate_limit
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def _delete(self, item: RemoteObject) -> bool:
+        from azure.core.exceptions import ResourceNotFoundError
+
+        agents = self.project_client.agents
+        delete = {
+            "agent": agents.delete_agent,
+            "thread": agents.delete_thread,
+            "file": agents.delete_file,
+        }[item.kind]
+        try:
+            delete(item.identifier)
+            logging.info(f"Reaped {item.kind}, ID: {item.identifier}")
+            return True
+        except ResourceNotFoundError:
+            # Already gone, which is what we wanted.
+            return True
+        except Exception as e:
+            logging.error(
+                f"Failed to delete {item.kind} {item.identifier}: {e}"
+            )
+            if item.attempts + 1 < self.max_attempts:
+                self._push(
+                    item._replace(
+                        attempts=item.attempts + 1,
+                        due_at=self.clock() + self.interval,
+                    )
+                )
+            else:
+                self.failed += 1
+            return False
@@ -0,0 +1,58 @@
+from typing import Callable, List, Optional
+
+from azure.ai.projects.models import (
+    AgentEventHandler, MessageDeltaChunk, RunStep, ThreadMessage, ThreadRun
+)
+
+
+class RunEventForwarder(AgentEventHandler):
+    """Turns a streamed agent run into (event, data) pairs for the client.
+
+    The handler runs on the thread that consumes the SDK stream, so emit
+    must be safe to call from any thread. on_image is called once per
+    generated image as soon as the message holding it completes, which
+    lets downloads start while the run is still going.
+    """
+
+    def __init__(
+        self,
+        emit: Callable[[str, dict], None],
+        on_image: Optional[Callable[[str], None]] = None,
+    ):
+        super().__init__()
+        self.emit = emit
+        self.on_image = on_image
+        self.run: Optional[ThreadRun] = None
+        self.image_ids: List[str] = []
+        self.text_parts: List[str] = []
+
+    @property
+    def text(self) -> str:
+        return "".join(self.text_parts)
+
+    def on_message_delta(self, delta: MessageDeltaChunk):
+        if delta.text:
+            self.text_parts.append(delta.text)
+            self.emit("delta", {"text": delta.text})
+
+    def on_thread_message(self, message: ThreadMessage):
+        if message.status != "completed":
+            return
+        for image_content in message.image_contents:
+            file_id = image_content.image_file.file_id
+            if file_id in self.image_ids:
+                continue
+            self.image_ids.append(file_id)
+            self.emit("image", {"file_id": file_id})
+            if self.on_image is not None:
+                self.on_image(file_id)
+
+    def on_thread_run(self, run: ThreadRun):
+        self.run = run
+        self.emit("run", {"status": run.status})
+
+    def on_run_step(self, step: RunStep):
+        self.emit("step", {"type": step.type, "status": step.status})
+
+    def on_error(self, data: str):
+        self.emit("error", {"detail": data})
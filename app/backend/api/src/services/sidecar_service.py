@@ -1,18 +1,76 @@
+import json
 import os
-import requests
+from typing import AsyncIterator, Optional
+import httpx
+from opentelemetry import trace
+from utils.cache import TTLCache
+from utils.http_client import borrow_client
+from utils.single_flight import SingleFlight
+from utils.timing import stage
+
+SLM_MODEL = "phi3"
+
 
 class SidecarService:
-    def __init__(self):
+    def __init__(
+        self,
+        http_client: Optional[httpx.AsyncClient] = None,
+        cache: Optional[TTLCache] = None,
+        single_flight: Optional[SingleFlight] = None,
+    ):
         self.url = os.getenv("SIDECAR_SLM_URL", "http://localhost:11434/api/generate")
+        self.http_client = http_client
+        # Responses are only cached when a cache is injected.
+        self.cache = cache
+        self.single_flight = single_flight or SingleFlight()
 
-    def post_slm(self, prompt: str) -> dict:
-        response = requests.post(
-            self.url,
-            json={
-                "model": "phi3",
-                "prompt": prompt,
-                "stream": False
-            },
-            headers={"Content-Type": "application/json"}
+    async def post_slm(self, prompt: str) -> dict:
+        """Return the sidecar's response, cached when the prompt repeats."""
+        span = trace.get_current_span()
+        key = (SLM_MODEL, prompt)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            span.set_attributes(
+                {
+                    "slm_cache.hit": cached is not None,
+                    "slm_cache.size": len(self.cache),
+                    "slm_cache.hit_ratio": self.cache.hit_ratio,
+                }
+            )
+            if cached is not None:
+                return dict(cached)
+        # Identical prompts already in flight share that call's response.
+        span.set_attribute("slm_cache.coalesced", key in self.single_flight)
+        result = await self.single_flight.run(
+            key, lambda: self._generate(prompt, key)
         )
-        return response.json()
\ No newline at end of file
+        return dict(result)
+
+    async def _generate(self, prompt: str, key) -> dict:
+        with stage("slm_generate"):
+            async with borrow_client(self.http_client) as client:
+                response = await client.post(
+                    self.url,
+                    json={
+                        "model": SLM_MODEL,
+                        "prompt": prompt,
+                        "stream": False,
+                    },
+                    headers={"Content-Type": "application/json"},
+                )
+                result = response.json()
+        if self.cache is not None and response.is_success:
+            self.cache.put(key, result)
+        return result
+
+    async def stream_slm(self, prompt: str) -> AsyncIterator[dict]:
+        """Yield Ollama's NDJSON chunks as they arrive."""
+        payload = {"model": SLM_MODEL, "prompt": prompt, "stream": True}
+        async with borrow_client(self.http_client) as client:
+            async with client.stream(
+                "POST", self.url, json=payload
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if line:
+                        yield json.loads(line)
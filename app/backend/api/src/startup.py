@@ -1,36 +1,109 @@
+import asyncio
 import os
 import logging
-from pathlib import Path
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from apscheduler.schedulers.background import BackgroundScheduler
 
 from controller import router as api_router
-from tracing.tracing import tracer
 from di.containers import Container
+from tracing.tracing import configure_tracing, init_traceloop
+from utils.startup_profile import StartupProfile
 
 logging.basicConfig(
     level=logging.DEBUG
 )
 
-DATA_DIR = Path(os.getenv("DATA_DIR", "/data"))
 
-def delete_files():
-    """Delete all files in the data directory."""
-    with tracer.start_as_current_span("delete_files"):
-        for file in DATA_DIR.iterdir():
-            if file.is_file():
-                print(f"Deleting {file}")
-                os.remove(file)
+async def start_remote_services(app: FastAPI):
+    """Create the project client, start the reaper and warm the agent pool."""
+    executor = app.container.blocking_executor()
+    profile = app.state.startup_profile
+    try:
+        with profile.step("create_project_client"):
+            # Building DefaultAzureCredential is slow, so keep it off the loop.
+            await executor.run(app.container.project_client)
+    except Exception as e:
+        # Requests create the client lazily instead.
+        logging.error(f"Failed to create project client: {e}")
+    # Started on its own so that a failed warm-up never leaves remote
+    # objects unreaped.
+    try:
+        app.container.remote_object_reaper().start()
+    except Exception as e:
+        logging.error(f"Failed to start remote object reaper: {e}")
+    try:
+        code_interpreter_service = app.container.code_interpreter_service()
+        with profile.step("warm_agent_pool"):
+            await executor.run(code_interpreter_service.warm_agent_pool)
+    except Exception as e:
+        # The pool fills lazily on the first request instead.
+        logging.error(f"Failed to warm agent pool: {e}")
 
-scheduler = BackgroundScheduler()
-scheduler.add_job(delete_files, 'interval', seconds=30)
-scheduler.start()
 
-def create_app() -> FastAPI:
-    container = Container()
-    container.wire(modules=["controller"])
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start shared resources without blocking on remote calls.
 
-    app = FastAPI()
-    app.include_router(api_router)
+    Everything started here is released again at shutdown.
+    """
+    profile = app.state.startup_profile
+    with profile.step("configure_tracing"):
+        configure_tracing()
+    executor = app.container.blocking_executor()
+    # Slow, non-essential setup runs while the app already serves requests.
+    executor.submit(init_traceloop)
+    remote_services_task = asyncio.create_task(start_remote_services(app))
+    with profile.step("start_background_services"):
+        from apscheduler.schedulers.background import BackgroundScheduler
 
-    return app
\ No newline at end of file
+        dynamic_sessions_pool = app.container.dynamic_sessions_pool()
+        local_interpreter_pool = app.container.local_interpreter_pool()
+        # Only the default backend is kept warm; the other one starts cold
+        # on its first request. The local pool's start() does nothing unless
+        # LOCAL_INTERPRETER_ENABLED is set.
+        if os.getenv("DYNAMIC_SESSIONS_BACKEND", "remote") == "local":
+            local_interpreter_pool.start()
+        else:
+            dynamic_sessions_pool.start()
+        # Only unleased files past their max age are swept, in bounded steps.
+        scheduler = BackgroundScheduler()
+        scheduler.add_job(
+            app.container.temp_storage().sweep,
+            'interval',
+            seconds=float(
+                os.getenv("TEMP_STORAGE_SWEEP_INTERVAL_SECONDS", "30")
+            ),
+            max_instances=1,
+            coalesce=True,
+        )
+        scheduler.start()
+    profile.log()
+    yield
+    scheduler.shutdown(wait=False)
+    remote_services_task.cancel()
+    await asyncio.gather(remote_services_task, return_exceptions=True)
+    await app.container.job_queue().close()
+    await dynamic_sessions_pool.close()
+    await local_interpreter_pool.close()
+    await app.container.remote_object_reaper().close()
+    await app.container.http_clients().aclose()
+    app.container.access_token_cache().close()
+    await executor.run(app.container.agent_pool().close)
+    app.container.project_file_cache().close()
+    # Wait for the deletions queued by the cache before exiting.
+    executor.shutdown(wait=True)
+
+
+def create_app(profile: StartupProfile = None) -> FastAPI:
+    if profile is None:
+        profile = StartupProfile()
+    with profile.step("create_app"):
+        container = Container()
+        container.wire(modules=["controller"])
+
+        app = FastAPI(lifespan=lifespan)
+        app.container = container
+        app.state.startup_profile = profile
+        app.include_router(api_router)
+
+    return app
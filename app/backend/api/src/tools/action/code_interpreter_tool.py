@@ -1,6 +1,11 @@
-from typing import List
-from azure.ai.projects.models import CodeInterpreterTool
+from typing import TYPE_CHECKING, List
 
+if TYPE_CHECKING:
+    from azure.ai.projects.models import CodeInterpreterTool
 
-def create_code_interpreter_tool(file_ids: List[str]) -> CodeInterpreterTool:
-    return CodeInterpreterTool(file_ids=file_ids)
\ No newline at end of file
+
+def create_code_interpreter_tool(file_ids: List[str]) -> "CodeInterpreterTool":
+    # The SDK models are imported on first use to keep startup fast.
+    from azure.ai.projects.models import CodeInterpreterTool
+
+    return CodeInterpreterTool(file_ids=file_ids)
@@ -0,0 +1,111 @@
+import logging
+import threading
+import time
+from typing import Callable, Sequence
+
+from opentelemetry.sdk.metrics.export import (
+    MetricExporter, MetricExportResult, MetricsData
+)
+from opentelemetry.sdk.trace import ReadableSpan
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+
+
+class DroppingSpanExporter(SpanExporter):
+    """Drops batches for a cooldown period after the wrapped exporter fails.
+
+    Without this, every batch waits out the OTLP exporter's own retries
+    while the collector is down, and the span queue fills behind it.
+    """
+
+    def __init__(
+        self,
+        exporter: SpanExporter,
+        cooldown: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.exporter = exporter
+        self.cooldown = cooldown
+        self.clock = clock
+        self.dropped = 0
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        if self.clock() < self._retry_at:
+            with self._lock:
+                self.dropped += len(spans)
+            return SpanExportResult.FAILURE
+        try:
+            result = self.exporter.export(spans)
+        except Exception as e:
+            logging.warning(f"Span export failed: {e}")
+            result = SpanExportResult.FAILURE
+        if result != SpanExportResult.SUCCESS:
+            with self._lock:
+                self.dropped += len(spans)
+            self._retry_at = self.clock() + self.cooldown
+            logging.warning(
+                f"Dropping spans for {self.cooldown}s after a failed export"
+            )
+        return result
+
+    def shutdown(self):
+        self.exporter.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self.exporter.force_flush(timeout_millis)
+
+
+class DroppingMetricExporter(MetricExporter):
+    """DroppingSpanExporter's cooldown for metrics.
+
+    The periodic reader exports on a timer, so a dead collector would
+    otherwise be retried on every collection.
+    """
+
+    def __init__(
+        self,
+        exporter: MetricExporter,
+        cooldown: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        # Keep the wrapped exporter's temporality and aggregation preferences.
+        super().__init__(
+            preferred_temporality=exporter._preferred_temporality,
+            preferred_aggregation=exporter._preferred_aggregation,
+        )
+        self.exporter = exporter
+        self.cooldown = cooldown
+        self.clock = clock
+        self.dropped = 0
+        self._retry_at = 0.0
+
+    def export(
+        self,
+        metrics_data: MetricsData,
+        timeout_millis: float = 10_000,
+        **kwargs,
+    ) -> MetricExportResult:
+        if self.clock() < self._retry_at:
+            self.dropped += 1
+            return MetricExportResult.FAILURE
+        try:
+            result = self.exporter.export(
+                metrics_data, timeout_millis=timeout_millis, **kwargs
+            )
+        except Exception as e:
+            logging.warning(f"Metric export failed: {e}")
+            result = MetricExportResult.FAILURE
+        if result != MetricExportResult.SUCCESS:
+            self.dropped += 1
+            self._retry_at = self.clock() + self.cooldown
+            logging.warning(
+                f"Dropping metrics for {self.cooldown}s after a failed export"
+            )
+        return result
+
+    def force_flush(self, timeout_millis: float = 10_000) -> bool:
+        return self.exporter.force_flush(timeout_millis)
+
+    def shutdown(self, timeout_millis: float = 30_000, **kwargs) -> None:
+        self.exporter.shutdown(timeout_millis=timeout_millis, **kwargs)
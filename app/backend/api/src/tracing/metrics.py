@@ -0,0 +1,127 @@
+import math
+import re
+from typing import List
+
+from opentelemetry import metrics
+from opentelemetry.sdk.metrics import Histogram
+from opentelemetry.sdk.metrics.export import (
+    Gauge,
+    Histogram as HistogramData,
+    MetricsData,
+    Sum,
+)
+from opentelemetry.sdk.metrics.view import (
+    ExplicitBucketHistogramAggregation, View
+)
+
+STAGE_DURATION = "stage.duration"
+STAGE_CALLS = "stage.calls"
+
+# Seconds. Local work such as storing an upload finishes in milliseconds,
+# while agent runs take tens of seconds, so the buckets span both.
+STAGE_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0,
+)
+
+VIEWS = [
+    View(
+        instrument_type=Histogram,
+        instrument_name=STAGE_DURATION,
+        aggregation=ExplicitBucketHistogramAggregation(STAGE_BUCKETS),
+    ),
+]
+
+# Instruments created before the meter provider is set delegate to it
+# once it is.
+meter = metrics.get_meter("my.meter.sample")
+stage_duration = meter.create_histogram(
+    STAGE_DURATION, unit="s", description="Duration of each pipeline stage"
+)
+stage_calls = meter.create_counter(
+    STAGE_CALLS, description="Pipeline stages entered, by outcome"
+)
+
+
+def record_stage(name: str, seconds: float, succeeded: bool = True):
+    """Record one stage's duration and outcome."""
+    stage_duration.record(seconds, {"stage": name})
+    stage_calls.add(
+        1, {"stage": name, "outcome": "ok" if succeeded else "error"}
+    )
+
+
+def render_prometheus(data: MetricsData) -> str:
+    """Render cumulative metrics in the Prometheus text exposition format."""
+    lines: List[str] = []
+    for resource_metrics in data.resource_metrics if data else []:
+        for scope_metrics in resource_metrics.scope_metrics:
+            for metric in scope_metrics.metrics:
+                lines.extend(_render_metric(metric))
+    return "\n".join(lines) + "\n"
+
+
+def _render_metric(metric) -> List[str]:
+    name = _metric_name(metric.name, metric.unit)
+    point_data = metric.data
+    if isinstance(point_data, HistogramData):
+        kind = "histogram"
+    elif isinstance(point_data, Sum) and point_data.is_monotonic:
+        kind = "counter"
+        name += "_total"
+    elif isinstance(point_data, (Sum, Gauge)):
+        kind = "gauge"
+    else:
+        return []
+    lines = [
+        f"# HELP {name} {metric.description or metric.name}",
+        f"# TYPE {name} {kind}",
+    ]
+    for point in point_data.data_points:
+        labels = dict(point.attributes or {})
+        if kind != "histogram":
+            lines.append(f"{name}{_labels(labels)} {_number(point.value)}")
+            continue
+        cumulative = 0
+        for bound, count in zip(
+            list(point.explicit_bounds) + [math.inf], point.bucket_counts
+        ):
+            cumulative += count
+            lines.append(
+                f"{name}_bucket{_labels({**labels, 'le': _number(bound)})} "
+                f"{cumulative}"
+            )
+        lines.append(f"{name}_sum{_labels(labels)} {_number(point.sum)}")
+        lines.append(f"{name}_count{_labels(labels)} {point.count}")
+    return lines
+
+
+def _metric_name(name: str, unit: str) -> str:
+    name = re.sub(r"[^a-zA-Z0-9_:]", "_", name)
+    if unit == "s":
+        name += "_seconds"
+    elif unit == "By":
+        name += "_bytes"
+    return name
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels.items():
+        key = re.sub(r"[^a-zA-Z0-9_]", "_", str(key))
+        value = (
+            str(value)
+            .replace("\\", "\\\\")
+            .replace("\n", "\\n")
+            .replace('"', '\\"')
+        )
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _number(value) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
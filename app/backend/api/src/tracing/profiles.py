@@ -0,0 +1,75 @@
+import os
+from typing import NamedTuple, Optional
+
+
+class TracingProfile(NamedTuple):
+    """How many spans are recorded and how they leave the process."""
+
+    name: str
+    sample_ratio: float
+    otlp: bool
+    console: bool
+    max_queue_size: int
+    max_export_batch_size: int
+    schedule_delay_millis: int
+    export_timeout_seconds: float
+
+
+# Queue sizes bound the memory spent on spans while the collector is slow;
+# once a queue is full BatchSpanProcessor drops new spans instead of blocking.
+PROFILES = {
+    "off": TracingProfile(
+        "off",
+        0.0,
+        otlp=False,
+        console=False,
+        max_queue_size=0,
+        max_export_batch_size=0,
+        schedule_delay_millis=0,
+        export_timeout_seconds=0,
+    ),
+    "sampled": TracingProfile(
+        "sampled",
+        0.1,
+        otlp=True,
+        console=False,
+        max_queue_size=2048,
+        max_export_batch_size=512,
+        schedule_delay_millis=5000,
+        export_timeout_seconds=2,
+    ),
+    "full": TracingProfile(
+        "full",
+        1.0,
+        otlp=True,
+        console=False,
+        max_queue_size=8192,
+        max_export_batch_size=512,
+        schedule_delay_millis=1000,
+        export_timeout_seconds=5,
+    ),
+}
+
+
+def get_profile(name: Optional[str] = None) -> TracingProfile:
+    """Return the profile named by name or TRACING_PROFILE, with env overrides.
+
+    TRACING_SAMPLE_RATIO overrides the profile's ratio and
+    TRACING_CONSOLE=true adds the console exporter to any enabled profile.
+    """
+    if name is None:
+        name = os.getenv("TRACING_PROFILE", "full")
+    if name not in PROFILES:
+        raise ValueError(
+            f"Unknown tracing profile: {name} "
+            f"(expected one of {', '.join(PROFILES)})"
+        )
+    profile = PROFILES[name]
+    if name == "off":
+        return profile
+    ratio = os.getenv("TRACING_SAMPLE_RATIO")
+    if ratio is not None:
+        profile = profile._replace(sample_ratio=float(ratio))
+    if os.getenv("TRACING_CONSOLE", "false").lower() == "true":
+        profile = profile._replace(console=True)
+    return profile
@@ -1,44 +1,152 @@
+import functools
+import os
+import threading
+from typing import Optional
+
 from opentelemetry.sdk.resources import SERVICE_NAME, Resource
 from opentelemetry import trace, metrics
 from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
 from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.trace.export import (
-    BatchSpanProcessor,
-    ConsoleSpanExporter,
-    SimpleSpanProcessor,
+    BatchSpanProcessor, ConsoleSpanExporter
+)
+from opentelemetry.sdk.trace.sampling import (
+    ALWAYS_OFF, ParentBased, TraceIdRatioBased
 )
 from opentelemetry.sdk.metrics import MeterProvider
-from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
+from opentelemetry.sdk.metrics.export import (
+    InMemoryMetricReader, PeriodicExportingMetricReader
+)
 from opentelemetry.exporter.otlp.proto.http.metric_exporter import OTLPMetricExporter
-from traceloop.sdk import Traceloop
 
+from tracing.exporters import DroppingMetricExporter, DroppingSpanExporter
+from tracing.metrics import VIEWS
+from tracing.profiles import TracingProfile, get_profile
 
-Traceloop.init()
+OTLP_ENDPOINT = os.getenv(
+    "OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318"
+)
 
 resource = Resource(attributes={
     SERVICE_NAME: "sample-service"
 })
-traceProvider = TracerProvider(
-    resource=resource
-)
-processor = BatchSpanProcessor(
-    OTLPSpanExporter(
-        endpoint="http://localhost:4318/v1/traces",
+
+# Collected on demand by the /metrics endpoint.
+local_metric_reader = InMemoryMetricReader()
+
+# Creates a tracer from the global tracer provider. Spans are no-ops until
+# configure_tracing() installs the provider.
+tracer = trace.get_tracer("my.tracer.sample")
+
+_profile: Optional[TracingProfile] = None
+_traceloop_initialized = False
+_lock = threading.Lock()
+
+
+def create_tracer_provider(
+    profile: TracingProfile, resource: Resource, endpoint: str = OTLP_ENDPOINT
+) -> trace.TracerProvider:
+    """Build a tracer provider with the sampler and exporters of profile."""
+    if not (profile.otlp or profile.console):
+        # Nothing would be exported, so skip span bookkeeping entirely.
+        return trace.NoOpTracerProvider()
+    if profile.sample_ratio <= 0:
+        sampler = ParentBased(ALWAYS_OFF)
+    else:
+        sampler = ParentBased(TraceIdRatioBased(profile.sample_ratio))
+    provider = TracerProvider(resource=resource, sampler=sampler)
+    batch_options = dict(
+        max_queue_size=profile.max_queue_size,
+        max_export_batch_size=profile.max_export_batch_size,
+        schedule_delay_millis=profile.schedule_delay_millis,
     )
-)
-traceProvider.add_span_processor(processor)
+    if profile.otlp:
+        exporter = DroppingSpanExporter(
+            OTLPSpanExporter(
+                endpoint=f"{endpoint}/v1/traces",
+                timeout=profile.export_timeout_seconds,
+            ),
+            cooldown=float(os.getenv("TRACING_EXPORT_COOLDOWN_SECONDS", "30")),
+        )
+        provider.add_span_processor(
+            BatchSpanProcessor(exporter, **batch_options)
+        )
+    if profile.console:
+        provider.add_span_processor(
+            BatchSpanProcessor(ConsoleSpanExporter(), **batch_options)
+        )
+    return provider
 
-span_exporter = ConsoleSpanExporter()
-traceProvider.add_span_processor(SimpleSpanProcessor(span_exporter))
 
-# Sets the global default tracer provider
-trace.set_tracer_provider(traceProvider)
+def configure_tracing(name: Optional[str] = None) -> TracingProfile:
+    """Install the global tracer and meter providers once; then do nothing."""
+    global _profile
+    with _lock:
+        if _profile is not None:
+            return _profile
+        profile = get_profile(name)
+        # Sets the global default tracer provider
+        trace.set_tracer_provider(create_tracer_provider(profile, resource))
 
-reader = PeriodicExportingMetricReader(
-    OTLPMetricExporter(endpoint="http://localhost:4318/v1/metrics")
-)
-meterProvider = MeterProvider(resource=resource, metric_readers=[reader])
-metrics.set_meter_provider(meterProvider)
+        metric_readers = [local_metric_reader]
+        if profile.otlp:
+            metric_readers.append(
+                PeriodicExportingMetricReader(
+                    DroppingMetricExporter(
+                        OTLPMetricExporter(
+                            endpoint=f"{OTLP_ENDPOINT}/v1/metrics",
+                            timeout=profile.export_timeout_seconds,
+                        ),
+                        cooldown=float(
+                            os.getenv("TRACING_EXPORT_COOLDOWN_SECONDS", "30")
+                        ),
+                    )
+                )
+            )
+        metrics.set_meter_provider(
+            MeterProvider(
+                resource=resource, metric_readers=metric_readers, views=VIEWS
+            )
+        )
+        _profile = profile
+        return profile
 
-# Creates a tracer from the global tracer provider
-tracer = trace.get_tracer("my.tracer.sample")
+
+def init_traceloop():
+    """Initialize Traceloop on the provider installed by configure_tracing().
+
+    Importing traceloop takes longer than the rest of startup, so the
+    lifespan runs this in the background once the app is serving.
+    """
+    global _traceloop_initialized
+    with _lock:
+        if _traceloop_initialized or _profile is None or not _profile.otlp:
+            return
+        from traceloop.sdk import Traceloop
+
+        # Traceloop adds its processor to an existing SDK provider rather
+        # than replacing it, so the profile's sampler still applies.
+        Traceloop.init()
+        _traceloop_initialized = True
+
+
+def workflow(name: str):
+    """Traceloop's workflow decorator, importing traceloop on first call."""
+
+    def decorator(func):
+        decorated = None
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            nonlocal decorated
+            if decorated is None:
+                from traceloop.sdk.decorators import (
+                    workflow as traceloop_workflow,
+                )
+
+                decorated = traceloop_workflow(name=name)(func)
+            return await decorated(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,27 @@
+"""Utils package."""
+
+from .cache import TTLCache
+from .disk_cache import DiskCache
+from .executor import BlockingExecutor
+from .hashing import hash_file, hash_fileobj
+from .http_client import HttpClientManager
+from .single_flight import SingleFlight
+from .startup_profile import StartupProfile
+from .temp_storage import TempStorage
+from .timing import collect_stage_timings, stage
+from .token_cache import AccessTokenCache
+
+__all__ = [
+    "AccessTokenCache",
+    "BlockingExecutor",
+    "DiskCache",
+    "HttpClientManager",
+    "SingleFlight",
+    "StartupProfile",
+    "TTLCache",
+    "TempStorage",
+    "collect_stage_timings",
+    "hash_file",
+    "hash_fileobj",
+    "stage",
+]
@@ -0,0 +1,124 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, List, Optional, Tuple
+
+
+class TTLCache:
+    """Thread-safe LRU map whose entries also expire after a time-to-live.
+
+    on_evict is called with (key, value) for every entry that leaves the
+    cache because of size pressure, expiry or clear(), outside the lock.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        on_evict: Optional[Callable[[Hashable, Any], None]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[1] > self.clock()
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the value for key and mark it as recently used."""
+        evicted = []
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= self.clock():
+                evicted.append((key, self._entries.pop(key)[0]))
+                entry = None
+            if entry is None:
+                self.misses += 1
+                value = default
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                value = entry[0]
+        self._notify(evicted)
+        return value
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """Return the live value for key without counting a hit."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= self.clock():
+                return default
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any):
+        """Insert or replace key, evicting the least recently used entries."""
+        evicted = []
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None and previous[0] is not value:
+                evicted.append((key, previous[0]))
+            self._entries[key] = (value, self.clock() + self.ttl)
+            while len(self._entries) > self.maxsize:
+                evicted.append(self._pop_oldest())
+        self._notify(evicted)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove key without calling on_evict and return its value."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def purge_expired(self) -> int:
+        """Evict every expired entry and return how many were removed."""
+        now = self.clock()
+        with self._lock:
+            expired = [
+                key
+                for key, (_, expires) in self._entries.items()
+                if expires <= now
+            ]
+            evicted = [(key, self._entries.pop(key)[0]) for key in expired]
+        self._notify(evicted)
+        return len(evicted)
+
+    def clear(self):
+        """Evict every entry."""
+        with self._lock:
+            evicted = [
+                (key, value) for key, (value, _) in self._entries.items()
+            ]
+            self._entries.clear()
+        self._notify(evicted)
+
+    def _pop_oldest(self) -> Tuple[Hashable, Any]:
+        key, (value, _) = self._entries.popitem(last=False)
+        return key, value
+
+    def _notify(self, evicted: List[Tuple[Hashable, Any]]):
+        if not evicted:
+            return
+        with self._lock:
+            self.evictions += len(evicted)
+        if self.on_evict is None:
+            return
+        for key, value in evicted:
+            self.on_evict(key, value)
@@ -0,0 +1,85 @@
+import csv
+import hashlib
+import io
+import json
+import os
+from typing import List, Optional, Tuple
+
+CSV_SUFFIXES = (".csv", ".tsv")
+# Enough to see the header and a few hundred rows of a typical upload.
+SAMPLE_BYTES = 64 * 1024
+SAMPLE_ROWS = 200
+
+
+def _cell_type(value: str) -> Optional[str]:
+    value = value.strip()
+    if not value:
+        return None
+    try:
+        int(value)
+        return "int"
+    except ValueError:
+        pass
+    try:
+        float(value)
+        return "float"
+    except ValueError:
+        return "str"
+
+
+def _merge_types(current: Optional[str], new: Optional[str]) -> Optional[str]:
+    if current is None or new is None:
+        return current or new
+    if current == new:
+        return current
+    if {current, new} == {"int", "float"}:
+        return "float"
+    return "str"
+
+
+def read_csv_schema(fileobj, filename: str) -> Optional[List[Tuple[str, str]]]:
+    """Return (column, type) pairs sampled from the start of a CSV upload.
+
+    Types are "int", "float", "str", or "empty" when the sample has no
+    values. Returns None for files that are not CSV or cannot be parsed.
+    The file object is rewound afterwards.
+    """
+    if not (filename or "").lower().endswith(CSV_SUFFIXES):
+        return None
+    fileobj.seek(0)
+    try:
+        sample = fileobj.read(SAMPLE_BYTES)
+    finally:
+        fileobj.seek(0)
+    text = sample.decode("utf-8-sig", errors="replace")
+    if len(sample) == SAMPLE_BYTES:
+        # Drop the row cut off by the sample size.
+        text = text[: text.rfind("\n") + 1]
+    delimiter = "\t" if filename.lower().endswith(".tsv") else ","
+    try:
+        rows = list(csv.reader(io.StringIO(text), delimiter=delimiter))[
+            : SAMPLE_ROWS + 1
+        ]
+    except csv.Error:
+        return None
+    if not rows or not any(name.strip() for name in rows[0]):
+        return None
+    header = [name.strip() for name in rows[0]]
+    types: List[Optional[str]] = [None] * len(header)
+    for row in rows[1:]:
+        for i, value in enumerate(row[: len(header)]):
+            types[i] = _merge_types(types[i], _cell_type(value))
+    return [(name, kind or "empty") for name, kind in zip(header, types)]
+
+
+def schema_fingerprint(columns: List[Tuple[str, str]]) -> str:
+    """Return a stable hex digest of column names and types."""
+    return hashlib.sha256(
+        json.dumps(columns, ensure_ascii=False).encode("utf-8")
+    ).hexdigest()
+
+
+def csv_schema_fingerprint(fileobj, filename: str) -> Optional[str]:
+    """Return the schema fingerprint of a CSV upload, or None."""
+    columns = read_csv_schema(fileobj, os.path.basename(filename or ""))
+    return None if columns is None else schema_fingerprint(columns)
@@ -0,0 +1,189 @@
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+
+class DiskCache:
+    """LRU cache of files on local disk, bounded by bytes, entries and TTL.
+
+    Entries are stored as <key><suffix> in directory, so the index can be
+    rebuilt from the directory listing after a restart.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_bytes: Optional[int] = None,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        if directory is None:
+            directory = os.getenv(
+                "RESULT_CACHE_DIR", "/tmp/code_interpreter_results"
+            )
+        if max_bytes is None:
+            max_bytes = int(
+                os.getenv("RESULT_CACHE_MAX_BYTES", str(256 * 1024 * 1024))
+            )
+        if max_entries is None:
+            max_entries = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "1000"))
+        if ttl_seconds is None:
+            ttl_seconds = float(os.getenv("RESULT_CACHE_TTL_SECONDS", "86400"))
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.size_bytes = 0
+        # key -> (path, size, expires_at), least recently used first.
+        self._entries: "OrderedDict[str, Tuple[Path, int, float]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached file path for key, or None.
+
+        A later put can evict and unlink the file at any time; callers that
+        hand the file on should take their own reference with link.
+        """
+        expired = None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (
+                entry[2] <= self.clock() or not entry[0].exists()
+            ):
+                expired = self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+        if expired is not None:
+            self._unlink(expired)
+        return None if entry is None else str(entry[0])
+
+    def put(self, key: str, source_path: str, suffix: str = "") -> str:
+        """Move source_path into the cache under key; return its new path."""
+        target = self.directory / f"{key}{suffix}"
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        shutil.move(source_path, tmp_path)
+        os.replace(tmp_path, target)
+        size = target.stat().st_size
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size_bytes -= previous[1]
+            self._entries[key] = (target, size, self.clock() + self.ttl)
+            self.size_bytes += size
+            evicted = self._evict_over_limit(keep=key)
+        for path in evicted:
+            self._unlink(path)
+        return str(target)
+
+    def link(self, key: str, destination: str) -> bool:
+        """Give destination its own reference to the file cached under key.
+
+        The file is hard-linked, or copied when destination is on another
+        filesystem, so destination stays intact however soon the entry is
+        evicted. Returns False when key is not cached; hits and misses are
+        not counted.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[2] <= self.clock():
+                return False
+            try:
+                os.link(entry[0], destination)
+                return True
+            except FileNotFoundError:
+                return False
+            except OSError:
+                # Evictions unlink files outside the lock, so an open file
+                # stays readable for the copy below.
+                source = open(entry[0], "rb")
+        with source, open(destination, "wb") as target:
+            shutil.copyfileobj(source, target)
+        return True
+
+    def stats(self) -> dict:
+        """Return counters suitable for span attributes."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hit_ratio,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "size_bytes": self.size_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+    def _load(self):
+        now = self.clock()
+        files = []
+        for entry in os.scandir(self.directory):
+            if not entry.is_file() or entry.name.endswith(".tmp"):
+                continue
+            stat = entry.stat()
+            if stat.st_mtime + self.ttl <= now:
+                self._unlink(Path(entry.path))
+                continue
+            files.append((stat.st_mtime, entry, stat.st_size))
+        for mtime, entry, size in sorted(files, key=lambda f: f[0]):
+            key = entry.name.split(".", 1)[0]
+            self._entries[key] = (Path(entry.path), size, mtime + self.ttl)
+            self.size_bytes += size
+        for path in self._evict_over_limit(keep=None):
+            self._unlink(path)
+
+    def _remove(self, key: str) -> Path:
+        path, size, _ = self._entries.pop(key)
+        self.size_bytes -= size
+        self.evictions += 1
+        return path
+
+    def _evict_over_limit(self, keep: Optional[str]) -> list:
+        evicted = []
+        while self._entries and (
+            len(self._entries) > self.max_entries
+            or self.size_bytes > self.max_bytes
+        ):
+            key = next(iter(self._entries))
+            if key == keep:
+                break
+            evicted.append(self._remove(key))
+        if evicted:
+            logging.info(
+                f"Evicted {len(evicted)} cached results, "
+                f"{self.size_bytes} bytes in use"
+            )
+        return evicted
+
+    @staticmethod
+    def _unlink(path: Path):
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,38 @@
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+
+class BlockingExecutor:
+    """Bounded thread pool that runs blocking SDK calls off the event loop."""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        if max_workers is None:
+            max_workers = int(os.getenv("BLOCKING_EXECUTOR_MAX_WORKERS", "16"))
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="blocking-sdk"
+        )
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run func on the pool and await its result.
+
+        The caller's context is copied so that spans opened inside func
+        keep the current span as their parent.
+        """
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        call = functools.partial(context.run, func, *args, **kwargs)
+        return await loop.run_in_executor(self._executor, call)
+
+    def submit(self, func: Callable[..., Any], *args, **kwargs) -> Future:
+        """Schedule func on the pool without waiting for it."""
+        context = contextvars.copy_context()
+        return self._executor.submit(context.run, func, *args, **kwargs)
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting work and release the worker threads."""
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,77 @@
+import errno
+import io
+import os
+import shutil
+
+CHUNK_SIZE = 1024 * 1024
+
+# Errors meaning "this kernel or filesystem cannot do that copy", as opposed
+# to a real I/O failure.
+_UNSUPPORTED_ERRNOS = {
+    errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF,
+    errno.ENOTSUP,
+}
+
+
+def _real_fileno(source):
+    """Return the OS file descriptor behind source, or None.
+
+    SpooledTemporaryFile.fileno() would force an in-memory spool to disk, so
+    such files only qualify once Starlette has already rolled them over.
+    """
+    if not getattr(source, "_rolled", True):
+        return None
+    try:
+        return source.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+
+
+def _kernel_copy(in_fd: int, out_fd: int, offset: int, chunk_size: int):
+    """Copy in_fd from offset to out_fd inside the kernel.
+
+    Returns (bytes copied, method), or None if neither copy_file_range nor
+    sendfile is usable before any byte was written.
+    """
+    copied = 0
+    for method in ("copy_file_range", "sendfile"):
+        if not hasattr(os, method):
+            continue
+        try:
+            while True:
+                if method == "copy_file_range":
+                    n = os.copy_file_range(
+                        in_fd, out_fd, chunk_size, offset + copied
+                    )
+                else:
+                    n = os.sendfile(out_fd, in_fd, offset + copied, chunk_size)
+                if n == 0:
+                    return copied, method
+                copied += n
+        except OSError as e:
+            if copied or e.errno not in _UNSUPPORTED_ERRNOS:
+                raise
+    return None
+
+
+def copy_upload(source, target, chunk_size: int = CHUNK_SIZE):
+    """Copy the rest of source into target and return (bytes, method).
+
+    Uses a kernel-side copy when both sides are real files, falling back to
+    a chunked shutil.copyfileobj otherwise.
+    """
+    in_fd = _real_fileno(source)
+    out_fd = _real_fileno(target)
+    if in_fd is not None and out_fd is not None:
+        if hasattr(source, "flush"):
+            source.flush()
+        target.flush()
+        offset = source.tell()
+        result = _kernel_copy(in_fd, out_fd, offset, chunk_size)
+        if result is not None:
+            copied, method = result
+            source.seek(offset + copied)
+            return copied, method
+    start = target.tell()
+    shutil.copyfileobj(source, target, chunk_size)
+    return target.tell() - start, "copyfileobj"
@@ -0,0 +1,30 @@
+import hashlib
+from typing import Tuple
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(file_path: str, chunk_size: int = CHUNK_SIZE) -> Tuple[str, int]:
+    """Return the SHA-256 hex digest and size in bytes of a file."""
+    digest = hashlib.sha256()
+    size = 0
+    with open(file_path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def hash_fileobj(fileobj, chunk_size: int = CHUNK_SIZE) -> Tuple[str, int]:
+    """Return the SHA-256 hex digest and size of a seekable file object.
+
+    The whole object is hashed from the start and rewound afterwards.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    fileobj.seek(0)
+    while chunk := fileobj.read(chunk_size):
+        digest.update(chunk)
+        size += len(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest(), size
@@ -0,0 +1,107 @@
+import importlib.util
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+import httpx
+
+
+def _env_float(name: str, default: str) -> float:
+    return float(os.getenv(name, default))
+
+
+def default_timeout() -> httpx.Timeout:
+    """Return the connect and read timeouts configured for upstream calls."""
+    return httpx.Timeout(
+        _env_float("HTTP_READ_TIMEOUT", "120"),
+        connect=_env_float("HTTP_CONNECT_TIMEOUT", "5"),
+    )
+
+
+class HttpClientManager:
+    """Shared, pooled httpx.AsyncClient instances, one per upstream.
+
+    Each upstream gets its own client so that connection limits apply per
+    host. Clients keep connections alive between calls and are closed
+    together by aclose() at application shutdown.
+    """
+
+    def __init__(
+        self,
+        connect_timeout: Optional[float] = None,
+        read_timeout: Optional[float] = None,
+        max_connections_per_host: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        http2: Optional[bool] = None,
+    ):
+        if connect_timeout is None:
+            connect_timeout = _env_float("HTTP_CONNECT_TIMEOUT", "5")
+        if read_timeout is None:
+            read_timeout = _env_float("HTTP_READ_TIMEOUT", "120")
+        if max_connections_per_host is None:
+            max_connections_per_host = int(
+                os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "20")
+            )
+        if keepalive_expiry is None:
+            keepalive_expiry = _env_float("HTTP_KEEPALIVE_EXPIRY", "30")
+        if http2 is None:
+            http2 = os.getenv("HTTP2_ENABLED", "false").lower() == "true"
+        if http2 and importlib.util.find_spec("h2") is None:
+            logging.warning(
+                "HTTP2_ENABLED is set but the h2 package is not installed; "
+                "using HTTP/1.1"
+            )
+            http2 = False
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_connections_per_host = max_connections_per_host
+        self.keepalive_expiry = keepalive_expiry
+        self.http2 = http2
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+
+    def get(
+        self, name: str, read_timeout: Optional[float] = None
+    ) -> httpx.AsyncClient:
+        """Return the shared client for an upstream, made on first use."""
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                http2=self.http2,
+                timeout=httpx.Timeout(
+                    (
+                        self.read_timeout
+                        if read_timeout is None
+                        else read_timeout
+                    ),
+                    connect=self.connect_timeout,
+                ),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections_per_host,
+                    max_keepalive_connections=self.max_connections_per_host,
+                    keepalive_expiry=self.keepalive_expiry,
+                ),
+            )
+            self._clients[name] = client
+        return client
+
+    async def aclose(self):
+        """Close every client and its pooled connections."""
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            await client.aclose()
+
+
+@asynccontextmanager
+async def borrow_client(
+    client: Optional[httpx.AsyncClient],
+) -> AsyncIterator[httpx.AsyncClient]:
+    """Yield client, or a short-lived client when no shared one is injected."""
+    if client is not None:
+        yield client
+        return
+    async with httpx.AsyncClient(
+        timeout=default_timeout()
+    ) as transient_client:
+        yield transient_client
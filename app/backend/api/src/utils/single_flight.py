@@ -0,0 +1,52 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class _Call:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesce concurrent async calls that share a key into one execution.
+
+    The shared call runs as its own task, so cancelling the caller that
+    started it does not cancel the others. It is cancelled only once every
+    caller waiting on it has gone away.
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._in_flight: Dict[Hashable, _Call] = {}
+
+    def __len__(self) -> int:
+        return len(self._in_flight)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._in_flight
+
+    async def run(
+        self, key: Hashable, func: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Await func(), or the result of an identical call already running."""
+        call = self._in_flight.get(key)
+        if call is not None:
+            self.coalesced += 1
+        else:
+            call = _Call(asyncio.ensure_future(func()))
+            self._in_flight[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Nobody wants the result any more.
+                self._forget(key, call)
+                call.task.cancel()
+
+    def _forget(self, key: Hashable, call: _Call):
+        if self._in_flight.get(key) is call:
+            del self._in_flight[key]
@@ -0,0 +1,31 @@
+import json
+import logging
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator
+
+
+class StartupProfile:
+    """Wall time of each startup step, reported once the app is serving."""
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self.clock = clock
+        # step name -> seconds, in the order the steps ran
+        self.steps: Dict[str, float] = {}
+
+    @contextmanager
+    def step(self, name: str) -> Iterator[None]:
+        started = self.clock()
+        try:
+            yield
+        finally:
+            self.record(name, self.clock() - started)
+
+    def record(self, name: str, seconds: float):
+        self.steps[name] = self.steps.get(name, 0.0) + seconds
+
+    def report(self) -> dict:
+        return {"steps": dict(self.steps), "total": sum(self.steps.values())}
+
+    def log(self):
+        logging.info(f"Startup profile: {json.dumps(self.report())}")
@@ -0,0 +1,224 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from tracing.tracing import tracer
+
+
+class TempStorage:
+    """Per-request temp files with leases, an age sweep and a disk quota.
+
+    allocate() returns a unique path under directory/<shard>/<id>/ that
+    is leased to the caller until release() or delete(). sweep() removes
+    unleased files older than max_age, visiting at most sweep_budget
+    directory entries per call so each tick stays short however many files
+    there are. record() adds a file to the quota; once more than max_bytes
+    are recorded, the least recently used unleased files are deleted.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_age: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        sweep_budget: Optional[int] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        if directory is None:
+            directory = os.getenv("DATA_DIR", "/data")
+        if max_age is None:
+            max_age = float(os.getenv("TEMP_STORAGE_MAX_AGE_SECONDS", "3600"))
+        if max_bytes is None:
+            max_bytes = int(
+                os.getenv(
+                    "TEMP_STORAGE_MAX_BYTES", str(2 * 1024 * 1024 * 1024)
+                )
+            )
+        if sweep_budget is None:
+            sweep_budget = int(os.getenv("TEMP_STORAGE_SWEEP_BUDGET", "1000"))
+        self.directory = os.path.normpath(directory)
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.sweep_budget = sweep_budget
+        self.clock = clock
+        self.size_bytes = 0
+        self.swept = 0
+        self.evicted = 0
+        # path -> (size, last_used), least recently used first.
+        self._entries: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+        self._leases: Dict[str, int] = {}
+        self._walker: Optional[Iterator[os.DirEntry]] = None
+        self._lock = threading.Lock()
+
+    def stats(self) -> dict:
+        """Return counters suitable for span attributes."""
+        return {
+            "files": len(self._entries),
+            "leased": len(self._leases),
+            "bytes": self.size_bytes,
+            "swept": self.swept,
+            "evicted": self.evicted,
+        }
+
+    def allocate(self, filename: str) -> str:
+        """Return a new, leased path that keeps filename as its base name."""
+        identifier = uuid.uuid4().hex
+        # Only the base name is kept, so client-supplied names cannot escape.
+        name = os.path.basename(filename or "") or "upload"
+        request_dir = os.path.join(self.directory, identifier[:2], identifier)
+        os.makedirs(request_dir, exist_ok=True)
+        path = os.path.join(request_dir, name)
+        with self._lock:
+            self._leases[path] = 1
+            self._entries[path] = (0, self.clock())
+        return path
+
+    def acquire(self, path: str):
+        """Add a lease so neither the sweep nor the quota removes path."""
+        with self._lock:
+            self._leases[path] = self._leases.get(path, 0) + 1
+            self._touch(path)
+
+    def release(self, path: str):
+        """Drop one lease; the file stays until it ages out or is evicted."""
+        with self._lock:
+            remaining = self._leases.get(path, 0) - 1
+            if remaining > 0:
+                self._leases[path] = remaining
+            else:
+                self._leases.pop(path, None)
+            self._touch(path)
+
+    @contextmanager
+    def lease(self, path: str) -> Iterator[str]:
+        self.acquire(path)
+        try:
+            yield path
+        finally:
+            self.release(path)
+
+    def is_leased(self, path: str) -> bool:
+        return path in self._leases
+
+    def record(self, path: str, size: int):
+        """Account size bytes for path, evicting older files over the quota."""
+        with self._lock:
+            previous = self._entries.pop(path, (0, 0))[0]
+            self._entries[path] = (size, self.clock())
+            self.size_bytes += size - previous
+            victims = self._over_quota()
+        for victim in victims:
+            self._remove_file(victim)
+        self.evicted += len(victims)
+
+    def delete(self, path: str):
+        """Release every lease on path and remove it now."""
+        with self._lock:
+            self._leases.pop(path, None)
+            self._forget(path)
+        self._remove_file(path)
+
+    def sweep(self) -> int:
+        """Delete unleased files older than max_age; return how many went."""
+        with tracer.start_as_current_span("sweep_temp_storage") as span:
+            deadline = self.clock() - self.max_age
+            scanned = removed = 0
+            while scanned < self.sweep_budget:
+                if self._walker is None:
+                    self._walker = self._walk(self.directory)
+                entry = next(self._walker, None)
+                if entry is None:
+                    # A full pass is done; the next tick starts over.
+                    self._walker = None
+                    break
+                scanned += 1
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        self._remove_empty_dir(entry.path)
+                        continue
+                    if (
+                        self.is_leased(entry.path)
+                        or entry.stat(follow_symlinks=False).st_mtime
+                        > deadline
+                    ):
+                        continue
+                except FileNotFoundError:
+                    continue
+                with self._lock:
+                    if entry.path in self._leases:
+                        continue
+                    self._forget(entry.path)
+                self._remove_file(entry.path)
+                removed += 1
+            self.swept += removed
+            span.set_attributes(
+                {
+                    "temp_storage.scanned": scanned,
+                    "temp_storage.removed": removed,
+                }
+            )
+            span.set_attributes(
+                {f"temp_storage.{k}": v for k, v in self.stats().items()}
+            )
+            return removed
+
+    def _walk(self, directory: str) -> Iterator[os.DirEntry]:
+        # Files are yielded before their directory so emptied request
+        # directories can be removed in the same pass.
+        try:
+            with os.scandir(directory) as entries:
+                children = list(entries)
+        except (FileNotFoundError, NotADirectoryError):
+            return
+        for entry in children:
+            if entry.is_dir(follow_symlinks=False):
+                yield from self._walk(entry.path)
+            yield entry
+
+    def _touch(self, path: str):
+        entry = self._entries.get(path)
+        if entry is not None:
+            self._entries[path] = (entry[0], self.clock())
+            self._entries.move_to_end(path)
+
+    def _forget(self, path: str):
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self.size_bytes -= entry[0]
+
+    def _over_quota(self) -> list:
+        victims = []
+        for path in list(self._entries):
+            if self.size_bytes <= self.max_bytes:
+                break
+            if path in self._leases:
+                continue
+            self._forget(path)
+            victims.append(path)
+        if self.size_bytes > self.max_bytes:
+            logging.warning(
+                f"Temp storage holds {self.size_bytes} bytes in leased files, "
+                f"over the {self.max_bytes} byte quota"
+            )
+        return victims
+
+    def _remove_file(self, path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        self._remove_empty_dir(os.path.dirname(path))
+
+    def _remove_empty_dir(self, path: str):
+        # Never remove the storage root or a shard directory.
+        if os.path.dirname(os.path.dirname(path)) != self.directory:
+            return
+        try:
+            os.rmdir(path)
+        except OSError:
+            pass
@@ -0,0 +1,43 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+from tracing.metrics import record_stage
+
+_stage_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar(
+    "stage_timings", default=None
+)
+
+
+@contextmanager
+def collect_stage_timings(
+    timings: Optional[Dict[str, float]] = None,
+) -> Iterator[Dict[str, float]]:
+    """Collect the durations of every stage() entered in this context."""
+    if timings is None:
+        timings = {}
+    token = _stage_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _stage_timings.reset(token)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Add the wall time of the block, in seconds, to the current collection.
+
+    Every stage is also recorded in the stage duration histogram.
+    """
+    started = time.perf_counter()
+    succeeded = False
+    try:
+        yield
+        succeeded = True
+    finally:
+        elapsed = time.perf_counter() - started
+        record_stage(name, elapsed, succeeded)
+        timings = _stage_timings.get()
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + elapsed
@@ -0,0 +1,157 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from utils.executor import BlockingExecutor
+
+
+class AccessTokenCache:
+    """Process-wide AAD access tokens keyed by scope.
+
+    Reads of a fresh token are a single dict lookup with no lock. Each token
+    is refreshed on a background timer refresh_margin seconds before it
+    expires, so callers only block on the very first fetch of a scope. A
+    failed refresh is retried with exponential backoff, starting at
+    retry_interval seconds, until the current token expires.
+    """
+
+    MAX_RETRY_INTERVAL = 300
+
+    def __init__(
+        self,
+        credential: Optional[Any] = None,
+        credential_factory: Optional[Callable[[], Any]] = None,
+        refresh_margin: Optional[float] = None,
+        retry_interval: Optional[float] = None,
+        executor: Optional[BlockingExecutor] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        if refresh_margin is None:
+            refresh_margin = float(
+                os.getenv("TOKEN_REFRESH_MARGIN_SECONDS", "300")
+            )
+        if retry_interval is None:
+            retry_interval = float(
+                os.getenv("TOKEN_REFRESH_RETRY_SECONDS", "30")
+            )
+        self.refresh_margin = refresh_margin
+        self.retry_interval = retry_interval
+        self.clock = clock
+        self._credential = credential
+        self._credential_factory = credential_factory
+        self._executor = executor
+        # scope -> (AccessToken, refresh_at)
+        self._tokens: Dict[str, Tuple[Any, float]] = {}
+        self._timers: Dict[str, threading.Timer] = {}
+        self._lock = threading.RLock()
+        self._closed = False
+
+    @property
+    def credential(self):
+        if self._credential is None:
+            with self._lock:
+                if self._credential is None:
+                    if self._credential_factory is None:
+                        from azure.identity import DefaultAzureCredential
+
+                        self._credential_factory = DefaultAzureCredential
+                    self._credential = self._credential_factory()
+        return self._credential
+
+    def get_token(self, scope: str) -> str:
+        """Return a valid token for scope, fetching it if none is cached."""
+        token = self._cached(scope)
+        if token is not None:
+            return token
+        return self._refresh(scope).token
+
+    async def get_token_async(self, scope: str) -> str:
+        """Like get_token, but fetches off the event loop on a miss."""
+        token = self._cached(scope)
+        if token is not None:
+            return token
+        if self._executor is None:
+            self._executor = BlockingExecutor(max_workers=1)
+        return await self._executor.run(self.get_token, scope)
+
+    def close(self):
+        """Cancel every scheduled refresh."""
+        with self._lock:
+            self._closed = True
+            timers = list(self._timers.values())
+            self._timers.clear()
+        for timer in timers:
+            timer.cancel()
+
+    def _cached(self, scope: str) -> Optional[str]:
+        entry = self._tokens.get(scope)
+        if entry is not None and entry[0].expires_on > self.clock():
+            return entry[0].token
+        return None
+
+    def _refresh(self, scope: str, force: bool = False):
+        with self._lock:
+            # Another caller may have refreshed while we waited for the lock.
+            entry = self._tokens.get(scope)
+            now = self.clock()
+            if not force and entry is not None and now < entry[1]:
+                return entry[0]
+            token = self.credential.get_token(scope)
+            # Refresh early, but never later than halfway through the token's
+            # lifetime so short-lived tokens do not refresh in a loop.
+            lifetime = max(token.expires_on - now, 0)
+            refresh_at = now + max(
+                lifetime - min(self.refresh_margin, lifetime / 2), 0
+            )
+            # Replace rather than mutate so lock-free readers see either the
+            # old or the new token.
+            self._tokens = {**self._tokens, scope: (token, refresh_at)}
+            self._schedule_refresh(scope, refresh_at)
+        logging.info(f"Fetched access token for {scope}")
+        return token
+
+    def _schedule_refresh(self, scope: str, refresh_at: float):
+        if self._closed:
+            return
+        previous = self._timers.pop(scope, None)
+        if previous is not None:
+            previous.cancel()
+        delay = max(refresh_at - self.clock(), 0)
+        timer = threading.Timer(delay, self._background_refresh, args=(scope,))
+        timer.daemon = True
+        self._timers[scope] = timer
+        timer.start()
+
+    def _background_refresh(self, scope: str, attempt: int = 0):
+        try:
+            self._refresh(scope, force=True)
+        except Exception as e:
+            # The current token stays in use; retry with backoff while it is
+            # valid. Once it expires the next caller fetches synchronously.
+            logging.error(f"Failed to refresh access token for {scope}: {e}")
+            delay = min(
+                self.retry_interval * 2**attempt, self.MAX_RETRY_INTERVAL
+            )
+            with self._lock:
+                entry = self._tokens.get(scope)
+                if (
+                    entry is None
+                    or self.clock() + delay >= entry[0].expires_on
+                ):
+                    self._timers.pop(scope, None)
+                    logging.warning(
+                        f"Giving up refreshing access token for {scope} "
+                        "before it expires"
+                    )
+                    return
+                if not self._closed:
+                    timer = threading.Timer(
+                        delay,
+                        self._background_refresh,
+                        args=(scope, attempt + 1),
+                    )
+                    timer.daemon = True
+                    self._timers[scope] = timer
+                    timer.start()
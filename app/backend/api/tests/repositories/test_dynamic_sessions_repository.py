@@ -2,49 +2,89 @@ import os
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src')))
 
+import asyncio
+import json
+import time
 import unittest
 from unittest.mock import patch, MagicMock
 from io import BytesIO
+import httpx
 from repositories.dynamic_sessions_repository import DynamicSessionsRepository
+from utils.token_cache import AccessTokenCache
 
 
 class TestDynamicSessionsRepository(unittest.TestCase):
     def setUp(self):
-        self.repo = DynamicSessionsRepository()
+        self.credential = MagicMock()
+        self.credential.get_token.return_value = MagicMock(token="test-token", expires_on=time.time() + 3600)
+        token_cache = AccessTokenCache(credential=self.credential)
+        self.addCleanup(token_cache.close)
+
+        self.requests = []
+        self.status_code = 200
+        client = httpx.AsyncClient(transport=httpx.MockTransport(self.handler))
+        self.repo = DynamicSessionsRepository(http_client=client, token_cache=token_cache)
         self.session_id = "test-session-id"
         self.file = MagicMock()
         self.file.filename = "test.txt"
         self.file.file = BytesIO(b"test content")
         self.code = "print('Hello, World!')"
 
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        return httpx.Response(self.status_code, json={})
+
+
+    def test_upload_file(self):
+        asyncio.run(self.repo.upload_file(self.session_id, self.file))
+
+        self.assertEqual(len(self.requests), 1)
+        request = self.requests[0]
+        self.assertEqual(request.headers["Authorization"], "Bearer test-token")
+        self.assertIn(b'name="file"; filename="test.txt"', request.read())
+        self.assertEqual(request.url.params["identifier"], self.session_id)
+
+
+    def test_execute_code(self):
+        asyncio.run(self.repo.execute_code(self.session_id, self.code))
+
+        self.assertEqual(len(self.requests), 1)
+        request = self.requests[0]
+        self.assertIn("Authorization", request.headers)
+        self.assertEqual(request.headers["Content-Type"], "application/json")
+        self.assertEqual(json.loads(request.content)["properties"]["code"], self.code)
+
+    def test_execute_code_実行結果のpropertiesを返す(self):
+        self.handler = lambda request: httpx.Response(200, json={"properties": {"status": "Failure", "stderr": "boom"}})
+        self.repo.http_client = httpx.AsyncClient(transport=httpx.MockTransport(self.handler))
+
+        properties = asyncio.run(self.repo.execute_code(self.session_id, self.code))
+
+        self.assertEqual(properties, {"status": "Failure", "stderr": "boom"})
+
+
+    def test_トークンは呼び出し間で再利用される(self):
+        asyncio.run(self.repo.upload_file(self.session_id, self.file))
+        asyncio.run(self.repo.execute_code(self.session_id, self.code))
+
+        self.credential.get_token.assert_called_once_with("https://dynamicsessions.io/.default")
+
 
-    @patch("repositories.dynamic_sessions_repository.requests.post")
-    def test_upload_file(self, mock_post):
-        mock_response = MagicMock()
-        mock_response.raise_for_status = MagicMock()
-        mock_post.return_value = mock_response
+    def test_execute_code_エラー応答は例外になる(self):
+        self.status_code = 500
 
-        self.repo.upload_file(self.session_id, self.file)
+        with self.assertRaises(httpx.HTTPStatusError):
+            asyncio.run(self.repo.execute_code(self.session_id, self.code))
 
-        mock_post.assert_called_once()
-        args, kwargs = mock_post.call_args
-        self.assertIn("Authorization", kwargs["headers"])
-        self.assertIn("file", kwargs["files"])
 
+    @patch.dict(os.environ, {"ACA_DYNAMICSESSIONS_POOL_ENDPOINT": "http://127.0.0.1:8080/pool"})
+    def test_プール管理エンドポイントを環境変数で指定できる(self):
+        repo = DynamicSessionsRepository(http_client=self.repo.http_client, token_cache=self.repo.token_cache)
 
-    @patch("repositories.dynamic_sessions_repository.requests.post")
-    def test_execute_code(self, mock_post):
-        mock_response = MagicMock()
-        mock_response.raise_for_status = MagicMock()
-        mock_post.return_value = mock_response
+        asyncio.run(repo.execute_code(self.session_id, self.code))
 
-        self.repo.execute_code(self.session_id, self.code)
+        self.assertEqual(str(self.requests[0].url).split("?")[0], "http://127.0.0.1:8080/pool/code/execute")
 
-        mock_post.assert_called_once()
-        args, kwargs = mock_post.call_args
-        self.assertIn("Authorization", kwargs["headers"])
-        self.assertIn("Content-Type", kwargs["headers"])
-        self.assertIn("code", kwargs["json"]["properties"])
 
 if __name__ == "__main__":
     unittest.main()
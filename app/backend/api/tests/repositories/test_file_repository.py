@@ -0,0 +1,107 @@
+import asyncio
+import hashlib
+import os
+import sys
+from io import BytesIO
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src')))
+
+import pytest
+from fastapi import UploadFile
+
+from repositories.file_repository import FileRepository, FileTooLargeError
+from utils.temp_storage import TempStorage
+
+
+class RecordingStream(BytesIO):
+    """BytesIO that remembers the size of every read."""
+
+    def __init__(self, content: bytes):
+        super().__init__(content)
+        self.read_sizes = []
+
+    def read(self, size=-1):
+        self.read_sizes.append(size)
+        return super().read(size)
+
+
+def test_stream_temp_file_チャンク単位で書き込みハッシュを計算する(tmp_path: Path):
+    content = os.urandom(10_000)
+    stream = RecordingStream(content)
+    repository = FileRepository(chunk_size=1024, max_upload_bytes=1_000_000)
+
+    stored = asyncio.run(repository.stream_temp_file(UploadFile(stream, filename="test.csv"), str(tmp_path)))
+
+    assert Path(stored.path).read_bytes() == content
+    assert stored.content_hash == hashlib.sha256(content).hexdigest()
+    assert stored.size == len(content)
+    assert set(stream.read_sizes) == {1024}
+
+
+def test_stream_temp_file_サイズ超過は部分ファイルを残さない(tmp_path: Path):
+    repository = FileRepository(chunk_size=1024, max_upload_bytes=4096)
+    upload = UploadFile(BytesIO(b"x" * 5000), filename="big.csv")
+
+    with pytest.raises(FileTooLargeError):
+        asyncio.run(repository.stream_temp_file(upload, str(tmp_path)))
+
+    assert not (tmp_path / "big.csv").exists()
+
+
+def test_stream_temp_file_申告サイズ超過は読み込まずに拒否する(tmp_path: Path):
+    stream = RecordingStream(b"x" * 10)
+    repository = FileRepository(chunk_size=1024, max_upload_bytes=4096)
+    upload = UploadFile(stream, size=5000, filename="big.csv")
+
+    with pytest.raises(FileTooLargeError):
+        asyncio.run(repository.stream_temp_file(upload, str(tmp_path)))
+
+    assert stream.read_sizes == []
+
+
+def test_save_temp_file_パスを返す(tmp_path: Path):
+    repository = FileRepository()
+    upload = UploadFile(BytesIO(b"test content"), filename="test.txt")
+
+    file_location = asyncio.run(repository.save_temp_file(upload, str(tmp_path)))
+
+    assert file_location == str(tmp_path / "test.txt")
+    assert Path(file_location).read_bytes() == b"test content"
+
+
+def test_stream_temp_file_同名の同時アップロードは別のパスに保存する(tmp_path: Path):
+    storage = TempStorage(str(tmp_path / "storage"), max_age=60, max_bytes=1_000_000, sweep_budget=100)
+    repository = FileRepository(chunk_size=1024, max_upload_bytes=1_000_000, storage=storage)
+
+    async def main():
+        return await asyncio.gather(
+            repository.stream_temp_file(UploadFile(BytesIO(b"first"), filename="same.csv"), "/unused"),
+            repository.stream_temp_file(UploadFile(BytesIO(b"second"), filename="same.csv"), "/unused"),
+        )
+
+    first, second = asyncio.run(main())
+
+    assert first.path != second.path
+    assert Path(first.path).read_bytes() == b"first"
+    assert Path(second.path).read_bytes() == b"second"
+    assert storage.is_leased(first.path)
+    assert storage.size_bytes == 11
+
+    repository.delete_file(first.path)
+
+    assert not Path(first.path).exists()
+    assert storage.size_bytes == 6
+
+
+def test_allocate_temp_file_リースされた別々のパスを返す(tmp_path: Path):
+    storage = TempStorage(str(tmp_path / "storage"), max_age=60, max_bytes=1_000_000, sweep_budget=100)
+    repository = FileRepository(storage=storage)
+
+    first = repository.allocate_temp_file("copy.parquet", "/unused")
+    second = repository.allocate_temp_file("copy.parquet", "/unused")
+
+    assert first != second
+    assert os.path.basename(first) == "copy.parquet"
+    assert storage.is_leased(first)
+    assert FileRepository().allocate_temp_file("copy.parquet", str(tmp_path)).startswith(str(tmp_path))
@@ -0,0 +1,78 @@
+import os
+import sys
+import threading
+import time
+from unittest.mock import MagicMock
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src')))
+
+from services.agent_pool import AgentPool
+
+
+def make_pool():
+    project_client = MagicMock()
+    project_client.agents.create_agent.side_effect = (
+        lambda **kwargs: MagicMock(id=f"asst-{project_client.agents.create_agent.call_count}")
+    )
+    return AgentPool(project_client), project_client
+
+
+def test_get_or_create_同じ定義なら再利用する():
+    pool, project_client = make_pool()
+    tools = [{"type": "code_interpreter"}]
+
+    first = pool.get_or_create("gpt-4o-mini", "code_interpreter", "You are helpful agent", tools)
+    second = pool.get_or_create("gpt-4o-mini", "code_interpreter", "You are helpful agent", tools)
+
+    assert first is second
+    project_client.agents.create_agent.assert_called_once()
+    assert (pool.hits, pool.misses) == (1, 1)
+
+
+def test_get_or_create_定義が違えば別のエージェント():
+    pool, project_client = make_pool()
+    tools = [{"type": "code_interpreter"}]
+
+    first = pool.get_or_create("gpt-4o-mini", "code_interpreter", "A", tools)
+    second = pool.get_or_create("gpt-4o-mini", "code_interpreter", "B", tools)
+
+    assert first.id != second.id
+    assert project_client.agents.create_agent.call_count == 2
+    assert (pool.hits, pool.misses) == (0, 2)
+
+
+def test_get_or_create_並行呼び出しでも一度だけ作成する():
+    pool, project_client = make_pool()
+    create = project_client.agents.create_agent.side_effect
+
+    def slow_create(**kwargs):
+        time.sleep(0.05)
+        return create(**kwargs)
+
+    project_client.agents.create_agent.side_effect = slow_create
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(
+            pool.get_or_create("gpt-4o-mini", "code_interpreter", "A", [])
+        ))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({agent.id for agent in results}) == 1
+    project_client.agents.create_agent.assert_called_once()
+    assert (pool.hits, pool.misses) == (7, 1)
+
+
+def test_close_プールのエージェントを削除する():
+    pool, project_client = make_pool()
+    agent = pool.get_or_create("gpt-4o-mini", "code_interpreter", "A", [])
+
+    pool.close()
+
+    project_client.agents.delete_agent.assert_called_once_with(agent.id)
+    pool.get_or_create("gpt-4o-mini", "code_interpreter", "A", [])
+    assert project_client.agents.create_agent.call_count == 2
@@ -1,13 +1,24 @@
+import asyncio
+import base64
 import os
 from pathlib import Path
 import sys
 import logging
+import tempfile
+import threading
+import time
 import unittest
-from unittest.mock import MagicMock, patch
+import zipfile
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src')))
 
+from repositories.file_repository import StoredFile
 from services.code_interpreter_service import CodeInterpreterService
+from services.csv_ingest import CsvIngestor
+from utils.disk_cache import DiskCache
+from utils.executor import BlockingExecutor
 
 
 class DummyImageFile:
@@ -83,6 +94,12 @@ class TestCodeInterpreterServiceHandleRunCompletion(unittest.TestCase):
         self.project_client.agents.delete_file.assert_called_once_with(file_id)
 
 
+    def save_images(self, thread_id):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        with patch("services.code_interpreter_service.ARTIFACT_DIR", temp_dir.name):
+            return asyncio.run(self.service.save_generated_images(thread_id))
+
     @patch("services.code_interpreter_service.tracer", return_value=DummyTracerSpan())
     @patch("services.code_interpreter_service.logging")
     def test_save_generated_images_画像が生成される(self, mock_logging, mock_tracer):
@@ -92,17 +109,37 @@ class TestCodeInterpreterServiceHandleRunCompletion(unittest.TestCase):
         # Setup the list_messages mock to return dummy messages with a valid image content.
         dummy_messages = DummyMessages([DummyImageContent("test_id")])
         self.project_client.agents.list_messages = MagicMock(return_value=dummy_messages)
-        self.project_client.agents.save_file = MagicMock()
+        self.project_client.agents.get_file_content = MagicMock(return_value=iter([b"png"]))
 
         # Call the method under test
-        result = self.service.save_generated_images(thread_id)
+        result = self.save_images(thread_id)
+
+        # The image is spooled outside the working directory and returned by path.
+        self.assertEqual(os.path.basename(result), expected_file_name)
+        self.assertNotEqual(os.path.dirname(result), os.getcwd())
+        self.project_client.agents.save_file.assert_not_called()
+        mock_logging.info.assert_any_call(f"Saved image file to: {result}")
+
+    @patch("services.code_interpreter_service.tracer", return_value=DummyTracerSpan())
+    @patch("services.code_interpreter_service.logging")
+    def test_save_generated_images_複数の画像は並行して取得しzipで返す(self, mock_logging, mock_tracer):
+        dummy_messages = DummyMessages([DummyImageContent(f"img-{i}") for i in range(3)])
+        self.project_client.agents.list_messages = MagicMock(return_value=dummy_messages)
+        barrier = threading.Barrier(3, timeout=5)
+
+        def get_file_content(file_id):
+            # Every download must be in flight at once to get past the barrier.
+            barrier.wait()
+            return iter([file_id.encode()])
+
+        self.project_client.agents.get_file_content = MagicMock(side_effect=get_file_content)
 
-        # Assert the expected file name is returned.
-        self.assertEqual(result, expected_file_name)
-        # Confirm that the file was saved to the expected location (logged)
-        saved_path = Path.cwd() / expected_file_name
-        mock_logging.info.assert_any_call(f"Saved image file to: {saved_path}")
+        result = self.save_images("thread-1")
 
+        with zipfile.ZipFile(result) as archive:
+            self.assertEqual(sorted(archive.namelist()),
+                             [f"img-{i}_image_file.png" for i in range(3)])
+            self.assertEqual(archive.read("img-1_image_file.png"), b"img-1")
 
     @patch("services.code_interpreter_service.tracer", return_value=DummyTracerSpan())
     @patch("services.code_interpreter_service.logging")
@@ -115,11 +152,457 @@ class TestCodeInterpreterServiceHandleRunCompletion(unittest.TestCase):
 
         # Call the method under test
         with self.assertRaises(Exception) as e:
-            self.service.save_generated_images(thread_id)
+            self.save_images(thread_id)
 
         # Assert that an exception is raised
         self.assertEqual(str(e.exception), "No generated images found.")
 
 
+class TestCodeInterpreterServiceProcessFileAndMessage(unittest.TestCase):
+    def setUp(self):
+        self.project_client = MagicMock()
+        self.project_client.agents.list_messages.return_value = DummyMessages([DummyImageContent("test_id")])
+        self.project_client.agents.get_file_content.side_effect = lambda file_id: iter([b"png"])
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        artifact_dir = patch("services.code_interpreter_service.ARTIFACT_DIR", temp_dir.name)
+        artifact_dir.start()
+        self.addCleanup(artifact_dir.stop)
+        self.file_location = os.path.join(temp_dir.name, "test.csv")
+        with open(self.file_location, "wb") as f:
+            f.write(b"a,b\n1,2\n")
+        self.file_repository = MagicMock()
+        self.file_repository.stream_temp_file = AsyncMock(
+            return_value=StoredFile(self.file_location, "hash-1", os.path.getsize(self.file_location))
+        )
+        self.executor = BlockingExecutor(max_workers=1)
+        self.service = CodeInterpreterService(self.project_client,
+                                                self.file_repository,
+                                                MagicMock(),
+                                                executor=self.executor)
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def test_process_file_and_message_SDK呼び出しがイベントループ外で実行される(self):
+        loop_thread = threading.get_ident()
+        sdk_threads = []
+        self.project_client.agents.create_and_process_run.side_effect = (
+            lambda **kwargs: sdk_threads.append(threading.get_ident()) or MagicMock(status="completed")
+        )
+
+        result = asyncio.run(self.service.process_file_and_message(MagicMock(), "test message"))
+
+        self.assertEqual(os.path.basename(result), "test_id_image_file.png")
+        self.assertEqual(len(sdk_threads), 1)
+        self.assertNotEqual(sdk_threads[0], loop_thread)
+        self.file_repository.delete_file.assert_called_once_with(self.file_location)
+
+    def test_process_file_and_message_エージェントを再利用しファイルはスレッドに添付する(self):
+        self.project_client.agents.upload_file_and_poll.return_value = MagicMock(id="file-1")
+
+        asyncio.run(self.service.process_file_and_message(MagicMock(), "first"))
+        asyncio.run(self.service.process_file_and_message(MagicMock(), "second"))
+
+        self.project_client.agents.create_agent.assert_called_once()
+        self.assertNotIn("tool_resources", self.project_client.agents.create_agent.call_args.kwargs)
+        resources = self.project_client.agents.create_thread.call_args.kwargs["tool_resources"]
+        self.assertEqual(resources.code_interpreter.file_ids, ["file-1"])
+
+    def test_process_file_and_message_同じ内容のファイルは再アップロードしない(self):
+        self.project_client.agents.upload_file_and_poll.return_value = MagicMock(id="file-1")
+
+        asyncio.run(self.service.process_file_and_message(MagicMock(), "first"))
+        asyncio.run(self.service.process_file_and_message(MagicMock(), "second"))
+
+        self.project_client.agents.upload_file_and_poll.assert_called_once()
+        self.project_client.agents.delete_file.assert_not_called()
+        self.assertEqual(self.service.file_cache.bytes_saved, os.path.getsize(self.file_location))
+
+    def test_process_file_and_message_同じ内容の同時アップロードは重複分だけ削除する(self):
+        uploads = iter([MagicMock(id="file-1"), MagicMock(id="file-2")])
+        barrier = threading.Barrier(2)
+
+        def upload_file_and_poll(**kwargs):
+            # Both requests miss the cache before either upload is cached.
+            barrier.wait(timeout=5)
+            return next(uploads)
+
+        self.project_client.agents.upload_file_and_poll.side_effect = upload_file_and_poll
+        executor = BlockingExecutor(max_workers=2)
+        self.addCleanup(executor.shutdown)
+        self.service.executor = executor
+
+        async def main():
+            await asyncio.gather(
+                self.service.process_file_and_message(MagicMock(), "first"),
+                self.service.process_file_and_message(MagicMock(), "second"),
+            )
+
+        asyncio.run(main())
+
+        deleted = [c.args[0] for c in self.project_client.agents.delete_file.call_args_list]
+        self.assertEqual(len(deleted), 1)
+        self.assertTrue(self.service.file_cache.owns("file-1") or self.service.file_cache.owns("file-2"))
+        self.assertFalse(self.service.file_cache.owns(deleted[0]))
+
+
+    def test_process_file_and_message_作成したスレッドを回収対象に登録する(self):
+        self.service.reaper = MagicMock()
+        self.project_client.agents.create_thread.return_value = MagicMock(id="thread-1")
+
+        calls = []
+        self.service.reaper.track.side_effect = lambda kind, identifier: calls.append(("track", identifier))
+        self.project_client.agents.create_and_process_run.side_effect = (
+            lambda **kwargs: calls.append(("run", kwargs["thread_id"])) or MagicMock(status="completed")
+        )
+
+        asyncio.run(self.service.process_file_and_message(MagicMock(), "test message"))
+
+        # Tracked when created, and again after the run so its grace period
+        # starts once the thread is no longer in use.
+        self.assertEqual(calls, [("track", "thread-1"), ("run", "thread-1"), ("track", "thread-1")])
+
+    def test_stored_upload_例外時も保存したファイルを削除する(self):
+        async def main():
+            async with self.service.stored_upload(MagicMock()) as stored:
+                self.assertEqual(stored.path, self.file_location)
+                self.file_repository.delete_file.assert_not_called()
+                raise ValueError("failed")
+
+        with self.assertRaises(ValueError):
+            asyncio.run(main())
+
+        self.file_repository.delete_file.assert_called_once_with(self.file_location)
+
+    def test_process_file_and_message_CSVは取り込んだコピーと概要を送る(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        pin_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(pin_dir.cleanup)
+        cache = DiskCache(cache_dir.name, max_bytes=1024 * 1024, max_entries=10, ttl_seconds=60)
+        self.service.ingestor = CsvIngestor(cache=cache, enabled=True)
+        self.file_repository.allocate_temp_file.side_effect = lambda name, destination: os.path.join(pin_dir.name, name)
+
+        uploaded = []
+
+        def upload_file_and_poll(file_path, purpose):
+            # The cache may evict the copy while it uploads.
+            for name in os.listdir(cache_dir.name):
+                os.remove(os.path.join(cache_dir.name, name))
+            with open(file_path, "rb") as f:
+                uploaded.append(f.read())
+            return MagicMock(id="file-1")
+
+        self.project_client.agents.upload_file_and_poll.side_effect = upload_file_and_poll
+
+        asyncio.run(self.service.process_file_and_message(MagicMock(), "test message"))
+
+        uploaded_path = self.project_client.agents.upload_file_and_poll.call_args.kwargs["file_path"]
+        self.assertEqual(os.path.dirname(uploaded_path), pin_dir.name)
+        self.assertTrue(uploaded[0])
+        content = self.project_client.agents.create_message.call_args.kwargs["content"]
+        self.assertTrue(content.startswith("test message\n\nThe attached file is"))
+        self.assertIn("- a (float", content)
+        deleted = [c.args[0] for c in self.file_repository.delete_file.call_args_list]
+        self.assertEqual(sorted(deleted), sorted([uploaded_path, self.file_location]))
+
+class TestCodeInterpreterServiceResultCache(unittest.TestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.temp_dir = temp_dir.name
+        self.project_client = MagicMock()
+        self.project_client.agents.list_messages.return_value = DummyMessages([DummyImageContent("test_id")])
+        self.project_client.agents.get_file_content.side_effect = self.get_file_content
+        artifact_dir = patch("services.code_interpreter_service.ARTIFACT_DIR", self.temp_dir)
+        artifact_dir.start()
+        self.addCleanup(artifact_dir.stop)
+        self.file_repository = MagicMock()
+        self.file_repository.stream_temp_file = AsyncMock(side_effect=self.stream_temp_file)
+        self.executor = BlockingExecutor(max_workers=4)
+        self.addCleanup(self.executor.shutdown)
+        self.result_cache = DiskCache(os.path.join(self.temp_dir, "cache"), max_bytes=1024, max_entries=10, ttl_seconds=60)
+        self.service = CodeInterpreterService(self.project_client,
+                                                self.file_repository,
+                                                MagicMock(),
+                                                executor=self.executor,
+                                                result_cache=self.result_cache)
+
+    def stream_temp_file(self, file, destination):
+        fd, path = tempfile.mkstemp(dir=self.temp_dir)
+        os.write(fd, b"a,b\n1,2\n")
+        os.close(fd)
+        return StoredFile(path, "hash-1", 8)
+
+    def get_file_content(self, file_id):
+        time.sleep(0.05)
+        return iter([b"png"])
+
+    def test_process_file_and_message_同じ依頼はキャッシュから返す(self):
+        first = asyncio.run(self.service.process_file_and_message(MagicMock(), "plot  it"))
+        second = asyncio.run(self.service.process_file_and_message(MagicMock(), " plot it "))
+
+        self.assertEqual(Path(first).read_bytes(), Path(second).read_bytes())
+        self.project_client.agents.create_and_process_run.assert_called_once()
+        self.assertEqual(self.result_cache.hits, 1)
+
+    def test_process_file_and_message_キャッシュから追い出されても返したファイルは残る(self):
+        asyncio.run(self.service.process_file_and_message(MagicMock(), "plot it"))
+        result = asyncio.run(self.service.process_file_and_message(MagicMock(), "plot it"))
+
+        cache_dir = str(self.result_cache.directory)
+        self.assertNotEqual(os.path.dirname(result), cache_dir)
+        for name in os.listdir(cache_dir):
+            os.remove(os.path.join(cache_dir, name))
+        self.assertEqual(Path(result).read_bytes(), b"png")
+
+    def test_process_file_and_message_同時の同じ依頼は一度だけ実行する(self):
+        async def main():
+            return await asyncio.gather(
+                *(self.service.process_file_and_message(MagicMock(), "plot it") for _ in range(3))
+            )
+
+        results = asyncio.run(main())
+
+        self.assertEqual(len(set(results)), 1)
+        self.project_client.agents.create_and_process_run.assert_called_once()
+        self.assertEqual(self.service.single_flight.coalesced, 2)
+        self.assertEqual(self.file_repository.delete_file.call_count, 3)
+
+    def test_process_file_and_message_先行した依頼が取り消されても同じ依頼は結果を受け取る(self):
+        async def main():
+            leader = asyncio.ensure_future(self.service.process_file_and_message(MagicMock(), "plot it"))
+            await asyncio.sleep(0.01)
+            follower = asyncio.ensure_future(self.service.process_file_and_message(MagicMock(), "plot it"))
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            await asyncio.gather(leader, return_exceptions=True)
+            # The shared run still owns the leader's upload.
+            self.assertEqual(self.file_repository.delete_file.call_count, 0)
+            return await follower
+
+        result = asyncio.run(main())
+
+        self.assertTrue(result)
+        self.project_client.agents.create_and_process_run.assert_called_once()
+        self.assertEqual(self.file_repository.delete_file.call_count, 2)
+
+
+    def test_process_file_and_message_取り消してもアップロードのリースを解放する(self):
+        def upload_file_and_poll(file_path, purpose):
+            time.sleep(0.2)
+            return MagicMock(id="file-1")
+
+        self.project_client.agents.upload_file_and_poll.side_effect = upload_file_and_poll
+
+        async def main():
+            request = asyncio.ensure_future(self.service.process_file_and_message(MagicMock(), "plot it"))
+            await asyncio.sleep(0.05)
+            request.cancel()
+            await asyncio.gather(request, return_exceptions=True)
+
+        asyncio.run(main())
+        # Let the abandoned upload finish.
+        self.executor.shutdown(wait=True)
+
+        self.assertTrue(self.service.file_cache.owns("file-1"))
+        self.assertFalse(self.service.file_cache.release("file-1"))
+
+class TestCodeInterpreterServiceBatch(unittest.TestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.temp_dir = temp_dir.name
+        self.project_client = MagicMock()
+        self.project_client.agents.upload_file_and_poll.return_value = MagicMock(id="file-1")
+        self.project_client.agents.create_thread.side_effect = (
+            lambda **kwargs: MagicMock(id=f"thread-{self.project_client.agents.create_thread.call_count}")
+        )
+        self.project_client.agents.create_and_process_run.return_value = MagicMock(status="completed")
+        self.project_client.agents.list_messages.side_effect = self.list_messages
+        self.project_client.agents.get_file_content.side_effect = lambda file_id: iter([b"png"])
+        self.file_repository = MagicMock()
+        self.file_repository.stream_temp_file = AsyncMock(
+            return_value=StoredFile(os.path.join(self.temp_dir, "upload.csv"), "hash-1", 8)
+        )
+        self.executor = BlockingExecutor(max_workers=4)
+        self.addCleanup(self.executor.shutdown)
+        self.service = CodeInterpreterService(self.project_client,
+                                                self.file_repository,
+                                                MagicMock(),
+                                                executor=self.executor)
+
+    def list_messages(self, thread_id):
+        # Every run on a thread adds one more image to its history.
+        runs = self.project_client.agents.create_and_process_run.call_args_list
+        count = sum(1 for call in runs if call.kwargs["thread_id"] == thread_id)
+        return DummyMessages([DummyImageContent(f"{thread_id}-{i}") for i in range(count)])
+
+    def run_batch(self, messages, independent):
+        archive_path = asyncio.run(self.service.process_batch(MagicMock(), messages, independent))
+        self.addCleanup(os.remove, archive_path)
+        with zipfile.ZipFile(archive_path) as archive:
+            return archive.namelist(), json.loads(archive.read("manifest.json"))
+
+    def test_process_batch_独立した依頼はスレッドを分けて実行する(self):
+        names, manifest = self.run_batch(["first", "second", "third"], independent=True)
+
+        self.project_client.agents.upload_file_and_poll.assert_called_once()
+        self.project_client.agents.create_agent.assert_called_once()
+        self.assertEqual(self.project_client.agents.create_thread.call_count, 3)
+        self.assertEqual([r["status"] for r in manifest], ["completed"] * 3)
+        self.assertEqual(len(names), 4)
+        # The upload stays in the project file cache for later requests.
+        self.project_client.agents.delete_file.assert_not_called()
+        self.file_repository.delete_file.assert_called_once()
+
+    def test_process_batch_順番に実行する場合は同じスレッドで新しい画像だけを返す(self):
+        names, manifest = self.run_batch(["first", "second"], independent=False)
+
+        self.project_client.agents.create_thread.assert_called_once()
+        self.assertEqual(manifest[0]["images"], ["00_thread-1-0_image_file.png"])
+        self.assertEqual(manifest[1]["images"], ["01_thread-1-1_image_file.png"])
+
+    def test_process_batch_失敗した依頼はマニフェストに記録する(self):
+        self.project_client.agents.create_and_process_run.side_effect = [
+            MagicMock(status="completed"), Exception("run failed")
+        ]
+
+        _, manifest = self.run_batch(["first", "second"], independent=False)
+
+        self.assertEqual(manifest[0]["status"], "completed")
+        self.assertEqual(manifest[1]["status"], "failed")
+        self.assertEqual(manifest[1]["error"], "run failed")
+
+
+    def test_process_batch_失敗してもアップロードしたファイルを解放する(self):
+        self.project_client.agents.create_agent.side_effect = Exception("agent failed")
+
+        with patch.object(self.service, "delete_uploaded_file",
+                          wraps=self.service.delete_uploaded_file) as delete_uploaded_file:
+            with self.assertRaises(Exception):
+                asyncio.run(self.service.process_batch(MagicMock(), ["first"]))
+
+        delete_uploaded_file.assert_called_once_with("file-1")
+        self.file_repository.delete_file.assert_called_once()
+
+
+class FakeRunStream:
+    def __init__(self, event_handler, image_ids):
+        self.event_handler = event_handler
+        self.image_ids = image_ids
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    def until_done(self):
+        handler = self.event_handler
+        handler.on_thread_run(MagicMock(status="in_progress"))
+        handler.on_message_delta(MagicMock(text="Here "))
+        handler.on_message_delta(MagicMock(text="it is"))
+        message = MagicMock(status="completed",
+                            image_contents=[DummyImageContent(i) for i in self.image_ids])
+        handler.on_thread_message(message)
+        # The same message may be reported again; images are only sent once.
+        handler.on_thread_message(message)
+        handler.on_thread_run(MagicMock(status="completed"))
+
+
+class TestCodeInterpreterServiceStream(unittest.TestCase):
+    def setUp(self):
+        self.project_client = MagicMock()
+        self.project_client.agents.upload_file_and_poll.return_value = MagicMock(id="file-1")
+        self.project_client.agents.create_thread.return_value = MagicMock(id="thread-1")
+        self.project_client.agents.create_stream.side_effect = (
+            lambda thread_id, assistant_id, event_handler: FakeRunStream(event_handler, ["img-1", "img-2"])
+        )
+        self.project_client.agents.get_file_content.side_effect = lambda file_id: iter([b"png-", file_id.encode()])
+        self.file_repository = MagicMock()
+        self.file_repository.stream_temp_file = AsyncMock(return_value=StoredFile("/tmp/upload.csv", "hash-1", 8))
+        self.executor = BlockingExecutor(max_workers=4)
+        self.addCleanup(self.executor.shutdown)
+        self.service = CodeInterpreterService(self.project_client,
+                                                self.file_repository,
+                                                MagicMock(),
+                                                executor=self.executor)
+
+    def collect(self):
+        async def main():
+            return [event async for event in self.service.stream_file_and_message(MagicMock(), "plot it")]
+        return asyncio.run(main())
+
+    def test_stream_file_and_message_実行中のイベントと画像を順に返す(self):
+        events = self.collect()
+        names = [event for event, _ in events]
+
+        self.assertEqual(names[0], "thread")
+        self.assertEqual(names[-1], "done")
+        self.assertEqual([d["text"] for e, d in events if e == "delta"], ["Here ", "it is"])
+        self.assertEqual([d["file_id"] for e, d in events if e == "image"], ["img-1", "img-2"])
+        artifacts = {d["file_id"]: d for e, d in events if e == "artifact"}
+        self.assertEqual(base64.b64decode(artifacts["img-1"]["content"]), b"png-img-1")
+        self.assertEqual(events[-1][1], {"status": "completed", "text": "Here it is", "images": ["img-1", "img-2"]})
+        self.project_client.agents.create_and_process_run.assert_not_called()
+        self.project_client.agents.list_messages.assert_not_called()
+        self.file_repository.delete_file.assert_called_once_with("/tmp/upload.csv")
+
+    def test_stream_file_and_message_画像の取得に失敗してもストリームは続く(self):
+        self.project_client.agents.get_file_content.side_effect = Exception("not found")
+
+        events = self.collect()
+
+        errors = [d for e, d in events if e == "artifact"]
+        self.assertEqual([d["error"] for d in errors], ["not found", "not found"])
+        self.assertEqual(events[-1][0], "done")
+
+
+    def test_stream_file_and_message_失敗してもアップロードしたファイルを解放する(self):
+        self.project_client.agents.create_thread.side_effect = Exception("thread failed")
+
+        with patch.object(self.service, "delete_uploaded_file",
+                          wraps=self.service.delete_uploaded_file) as delete_uploaded_file:
+            with self.assertRaises(Exception):
+                self.collect()
+
+        delete_uploaded_file.assert_called_once_with("file-1")
+        self.file_repository.delete_file.assert_called_once_with("/tmp/upload.csv")
+
+    def test_stream_file_and_message_切断されたら実行完了後にファイルを解放する(self):
+        run_started = threading.Event()
+        finish_run = threading.Event()
+
+        def create_stream(thread_id, assistant_id, event_handler):
+            run_started.set()
+            finish_run.wait(timeout=5)
+            return FakeRunStream(event_handler, [])
+
+        self.project_client.agents.create_stream.side_effect = create_stream
+        released = threading.Event()
+        delete_uploaded_file = MagicMock(side_effect=lambda file_id: released.set())
+
+        async def main():
+            stream = self.service.stream_file_and_message(MagicMock(), "plot it")
+            self.assertEqual((await stream.__anext__())[0], "thread")
+            next_event = asyncio.ensure_future(stream.__anext__())
+            await asyncio.get_running_loop().run_in_executor(None, run_started.wait, 5)
+            next_event.cancel()
+            await asyncio.gather(next_event, return_exceptions=True)
+            await stream.aclose()
+
+        with patch.object(self.service, "delete_uploaded_file", delete_uploaded_file):
+            asyncio.run(main())
+            # The run is still going, so the file is not released yet.
+            delete_uploaded_file.assert_not_called()
+            self.file_repository.delete_file.assert_called_once_with("/tmp/upload.csv")
+            finish_run.set()
+            self.assertTrue(released.wait(timeout=5))
+
+        delete_uploaded_file.assert_called_once_with("file-1")
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,116 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src')))
+
+import pytest
+
+from repositories.file_repository import StoredFile
+from services import csv_ingest
+from services.csv_ingest import CsvIngestor, parse_number
+from utils.disk_cache import DiskCache
+from utils.hashing import hash_file
+
+CONTENT = (
+    'name,code,revenue,margin,note\n'
+    '3M India Ltd.,523395,"1,057",18.48%,\n'
+    'ACC Ltd.,ASM,"4,644.8",12.39%,x\n'
+    'APL Apollo Tubes Ltd.,533758,-167.2,7.02%,\n'
+)
+
+
+@pytest.fixture
+def stored(tmp_path):
+    path = tmp_path / "upload" / "results.csv"
+    path.parent.mkdir()
+    path.write_text(CONTENT, encoding="utf-8")
+    content_hash, size = hash_file(str(path))
+    return StoredFile(str(path), content_hash, size)
+
+
+@pytest.fixture
+def ingestor(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache"), max_bytes=1024 * 1024, max_entries=10, ttl_seconds=60)
+    return CsvIngestor(cache=cache, enabled=True)
+
+
+def test_parse_number_桁区切りとパーセントを取り除く():
+    assert parse_number('1,057') == 1057.0
+    assert parse_number(' -1,282.1 ') == -1282.1
+    assert parse_number('18.48%') == 18.48
+    assert parse_number('7,9') is None
+    assert parse_number('ASM') is None
+    assert parse_number('') is None
+
+
+def test_ingest_数値列を正規化し概要を返す(stored, ingestor, monkeypatch):
+    # The csv module path runs wherever pandas is missing.
+    monkeypatch.setattr(csv_ingest, "_pandas", lambda: None)
+
+    ingested = ingestor.ingest(stored)
+
+    with open(ingested.path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    assert lines[1] == "3M India Ltd.,523395,1057,18.48,"
+    assert ingested.size < stored.size
+    assert ingested.content_hash != stored.content_hash
+    assert "It has 3 rows and 5 columns." in ingested.summary
+    assert "- code (str, 3 distinct)" in ingested.summary
+    assert "- revenue (float, min -167.2, max 4644.8, mean 1844.87)" in ingested.summary
+    assert "- margin (float, percent, % removed," in ingested.summary
+    assert "- note (str, 1 distinct, 2 missing)" in ingested.summary
+
+
+def test_ingest_崩れた数値は空にして件数を概要に含める(tmp_path, ingestor, monkeypatch):
+    monkeypatch.setattr(csv_ingest, "_pandas", lambda: None)
+    path = tmp_path / "garbled.csv"
+    path.write_text("value\n" + "".join(f"{i}\n" for i in range(30)) + '"7,9"\n', encoding="utf-8")
+    content_hash, size = hash_file(str(path))
+
+    ingested = ingestor.ingest(StoredFile(str(path), content_hash, size))
+
+    with open(ingested.path, encoding="utf-8") as f:
+        assert f.read().splitlines()[-1] == '""'
+    assert "1 unparsed, left empty" in ingested.summary
+
+
+def test_ingest_同じ内容は再利用する(stored, ingestor, monkeypatch):
+    monkeypatch.setattr(csv_ingest, "_pandas", lambda: None)
+
+    first = ingestor.ingest(stored)
+    second = ingestor.ingest(stored)
+
+    assert second == first
+    assert ingestor.stats()["parsed"] == 1
+    assert ingestor.stats()["reused"] == 1
+
+
+def test_ingest_CSV以外と無効時はNone(tmp_path, stored):
+    path = tmp_path / "data.xlsx"
+    path.write_bytes(b"binary")
+    cache = DiskCache(str(tmp_path / "cache"), max_bytes=1024, max_entries=10, ttl_seconds=60)
+
+    assert CsvIngestor(cache=cache, enabled=True).ingest(StoredFile(str(path), "hash", 6)) is None
+    assert CsvIngestor(cache=cache, enabled=False).ingest(stored) is None
+
+
+def test_ingest_上限を超えるファイルはそのまま送る(tmp_path, stored):
+    cache = DiskCache(str(tmp_path / "cache"), max_bytes=1024, max_entries=10, ttl_seconds=60)
+    ingestor = CsvIngestor(cache=cache, enabled=True, max_source_bytes=stored.size - 1)
+
+    assert ingestor.ingest(stored) is None
+    assert ingestor.stats()["too_large"] == 1
+    assert ingestor.stats()["parsed"] == 0
+    assert len(cache) == 0
+
+
+def test_ingest_pandasがあればParquetに変換する(stored, ingestor):
+    import pandas
+
+    ingested = ingestor.ingest(stored)
+
+    frame = pandas.read_parquet(ingested.path)
+    assert ingested.path.endswith(".parquet")
+    assert frame["revenue"].tolist() == [1057.0, 4644.8, -167.2]
+    assert frame["code"].tolist() == ["523395", "ASM", "533758"]
+    assert "read it with pandas.read_parquet" in ingested.summary
@@ -0,0 +1,89 @@
+import asyncio
+import os
+import sys
+from unittest.mock import AsyncMock, MagicMock
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src')))
+
+from services.dynamic_sessions_pool import DynamicSessionsPool
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_pool(**kwargs):
+    repository = MagicMock()
+    repository.execute_code = AsyncMock()
+    return DynamicSessionsPool(repository, **kwargs), repository
+
+
+def test_acquire_ファイルを持つセッションを優先する():
+    pool, _ = make_pool(warm_size=0, idle_ttl=60, max_idle=4)
+    with_file = pool.acquire("hash-1")
+    with_file.add_file("hash-1", "data.csv")
+    other = pool.acquire("hash-2")
+    pool.release(with_file)
+    pool.release(other)
+
+    assert pool.acquire("hash-1") is with_file
+    assert pool.affinity_hits == 1
+
+
+def test_acquire_他のファイルを持つセッションは使わない():
+    pool, _ = make_pool(warm_size=0, idle_ttl=60, max_idle=4)
+    with_file = pool.acquire("hash-1")
+    with_file.add_file("hash-1", "data.csv")
+    pool.release(with_file)
+
+    other = pool.acquire("hash-2")
+    no_hash = pool.acquire()
+
+    assert other is not with_file
+    assert no_hash is not with_file
+    assert pool.cold_starts == 3
+    assert pool.warm_hits == 0
+
+
+def test_acquire_アイドルが長いセッションは破棄する():
+    clock = FakeClock()
+    pool, _ = make_pool(warm_size=0, idle_ttl=60, max_idle=4, clock=clock)
+    session = pool.acquire()
+    pool.release(session)
+    clock.now = 61
+
+    assert pool.acquire() is not session
+    assert pool.recycled == 1
+    assert pool.cold_starts == 2
+
+
+def test_add_file_同名のファイルは上書きとして扱う():
+    pool, _ = make_pool(warm_size=0)
+    session = pool.acquire()
+    session.add_file("hash-1", "data.csv")
+    session.add_file("hash-2", "data.csv")
+
+    assert session.files == {"hash-2": "data.csv"}
+
+
+def test_start_ウォームセッションを用意する():
+    pool, repository = make_pool(warm_size=2, idle_ttl=60)
+
+    async def main():
+        pool.start()
+        await asyncio.sleep(0.01)
+        session = pool.acquire()
+        await asyncio.sleep(0.01)
+        await pool.close()
+        return session
+
+    asyncio.run(main())
+
+    # Two warmed at start, one more to replace the leased session.
+    assert repository.execute_code.await_count == 3
+    assert pool.warm_hits == 1
+    assert pool.cold_starts == 0
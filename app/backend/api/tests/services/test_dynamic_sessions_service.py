@@ -0,0 +1,264 @@
+import asyncio
+import os
+import sys
+from io import BytesIO
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src')))
+
+from repositories.file_repository import StoredFile
+from services.dynamic_sessions_pool import DynamicSessionsPool
+from services.dynamic_sessions_service import DynamicSessionsService
+from services.generated_code_cache import GeneratedCodeCache
+from utils.executor import BlockingExecutor
+
+CODE = "import pandas as pd\ndf = pd.read_csv('/mnt/data/assistant-abc123')"
+
+
+def make_file(content: bytes, filename: str = "data.csv"):
+    file = MagicMock()
+    file.filename = filename
+    file.file = BytesIO(content)
+    return file
+
+
+def make_service():
+    repository = MagicMock()
+    repository.upload_file = AsyncMock()
+    repository.execute_code = AsyncMock(return_value={"status": "Success"})
+    executor = BlockingExecutor(max_workers=1)
+    pool = DynamicSessionsPool(repository, warm_size=0, idle_ttl=60, max_idle=4)
+    return DynamicSessionsService(repository, pool=pool, executor=executor), repository, executor
+
+
+def test_process_dynamic_session_パスを書き換えて実行する():
+    service, repository, executor = make_service()
+    try:
+        session_id = asyncio.run(service.process_dynamic_session(make_file(b"a,b\n1,2\n"), CODE))
+    finally:
+        executor.shutdown()
+
+    repository.upload_file.assert_awaited_once()
+    executed_session, executed_code = repository.execute_code.await_args.args
+    assert executed_session == session_id
+    assert "/mnt/data/data.csv" in executed_code
+
+
+def test_process_dynamic_session_同じファイルはアップロード済みのセッションを再利用する():
+    service, repository, executor = make_service()
+
+    async def main():
+        first = await service.process_dynamic_session(make_file(b"a,b\n1,2\n"), CODE)
+        second = await service.process_dynamic_session(make_file(b"a,b\n1,2\n", "renamed.csv"), CODE)
+        return first, second
+
+    try:
+        first, second = asyncio.run(main())
+    finally:
+        executor.shutdown()
+
+    assert first == second
+    repository.upload_file.assert_awaited_once()
+    # The session still has the file under its original name.
+    assert "/mnt/data/data.csv" in repository.execute_code.await_args.args[1]
+    assert service.pool.affinity_hits == 1
+
+
+def test_process_dynamic_session_失敗したセッションは再利用しない():
+    service, repository, executor = make_service()
+    repository.execute_code.side_effect = [Exception("boom"), None]
+
+    async def main():
+        try:
+            await service.process_dynamic_session(make_file(b"a"), CODE)
+        except Exception:
+            pass
+        return await service.process_dynamic_session(make_file(b"a"), CODE)
+
+    try:
+        asyncio.run(main())
+    finally:
+        executor.shutdown()
+
+    assert repository.upload_file.await_count == 2
+    assert service.pool.cold_starts == 2
+
+
+def test_execute_localバックエンドはローカルプールで実行する():
+    from services.local_interpreter_pool import ExecutionResult
+
+    repository = MagicMock()
+    local_pool = MagicMock()
+    local_pool.execute = AsyncMock(return_value=ExecutionResult(backend="local", stdout="ok\n"))
+    service = DynamicSessionsService(repository, pool=DynamicSessionsPool(repository, warm_size=0), local_pool=local_pool)
+    file = make_file(b"a,b\n1,2\n")
+
+    result = asyncio.run(service.execute(file, CODE, backend="local"))
+
+    assert result.to_dict()["stdout"] == "ok\n"
+    executed_code, executed_file = local_pool.execute.await_args.args
+    assert "pd.read_csv('./data.csv')" in executed_code
+    assert executed_file is file
+
+
+def test_execute_無効なローカルプールは使わない():
+    repository = MagicMock()
+    local_pool = MagicMock(enabled=False)
+    service = DynamicSessionsService(repository, pool=DynamicSessionsPool(repository, warm_size=0), local_pool=local_pool)
+
+    assert not service.supports("local")
+    with pytest.raises(ValueError):
+        asyncio.run(service.execute(make_file(b"a,b\n1,2\n"), CODE, backend="local"))
+    local_pool.execute.assert_not_called()
+
+
+def test_execute_既定はremoteバックエンド():
+    service, repository, executor = make_service()
+    try:
+        result = asyncio.run(service.execute(make_file(b"a,b\n1,2\n"), CODE))
+    finally:
+        executor.shutdown()
+
+    assert result.to_dict() == {"session_id": result.session_id}
+    repository.execute_code.assert_awaited_once()
+
+
+def test_execute_未対応のバックエンドは例外():
+    service, repository, executor = make_service()
+    try:
+        with pytest.raises(ValueError):
+            asyncio.run(service.execute(make_file(b"a,b\n1,2\n"), CODE, backend="local"))
+    finally:
+        executor.shutdown()
+
+
+def make_cached_service():
+    service, repository, executor = make_service()
+    service.code_cache = GeneratedCodeCache(max_entries=8, ttl_seconds=60)
+    return service, repository, executor
+
+
+def test_run_同じスキーマと質問は生成済みのコードを再利用する():
+    service, repository, executor = make_cached_service()
+    generate_code = AsyncMock(return_value=CODE)
+
+    async def main():
+        await service.run(make_file(b"a,b\n1,2\n", "q1.csv"), "Plot a", generate_code)
+        await service.run(make_file(b"a,b\n3,4\n", "q2.csv"), "plot  A", generate_code)
+
+    try:
+        asyncio.run(main())
+    finally:
+        executor.shutdown()
+
+    generate_code.assert_awaited_once()
+    executed_code = repository.execute_code.await_args_list[1].args[1]
+    assert "pd.read_csv('/mnt/data/q2.csv')" in executed_code
+
+
+def test_run_失敗したコードはキャッシュから外す():
+    service, repository, executor = make_cached_service()
+    repository.execute_code.side_effect = [
+        {"status": "Success"},
+        {"status": "Failure", "stderr": "KeyError: 'a'"},
+        {"status": "Success"},
+    ]
+    generate_code = AsyncMock(return_value=CODE)
+
+    async def main():
+        results = []
+        for _ in range(3):
+            results.append(await service.run(make_file(b"a,b\n1,2\n"), "Plot a", generate_code))
+        return results
+
+    try:
+        results = asyncio.run(main())
+    finally:
+        executor.shutdown()
+
+    assert results[1].error == "KeyError: 'a'"
+    assert generate_code.await_count == 2
+    assert service.code_cache.stats()["invalidations"] == 1
+
+
+def test_run_CSV以外はキャッシュしない():
+    service, repository, executor = make_cached_service()
+    generate_code = AsyncMock(return_value=CODE)
+
+    async def main():
+        for _ in range(2):
+            await service.run(make_file(b"binary", "data.xlsx"), "Plot a", generate_code)
+
+    try:
+        asyncio.run(main())
+    finally:
+        executor.shutdown()
+
+    assert generate_code.await_count == 2
+
+
+def test_run_コード生成中にセッションへアップロードする():
+    service, repository, executor = make_service()
+    uploaded = asyncio.Event()
+    repository.upload_file.side_effect = lambda session_id, file: uploaded.set()
+
+    async def generate_code():
+        # Only finishes if the upload runs while the code is generated.
+        await asyncio.wait_for(uploaded.wait(), 1)
+        return CODE
+
+    try:
+        result = asyncio.run(service.run(make_file(b"a,b\n1,2\n"), "Plot a", generate_code))
+    finally:
+        executor.shutdown()
+
+    assert result.error is None
+    session_id, code = repository.execute_code.await_args.args
+    assert session_id == result.session_id
+    assert "pd.read_csv('/mnt/data/data.csv')" in code
+
+
+def test_run_コード生成に失敗してもアップロード済みのセッションは再利用する():
+    service, repository, executor = make_service()
+
+    async def main():
+        with pytest.raises(RuntimeError):
+            await service.run(make_file(b"a,b\n1,2\n"), "Plot a", AsyncMock(side_effect=RuntimeError("agent failed")))
+        return await service.run(make_file(b"a,b\n1,2\n"), "Plot a", AsyncMock(return_value=CODE))
+
+    try:
+        asyncio.run(main())
+    finally:
+        executor.shutdown()
+
+    repository.upload_file.assert_awaited_once()
+    assert service.pool.stats()["leased"] == 0
+
+
+def test_run_stored_一時保存したファイルから実行する(tmp_path):
+    service, repository, executor = make_service()
+    path = tmp_path / "data.csv"
+    path.write_bytes(b"a,b\n1,2\n")
+    stored = StoredFile(str(path), "hash-1", 8)
+    uploads = []
+
+    async def upload_file(session_id, file):
+        uploads.append((file.filename, file.file.read()))
+
+    repository.upload_file.side_effect = upload_file
+
+    async def generate_code():
+        # The generator reads the spooled file through its own handle.
+        with open(stored.path, "rb") as f:
+            assert f.read() == b"a,b\n1,2\n"
+        return CODE
+
+    try:
+        asyncio.run(service.run_stored(stored, "data.csv", "Plot a", generate_code))
+    finally:
+        executor.shutdown()
+
+    assert uploads == [("data.csv", b"a,b\n1,2\n")]
+    assert service.pool.acquire("hash-1").files == {"hash-1": "data.csv"}
@@ -1,3 +1,4 @@
+import asyncio
 from io import BytesIO
 from pathlib import Path
 import sys
@@ -51,8 +52,21 @@ def test_upload_file_異常系(tmp_path: Path):
     upload_file = UploadFile(filename=filename, file=file_stream)
 
     # Act & Assert: patching shutil.copyfileobj to raise an exception simulating a failure during file copy
-    with patch("services.file_upload_service.shutil.copyfileobj", side_effect=Exception("Copy failed")):
+    with patch("utils.file_copy.shutil.copyfileobj", side_effect=Exception("Copy failed")):
         with pytest.raises(Exception) as exc_info:
             service.upload_file(upload_file, "data")
     
-    assert "Copy failed" in str(exc_info.value)
\ No newline at end of file
+    assert "Copy failed" in str(exc_info.value)
+
+def test_upload_file_async_正常系(tmp_path: Path):
+    base_dir = tmp_path / "hoge"
+    service = FileUploadService(base_dir)
+    source_path = tmp_path / "source.csv"
+    source_path.write_bytes(b"a,b\n1,2\n" * 1000)
+
+    with open(source_path, "rb") as f:
+        upload_file = UploadFile(filename="testfile.csv", file=f)
+        returned_filename = asyncio.run(service.upload_file_async(upload_file, "files"))
+
+    assert returned_filename == "testfile.csv"
+    assert (base_dir / "files" / "testfile.csv").read_bytes() == source_path.read_bytes()
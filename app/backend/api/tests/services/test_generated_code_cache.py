@@ -0,0 +1,28 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src')))
+
+from services.generated_code_cache import GeneratedCodeCache, normalize_message
+
+
+def test_normalize_message_幅と大文字小文字と空白を揃える():
+    assert normalize_message("  Plot   the ＳＡＬＥＳ\n") == "plot the sales"
+
+
+def test_key_同じ質問は同じキー():
+    assert GeneratedCodeCache.key("schema", "Plot sales") == GeneratedCodeCache.key("schema", " plot  SALES ")
+    assert GeneratedCodeCache.key("schema", "Plot sales") != GeneratedCodeCache.key("other", "Plot sales")
+
+
+def test_invalidate_エントリを削除する():
+    cache = GeneratedCodeCache(max_entries=1, ttl_seconds=60)
+    cache.put("a", "print(1)")
+    cache.put("b", "print(2)")
+    cache.invalidate("b")
+    cache.invalidate("b")
+
+    assert cache.get("a") is None
+    assert cache.get("b") is None
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["invalidations"] == 1
@@ -0,0 +1,121 @@
+import asyncio
+import os
+import sys
+from unittest.mock import MagicMock
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src')))
+
+from services.job_queue import JobQueue, JobStatus, QueueFullError
+from utils.timing import stage
+
+
+async def wait_for(job):
+    while not job.done:
+        await asyncio.sleep(0.001)
+
+
+def test_submit_同時実行数を制限する():
+    queue = JobQueue(max_workers=2, max_queue_depth=10, retention=60)
+    running = 0
+    peak = 0
+
+    async def work():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return "ok"
+
+    async def main():
+        jobs = [queue.submit("test", work) for _ in range(6)]
+        for job in jobs:
+            await wait_for(job)
+        await queue.close()
+        return jobs
+
+    jobs = asyncio.run(main())
+
+    assert peak == 2
+    assert all(job.status == JobStatus.SUCCEEDED and job.result == "ok" for job in jobs)
+
+
+def test_submit_キューが満杯なら拒否する():
+    queue = JobQueue(max_workers=1, max_queue_depth=1, retention=60)
+    cleanup = MagicMock()
+
+    async def main():
+        release = asyncio.Event()
+        queue.submit("test", release.wait)
+        await asyncio.sleep(0)  # the worker takes the first job
+        queue.submit("test", release.wait, cleanup=cleanup)
+        with pytest.raises(QueueFullError):
+            queue.submit("test", release.wait)
+        await queue.close()
+
+    asyncio.run(main())
+
+    assert queue.rejected == 1
+    # The queued job never ran, so its upload is released at shutdown.
+    cleanup.assert_called_once()
+
+
+def test_run_段階ごとの所要時間を記録する():
+    queue = JobQueue(max_workers=1, max_queue_depth=1, retention=60)
+
+    async def work():
+        with stage("execute_run"):
+            await asyncio.sleep(0.01)
+
+    async def main():
+        job = queue.submit("test", work, timings={"store_upload": 0.5})
+        await wait_for(job)
+        await queue.close()
+        return job
+
+    timings = asyncio.run(main()).to_dict()["timings"]
+
+    assert timings["store_upload"] == 0.5
+    assert timings["execute_run"] >= 0.01
+    assert set(timings) >= {"queue_wait", "run", "total"}
+
+
+def test_run_失敗したジョブはエラーを記録する():
+    queue = JobQueue(max_workers=1, max_queue_depth=1, retention=0)
+
+    async def work():
+        raise Exception("boom")
+
+    async def main():
+        job = queue.submit("test", work)
+        await wait_for(job)
+        # Finished jobs past their retention are purged on the next submit.
+        queue.submit("test", lambda: asyncio.sleep(0))
+        await queue.close()
+        return job
+
+    job = asyncio.run(main())
+
+    assert job.status == JobStatus.FAILED
+    assert job.error == "boom"
+    assert queue.get(job.identifier) is None
+
+
+def test_close_実行中のジョブは失敗として終える():
+    queue = JobQueue(max_workers=1, max_queue_depth=1, retention=60)
+
+    async def main():
+        job = queue.submit("test", lambda: asyncio.sleep(10))
+        while job.status != JobStatus.RUNNING:
+            await asyncio.sleep(0.001)
+        await queue.close()
+        return job
+
+    job = asyncio.run(main())
+
+    assert job.done
+    assert job.status == JobStatus.FAILED
+    assert job.error == "Cancelled while running"
+    assert job.finished_at is not None
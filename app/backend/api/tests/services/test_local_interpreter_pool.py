@@ -0,0 +1,154 @@
+import asyncio
+import os
+import sys
+from io import BytesIO
+from types import SimpleNamespace
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src')))
+
+import pytest
+
+from services import local_interpreter_worker
+from services.local_interpreter_pool import ExecutionError, LocalInterpreterPool
+
+
+def make_pool(tmp_path, **kwargs):
+    options = dict(enabled=True, warm_size=0, max_workers=2, cpu_seconds=2, memory_bytes=512 * 1024 * 1024,
+                   timeout=5, allow_shared_uid=True, work_dir=str(tmp_path))
+    options.update(kwargs)
+    return LocalInterpreterPool(**options)
+
+
+def run(pool, *calls):
+    async def main():
+        try:
+            return [await pool.execute(code, file) for code, file in calls]
+        finally:
+            await pool.close()
+    return asyncio.run(main())
+
+
+def test_execute_ファイルを読み標準出力と画像を返す(tmp_path):
+    pool = make_pool(tmp_path)
+    file = SimpleNamespace(filename="data.csv", file=BytesIO(b"a,b\n1,2\n"))
+    code = "print(open('data.csv').read().splitlines()[1])\nopen('plot.png', 'wb').write(b'png')"
+
+    [result] = run(pool, (code, file))
+
+    assert result.error is None
+    assert result.stdout == "1,2\n"
+    assert result.images == [("plot.png", b"png")]
+    # Each execution's directory is removed afterwards.
+    assert [name for name in os.listdir(tmp_path) if not name.startswith(".")] == []
+
+
+def test_execute_有効にしない限り実行しない(tmp_path, monkeypatch):
+    monkeypatch.delenv("LOCAL_INTERPRETER_ENABLED", raising=False)
+    pool = make_pool(tmp_path, enabled=None)
+
+    with pytest.raises(ExecutionError):
+        run(pool, ("print(1)", None))
+    assert pool.spawned == 0
+
+
+def test_execute_uidを分けられなければ明示しない限り実行しない(tmp_path):
+    # uid_base=0 turns uid separation off, as running without root does.
+    pool = make_pool(tmp_path, uid_base=0, allow_shared_uid=False)
+
+    assert not pool.enabled
+    with pytest.raises(ExecutionError):
+        run(pool, ("print(1)", None))
+    assert pool.spawned == 0
+
+
+def test_warm_up_必要なパッケージがなければ失敗する(monkeypatch):
+    monkeypatch.setenv("MPLBACKEND", "Agg")
+    monkeypatch.setitem(sys.modules, "matplotlib.pyplot", None)
+
+    with pytest.raises(ImportError):
+        local_interpreter_worker.warm_up()
+
+
+def test_execute_実行ごとに新しい子プロセスで実行する(tmp_path):
+    pool = make_pool(tmp_path)
+    code = "import builtins, os; print(hasattr(builtins, 'leaked'), os.getpid(), os.getppid()); builtins.leaked = 1"
+
+    results = run(pool, (code, None), (code, None))
+
+    first, second = (r.stdout.split() for r in results)
+    # Nothing the first run set is visible to the second.
+    assert first[0] == second[0] == "False"
+    assert first[1] != second[1]
+    # Both children were forked from the same warm parent.
+    assert first[2] == second[2]
+    assert pool.spawned == 1
+
+
+@pytest.mark.skipif(os.geteuid() != 0, reason="switching uids needs root")
+def test_execute_rootなら実行ごとに別のuidで実行する(tmp_path):
+    secret = tmp_path / "secret.txt"
+    secret.write_text("secret")
+    secret.chmod(0o600)
+    pool = make_pool(tmp_path / "work", uid_base=200000)
+    code = (
+        "import os; print(os.getuid())\n"
+        f"try:\n    open({str(secret)!r}).read()\nexcept PermissionError:\n    print('denied')"
+    )
+
+    async def main():
+        try:
+            return await asyncio.gather(pool.execute(code), pool.execute(code))
+        finally:
+            await pool.close()
+
+    results = asyncio.run(main())
+
+    uids = {int(r.stdout.split()[0]) for r in results}
+    assert uids == {200000, 200001}
+    assert all(r.stdout.split()[1] == "denied" for r in results)
+
+
+def test_execute_環境変数を引き継がない(tmp_path, monkeypatch):
+    monkeypatch.setenv("PROJECT_CONNECTION_STRING", "secret")
+    pool = make_pool(tmp_path)
+
+    [result] = run(pool, ("import os; print(os.environ.get('PROJECT_CONNECTION_STRING'))", None))
+
+    assert result.stdout == "None\n"
+
+
+def test_execute_例外はエラーとして返す(tmp_path):
+    pool = make_pool(tmp_path)
+
+    results = run(pool, ("raise SystemExit(3)", None), ("print('ok')", None))
+
+    assert "SystemExit: 3" in results[0].error
+    assert results[1].stdout == "ok\n"
+    assert pool.spawned == 1
+
+
+def test_execute_時間制限を超えると打ち切る(tmp_path):
+    pool = make_pool(tmp_path, timeout=0.5)
+
+    results = run(pool, ("import time; time.sleep(5)", None), ("print('ok')", None))
+
+    assert "Time limit" in results[0].error
+    assert results[1].stdout == "ok\n"
+    # Only the child is killed; its warm parent runs the next execution.
+    assert pool.spawned == 1
+
+
+def test_execute_CPU制限を超えると打ち切る(tmp_path):
+    pool = make_pool(tmp_path, cpu_seconds=1, timeout=10)
+
+    [result] = run(pool, ("while True: pass", None))
+
+    assert "CPU time limit" in result.error
+
+
+def test_execute_メモリ制限を超えるとエラー(tmp_path):
+    pool = make_pool(tmp_path, memory_bytes=256 * 1024 * 1024)
+
+    [result] = run(pool, ("x = bytearray(512 * 1024 * 1024)", None))
+
+    assert result.error == "Memory limit exceeded"
@@ -0,0 +1,70 @@
+import os
+import sys
+from unittest.mock import MagicMock
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src')))
+
+from services.project_file_cache import ProjectFileCache
+
+
+def test_acquire_ヒット時に節約したバイト数を記録する():
+    cache = ProjectFileCache(MagicMock(), max_entries=2, ttl_seconds=60)
+    uploaded_file = MagicMock(id="file-1")
+    cache.put("hash-1", uploaded_file)
+
+    assert cache.acquire("hash-1", 100) is uploaded_file
+    assert cache.acquire("hash-2", 100) is None
+    assert cache.bytes_saved == 100
+    assert cache.owns("file-1")
+
+
+def test_put_追い出されたファイルはプロジェクトから削除する():
+    project_client = MagicMock()
+    cache = ProjectFileCache(project_client, max_entries=1, ttl_seconds=60)
+    cache.put("hash-1", MagicMock(id="file-1"))
+    cache.release("file-1")
+    cache.put("hash-2", MagicMock(id="file-2"))
+
+    project_client.agents.delete_file.assert_called_once_with("file-1")
+    assert not cache.owns("file-1")
+    assert cache.owns("file-2")
+
+
+def test_put_使用中のファイルは最後の解放まで削除しない():
+    project_client = MagicMock()
+    cache = ProjectFileCache(project_client, max_entries=1, ttl_seconds=60)
+    cache.put("hash-1", MagicMock(id="file-1"))
+    cache.acquire("hash-1", 10)
+    cache.put("hash-2", MagicMock(id="file-2"))
+
+    assert cache.release("file-1")
+    project_client.agents.delete_file.assert_not_called()
+    assert cache.release("file-1")
+    project_client.agents.delete_file.assert_called_once_with("file-1")
+
+
+def test_put_同じ内容の同時アップロードは先に登録したファイルを使う():
+    project_client = MagicMock()
+    cache = ProjectFileCache(project_client, max_entries=2, ttl_seconds=60)
+    first, duplicate = MagicMock(id="file-1"), MagicMock(id="file-2")
+
+    assert cache.put("hash-1", first) is first
+    assert cache.put("hash-1", duplicate) is first
+
+    project_client.agents.delete_file.assert_not_called()
+    assert not cache.release("file-2")
+    assert cache.release("file-1") and cache.release("file-1")
+    assert cache.acquire("hash-1", 10) is first
+
+
+def test_close_全てのファイルを削除する():
+    project_client = MagicMock()
+    cache = ProjectFileCache(project_client, max_entries=2, ttl_seconds=60)
+    cache.put("hash-1", MagicMock(id="file-1"))
+    cache.put("hash-2", MagicMock(id="file-2"))
+    cache.release("file-1")
+    cache.release("file-2")
+
+    cache.close()
+
+    assert project_client.agents.delete_file.call_count == 2
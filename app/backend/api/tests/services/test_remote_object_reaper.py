@@ -0,0 +1,142 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from unittest.mock import MagicMock
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src')))
+
+from azure.core.exceptions import ResourceNotFoundError
+
+from services.remote_object_reaper import RemoteObjectReaper
+from utils.executor import BlockingExecutor
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_reaper(project_client, **kwargs):
+    executor = BlockingExecutor(max_workers=4)
+    options = {"grace_period": 60, "interval": 1, "batch_size": 10, "concurrency": 4,
+               "rate_limit": 0, "max_attempts": 2, "clock": FakeClock()}
+    options.update(kwargs)
+    return RemoteObjectReaper(project_client, executor=executor, **options), executor
+
+
+def test_reap_猶予期間を過ぎたものだけを削除する():
+    project_client = MagicMock()
+    reaper, executor = make_reaper(project_client)
+    reaper.track("thread", "thread-1")
+    reaper.track("file", "file-1", grace_period=0)
+    reaper.clock.now = 30
+    reaper.track("thread", "thread-2")
+
+    try:
+        first = asyncio.run(reaper.reap())
+        reaper.clock.now = 61
+        second = asyncio.run(reaper.reap())
+    finally:
+        executor.shutdown()
+
+    # file-1 is due at once even though it was tracked after thread-1.
+    assert first == 1
+    assert second == 1
+    project_client.agents.delete_thread.assert_called_once_with("thread-1")
+    project_client.agents.delete_file.assert_called_once_with("file-1")
+    assert reaper.stats()["backlog"] == 1
+    assert reaper.reclaimed == 2
+
+
+def test_track_再登録すると猶予期間が延びる():
+    project_client = MagicMock()
+    reaper, executor = make_reaper(project_client)
+    reaper.track("thread", "thread-1")
+    reaper.clock.now = 50
+    # The run on the thread finished, so the grace period restarts.
+    reaper.track("thread", "thread-1")
+
+    try:
+        reaper.clock.now = 61
+        first = asyncio.run(reaper.reap())
+        reaper.clock.now = 111
+        second = asyncio.run(reaper.reap())
+    finally:
+        executor.shutdown()
+
+    assert (first, second) == (0, 1)
+    project_client.agents.delete_thread.assert_called_once_with("thread-1")
+    assert reaper.backlog == 0
+
+
+def test_reap_同時に削除する数を制限する():
+    project_client = MagicMock()
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def delete_thread(thread_id):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.02)
+        with lock:
+            running -= 1
+
+    project_client.agents.delete_thread.side_effect = delete_thread
+    reaper, executor = make_reaper(project_client, grace_period=0, concurrency=2)
+    for i in range(6):
+        reaper.track("thread", f"thread-{i}")
+
+    try:
+        reclaimed = asyncio.run(reaper.reap())
+    finally:
+        executor.shutdown()
+
+    assert reclaimed == 6
+    assert peak == 2
+
+
+def test_reap_失敗したものは再試行し存在しないものは完了とみなす():
+    project_client = MagicMock()
+    project_client.agents.delete_thread.side_effect = Exception("throttled")
+    project_client.agents.delete_file.side_effect = ResourceNotFoundError("gone")
+    reaper, executor = make_reaper(project_client, grace_period=0)
+    reaper.track("thread", "thread-1")
+    reaper.track("file", "file-1")
+
+    try:
+        first = asyncio.run(reaper.reap())
+        reaper.clock.now = 2
+        second = asyncio.run(reaper.reap())
+    finally:
+        executor.shutdown()
+
+    assert first == 1
+    assert second == 0
+    assert project_client.agents.delete_thread.call_count == 2
+    assert reaper.failed == 1
+    assert reaper.backlog == 0
+
+
+def test_close_残りを猶予期間に関係なく削除する():
+    project_client = MagicMock()
+    reaper, executor = make_reaper(project_client)
+    reaper.track("thread", "thread-1")
+
+    async def main():
+        reaper.start()
+        await reaper.close(timeout=5)
+
+    try:
+        asyncio.run(main())
+    finally:
+        executor.shutdown()
+
+    project_client.agents.delete_thread.assert_called_once_with("thread-1")
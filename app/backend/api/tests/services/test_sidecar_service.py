@@ -0,0 +1,106 @@
+import asyncio
+import json
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src')))
+
+import httpx
+import pytest
+
+from services.sidecar_service import SidecarService
+from utils.cache import TTLCache
+
+
+def make_service(handler, cache=None) -> SidecarService:
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return SidecarService(http_client=client, cache=cache)
+
+
+async def collect(service: SidecarService, prompt: str) -> list:
+    return [chunk async for chunk in service.stream_slm(prompt)]
+
+
+def test_stream_slm_NDJSONを順に返す():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(json.loads(request.content))
+        body = "\n".join([
+            json.dumps({"response": "こん", "done": False}),
+            json.dumps({"response": "にちは", "done": False}),
+            "",
+            json.dumps({"response": "", "done": True, "eval_count": 2}),
+        ])
+        return httpx.Response(200, text=body)
+
+    chunks = asyncio.run(collect(make_service(handler), "hello"))
+
+    assert [c["response"] for c in chunks] == ["こん", "にちは", ""]
+    assert chunks[-1]["done"] is True
+    assert requests[0]["stream"] is True
+    assert requests[0]["prompt"] == "hello"
+
+
+def test_stream_slm_エラー応答は例外になる():
+    service = make_service(lambda request: httpx.Response(500, text="error"))
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(collect(service, "hello"))
+
+
+def test_post_slm_同じプロンプトはキャッシュから返す():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(json.loads(request.content)["prompt"])
+        return httpx.Response(200, json={"response": "hi", "done": True})
+
+    service = make_service(handler, cache=TTLCache(maxsize=8, ttl=60))
+
+    async def main():
+        return [await service.post_slm(p) for p in ("hello", "hello", "bye")]
+
+    results = asyncio.run(main())
+
+    assert calls == ["hello", "bye"]
+    assert results[0] == results[1] == {"response": "hi", "done": True}
+    assert service.cache.hits == 1
+
+
+def test_post_slm_同時の同じプロンプトは一度だけ送る():
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={"response": "hi", "done": True})
+
+    service = make_service(handler, cache=TTLCache(maxsize=8, ttl=60))
+
+    async def main():
+        return await asyncio.gather(*(service.post_slm("hello") for _ in range(3)))
+
+    results = asyncio.run(main())
+
+    assert len(calls) == 1
+    assert all(r == {"response": "hi", "done": True} for r in results)
+    assert service.single_flight.coalesced == 2
+
+
+def test_post_slm_エラー応答はキャッシュしない():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(500, json={"error": "model not loaded"})
+
+    service = make_service(handler, cache=TTLCache(maxsize=8, ttl=60))
+
+    async def main():
+        return [await service.post_slm("hello") for _ in range(2)]
+
+    asyncio.run(main())
+
+    assert len(calls) == 2
+    assert len(service.cache) == 0
@@ -2,6 +2,7 @@ from io import BytesIO
 from pathlib import Path
 import sys
 import os
+import time
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
 
@@ -11,9 +12,11 @@ from fastapi import UploadFile, FastAPI, Depends, HTTPException
 from unittest.mock import AsyncMock, MagicMock, patch
 from startup import create_app
 from controller import upload_data
+from repositories.file_repository import FileTooLargeError
 from services.file_upload_service import FileUploadService
 from services.code_interpreter_service import CodeInterpreterService
 from services.sidecar_service import SidecarService
+from services.local_interpreter_pool import ExecutionResult
 from dependency_injector.wiring import Provide, inject
 from di.containers import Container
 
@@ -157,6 +160,23 @@ def test_post_code_interpreter_異常系(tmp_result_file: Path):
     assert response.json() == {"detail": "Failed to interpret code"}
 
 
+def test_post_code_interpreter_ファイルサイズ超過():
+    with patch.object(
+        CodeInterpreterService,
+        "process_file_and_message",
+        new_callable=AsyncMock,
+        side_effect=FileTooLargeError("too large")
+    ):
+        response = client.post(
+            "/code_interpreter",
+            files={"file": ("testfile.txt", BytesIO(b"test content"), "text/plain")},
+            data={"message": "test message"}
+        )
+
+    assert response.status_code == 413
+    assert response.json() == {"detail": "File too large"}
+
+
 def test_post_slm_正常系():
     with patch.object(SidecarService, "post_slm", return_value={"message": "test message"}):
         response = client.post(
@@ -179,30 +199,69 @@ def test_post_slm_異常系():
         assert response.json() == {"detail": "Failed to generate text"}
 
 
+def test_post_slm_stream_正常系():
+    async def fake_stream(self, prompt):
+        yield {"response": "今日は", "done": False}
+        yield {"response": "寒い", "done": False}
+        yield {"response": "", "done": True, "eval_count": 2, "eval_duration": 1_000_000_000}
+
+    with patch.object(SidecarService, "stream_slm", fake_stream):
+        response = client.post(
+            "/slm/stream",
+            json={"prompt": "今日は寒いですね。"}
+        )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [line for line in response.text.split("\n\n") if line]
+    assert events[0] == 'data: {"response": "今日は", "done": false}'
+    assert len(events) == 3
+
+
+def test_post_slm_stream_異常系():
+    async def failing_stream(self, prompt):
+        raise Exception("SLM failed")
+        yield
+
+    with patch.object(SidecarService, "stream_slm", failing_stream):
+        response = client.post(
+            "/slm/stream",
+            json={"prompt": "今日は寒いですね。"}
+        )
+
+    assert response.status_code == 500
+    assert response.json() == {"detail": "Failed to generate text"}
+
+
 def test_post_dynamic_sessions_正常系():
     file_content = b"test content"
     message = "test message"
-    # 依存先のcode_interpreter_serviceは通常の処理で返す値にしておき、DynamicSessionsServiceだけをpatch
-    with patch("services.dynamic_sessions_service.DynamicSessionsService.process_dynamic_session", return_value="dummy-session-id"):
-        # 同様に、code_interpreter_service.process_message_only をパッチしてテスト用のコードを返す
-        with patch("services.code_interpreter_service.CodeInterpreterService.process_message_only", new_callable=AsyncMock) as mock_process:
-            mock_process.return_value = "dummy-code"
-            
-            response = client.post(
-                "/dynamic_sessions",
-                files={"file": ("testfile.txt", BytesIO(file_content), "text/plain")},
-                data={"message": message}
-            )
-    
+    session = MagicMock(identifier="dummy-session-id")
+    # コード生成とセッションへのアップロードだけをpatchし、アップロードの一時保存は通常の処理で行う
+    with patch("services.dynamic_sessions_service.DynamicSessionsService.stage_remote", new_callable=AsyncMock, return_value=(session, "testfile.txt")), \
+            patch("services.dynamic_sessions_service.DynamicSessionsService.execute_staged", new_callable=AsyncMock, return_value=ExecutionResult(backend="remote", session_id="dummy-session-id")) as mock_execute, \
+            patch("services.code_interpreter_service.CodeInterpreterService.generate_code", new_callable=AsyncMock, return_value="dummy-code") as mock_generate:
+        response = client.post(
+            "/dynamic_sessions",
+            files={"file": ("testfile.txt", BytesIO(file_content), "text/plain")},
+            data={"message": message}
+        )
+
     assert response.status_code == 200
     assert response.json() == {"session_id": "dummy-session-id"}
+    stored, sent_message = mock_generate.await_args.args
+    assert sent_message == message
+    # 一時保存したファイルは処理後に削除される
+    assert not os.path.exists(stored.path)
+    mock_execute.assert_awaited_once_with(session, "testfile.txt", "dummy-code")
 
 
 def test_post_dynamic_sessions_異常系():
     file_content = b"test content"
     message = "test message"
     # 依存先のcode_interpreter_serviceは通常の処理で返す値にしておき、DynamicSessionsServiceだけをpatch
-    with patch("services.dynamic_sessions_service.DynamicSessionsService.process_dynamic_session", side_effect=Exception("Dynamic session failed")):
+    with patch("services.dynamic_sessions_service.DynamicSessionsService.stage_remote", side_effect=Exception("Dynamic session failed")), \
+            patch("services.code_interpreter_service.CodeInterpreterService.generate_code", new_callable=AsyncMock, return_value="dummy-code"):
         response = client.post(
             "/dynamic_sessions",
             files={"file": ("testfile.txt", BytesIO(file_content), "text/plain")},
@@ -210,4 +269,142 @@ def test_post_dynamic_sessions_異常系():
         )
     
     assert response.status_code == 500
-    assert response.json() == {"detail": "Failed to process dynamic session"}
\ No newline at end of file
+    assert response.json() == {"detail": "Failed to process dynamic session"}
+
+def test_post_dynamic_sessions_localバックエンド():
+    result = ExecutionResult(backend="local", stdout="ok\n", images=[("plot.png", b"png")])
+    with patch.object(app.container.local_interpreter_pool(), "enabled", True), \
+            patch("services.dynamic_sessions_service.DynamicSessionsService.run", new_callable=AsyncMock, return_value=result) as mock_run:
+        response = client.post(
+            "/dynamic_sessions",
+            files={"file": ("testfile.txt", BytesIO(b"test content"), "text/plain")},
+            data={"message": "test message", "backend": "local"}
+        )
+
+    assert response.status_code == 200
+    assert response.json()["stdout"] == "ok\n"
+    assert response.json()["images"] == [{"name": "plot.png", "content": "cG5n"}]
+    assert mock_run.await_args.kwargs["backend"] == "local"
+
+
+def test_post_dynamic_sessions_無効なlocalバックエンドは拒否する():
+    with patch("services.dynamic_sessions_service.DynamicSessionsService.run", new_callable=AsyncMock) as mock_run:
+        response = client.post(
+            "/dynamic_sessions",
+            files={"file": ("testfile.txt", BytesIO(b"test content"), "text/plain")},
+            data={"message": "test message", "backend": "local"}
+        )
+
+    assert response.status_code == 400
+    mock_run.assert_not_awaited()
+
+
+def test_post_dynamic_sessions_未対応のバックエンド():
+    response = client.post(
+        "/dynamic_sessions",
+        files={"file": ("testfile.txt", BytesIO(b"test content"), "text/plain")},
+        data={"message": "test message", "backend": "gpu"}
+    )
+
+    assert response.status_code == 400
+
+def test_jobs_code_interpreter_投入して結果を取得する(tmp_result_file: Path):
+    stored = MagicMock(path="/tmp/uploaded.csv")
+    with patch.object(CodeInterpreterService, "store_upload", new_callable=AsyncMock, return_value=stored), \
+            patch.object(CodeInterpreterService, "process_stored_file", new_callable=AsyncMock,
+                         return_value=str(tmp_result_file)), \
+            TestClient(create_app()) as job_client:
+        response = job_client.post(
+            "/jobs/code_interpreter",
+            files={"file": ("testfile.txt", BytesIO(b"test content"), "text/plain")},
+            data={"message": "test message"}
+        )
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+
+        for _ in range(100):
+            status = job_client.get(f"/jobs/{job_id}").json()
+            if status["status"] == "succeeded":
+                break
+            time.sleep(0.01)
+        result = job_client.get(f"/jobs/{job_id}/result")
+
+    assert status["status"] == "succeeded"
+    assert "queue_wait" in status["timings"]
+    assert result.status_code == 200
+    assert "result.txt" in result.headers.get("content-disposition", "")
+
+
+def test_jobs_存在しないジョブ():
+    assert client.get("/jobs/unknown").status_code == 404
+    assert client.get("/jobs/unknown/result").status_code == 404
+
+
+def test_post_code_interpreter_batch_正常系(tmp_path: Path):
+    archive_path = tmp_path / "results.zip"
+    archive_path.write_bytes(b"PK")
+
+    with patch.object(CodeInterpreterService, "process_batch", new_callable=AsyncMock,
+                      return_value=str(archive_path)) as mock_process:
+        response = client.post(
+            "/code_interpreter/batch",
+            files={"file": ("testfile.txt", BytesIO(b"test content"), "text/plain")},
+            data={"messages": ["first", "second"], "independent": "false"}
+        )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+    assert mock_process.await_args.args[1:] == (["first", "second"], False)
+    # The archive is removed once it has been sent.
+    assert not archive_path.exists()
+
+
+def test_post_code_interpreter_stream_正常系():
+    async def fake_stream(self, file, message):
+        yield "thread", {"thread_id": "thread-1"}
+        yield "delta", {"text": "グラフ"}
+        yield "done", {"status": "completed", "text": "グラフ", "images": []}
+
+    with patch.object(CodeInterpreterService, "stream_file_and_message", fake_stream):
+        response = client.post(
+            "/code_interpreter/stream",
+            files={"file": ("testfile.txt", BytesIO(b"test content"), "text/plain")},
+            data={"message": "test message"}
+        )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [line for line in response.text.split("\n\n") if line]
+    assert events[0] == 'event: thread\ndata: {"thread_id": "thread-1"}'
+    assert events[-1].startswith("event: done")
+
+
+def test_post_code_interpreter_stream_異常系():
+    async def failing_stream(self, file, message):
+        raise Exception("upload failed")
+        yield
+
+    with patch.object(CodeInterpreterService, "stream_file_and_message", failing_stream):
+        response = client.post(
+            "/code_interpreter/stream",
+            files={"file": ("testfile.txt", BytesIO(b"test content"), "text/plain")},
+            data={"message": "test message"}
+        )
+
+    assert response.status_code == 500
+    assert response.json() == {"detail": "Failed to interpret code"}
+
+
+def test_get_metrics_正常系():
+    from tracing.tracing import configure_tracing
+    from utils.timing import stage
+
+    configure_tracing("off")
+    with stage("store_upload"):
+        pass
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'stage_duration_seconds_bucket{stage="store_upload",le="+Inf"}' in response.text
@@ -0,0 +1,64 @@
+import json
+import os
+import subprocess
+import sys
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+# Generous enough for a slow CI runner; locally this takes about a second.
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "5"))
+
+MEASURE = """
+import json, time
+started = time.perf_counter()
+import main
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    status = client.get("/metrics").status_code
+    elapsed = time.perf_counter() - started
+    report = main.app.state.startup_profile.report()
+print(json.dumps({"status": status, "elapsed": elapsed, "report": report}))
+"""
+
+
+def test_import_から最初の応答までが予算内():
+    env = dict(os.environ, PROJECT_CONNECTION_STRING="localhost;sub;rg;project")
+    result = subprocess.run(
+        [sys.executable, "-c", MEASURE], cwd=SRC_DIR, env=env,
+        capture_output=True, text=True, timeout=120,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    measured = json.loads(result.stdout.strip().splitlines()[-1])
+
+    assert measured["status"] == 200
+    assert {"import", "create_app", "configure_tracing"} <= set(measured["report"]["steps"])
+    assert measured["elapsed"] < STARTUP_BUDGET_SECONDS, measured["report"]
+
+
+def test_import_だけでは接続文字列もtraceloopも読み込まない():
+    env = {k: v for k, v in os.environ.items() if k != "PROJECT_CONNECTION_STRING"}
+    check = "import main, sys; sys.exit(any(m in sys.modules for m in ('traceloop', 'azure.ai.projects')))"
+    result = subprocess.run(
+        [sys.executable, "-c", check],
+        cwd=SRC_DIR, env=env, capture_output=True, text=True, timeout=120,
+    )
+
+    assert result.returncode == 0, result.stderr[-2000:]
+
+
+def test_lifespan_localバックエンドではリモートのセッションを温めない():
+    env = dict(os.environ, PROJECT_CONNECTION_STRING="localhost;sub;rg;project",
+               DYNAMIC_SESSIONS_BACKEND="local")
+    check = (
+        "import main, sys\n"
+        "from fastapi.testclient import TestClient\n"
+        "with TestClient(main.app):\n"
+        "    started = main.app.container.dynamic_sessions_pool()._started\n"
+        "sys.exit(started)"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", check],
+        cwd=SRC_DIR, env=env, capture_output=True, text=True, timeout=120,
+    )
+
+    assert result.returncode == 0, result.stderr[-2000:]
@@ -0,0 +1,67 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src')))
+
+import pytest
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+
+from tracing.metrics import STAGE_BUCKETS, VIEWS, render_prometheus
+from tracing.tracing import configure_tracing, local_metric_reader
+from utils.timing import stage
+
+
+@pytest.fixture
+def reader():
+    reader = InMemoryMetricReader()
+    provider = MeterProvider(metric_readers=[reader], views=VIEWS)
+    meter = provider.get_meter("test")
+    yield reader, meter
+    provider.shutdown()
+
+
+def test_render_prometheus_ヒストグラムをバケット付きで出力する(reader):
+    reader, meter = reader
+    histogram = meter.create_histogram("stage.duration", unit="s")
+    histogram.record(0.003, {"stage": "create_thread"})
+    histogram.record(7.0, {"stage": "create_thread"})
+
+    text = render_prometheus(reader.get_metrics_data())
+
+    assert "# TYPE stage_duration_seconds histogram" in text
+    assert 'stage_duration_seconds_bucket{stage="create_thread",le="0.005"} 1' in text
+    assert 'stage_duration_seconds_bucket{stage="create_thread",le="10.0"} 2' in text
+    assert 'stage_duration_seconds_bucket{stage="create_thread",le="+Inf"} 2' in text
+    assert 'stage_duration_seconds_count{stage="create_thread"} 2' in text
+    assert text.count("stage_duration_seconds_bucket") == len(STAGE_BUCKETS) + 1
+
+
+def test_render_prometheus_カウンタに_totalを付ける(reader):
+    reader, meter = reader
+    counter = meter.create_counter("stage.calls")
+    counter.add(3, {"stage": "slm_generate", "outcome": "ok"})
+
+    text = render_prometheus(reader.get_metrics_data())
+
+    assert "# TYPE stage_calls_total counter" in text
+    assert 'stage_calls_total{stage="slm_generate",outcome="ok"} 3' in text
+
+
+def test_render_prometheus_データなしは空():
+    assert render_prometheus(None) == "\n"
+
+
+def test_stage_所要時間と結果を記録する():
+    configure_tracing("off")
+    with stage("test_stage_ok"):
+        pass
+    with pytest.raises(ValueError):
+        with stage("test_stage_error"):
+            raise ValueError("boom")
+
+    text = render_prometheus(local_metric_reader.get_metrics_data())
+
+    assert 'stage_duration_seconds_count{stage="test_stage_ok"} 1' in text
+    assert 'stage_calls_total{stage="test_stage_ok",outcome="ok"} 1' in text
+    assert 'stage_calls_total{stage="test_stage_error",outcome="error"} 1' in text
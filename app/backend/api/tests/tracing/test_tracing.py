@@ -0,0 +1,116 @@
+import os
+import sys
+from unittest.mock import MagicMock
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src')))
+
+import pytest
+from opentelemetry import trace
+from opentelemetry.sdk.metrics.export import MetricExportResult
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+
+from tracing.exporters import DroppingMetricExporter, DroppingSpanExporter
+from tracing.profiles import PROFILES, get_profile
+from tracing.tracing import create_tracer_provider
+
+
+class FakeExporter(SpanExporter):
+    def __init__(self, results):
+        self.results = list(results)
+        self.calls = 0
+
+    def export(self, spans):
+        self.calls += 1
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_get_profile_環境変数でプロファイルを選べる(monkeypatch):
+    monkeypatch.setenv("TRACING_PROFILE", "sampled")
+    monkeypatch.delenv("TRACING_SAMPLE_RATIO", raising=False)
+    monkeypatch.delenv("TRACING_CONSOLE", raising=False)
+
+    assert get_profile() == PROFILES["sampled"]
+
+
+def test_get_profile_サンプリング率とコンソール出力を上書きできる(monkeypatch):
+    monkeypatch.setenv("TRACING_SAMPLE_RATIO", "0.5")
+    monkeypatch.setenv("TRACING_CONSOLE", "true")
+
+    profile = get_profile("sampled")
+
+    assert profile.sample_ratio == 0.5
+    assert profile.console is True
+
+
+def test_get_profile_不明なプロファイルは例外():
+    with pytest.raises(ValueError):
+        get_profile("verbose")
+
+
+def test_create_tracer_provider_offはNoOp():
+    provider = create_tracer_provider(PROFILES["off"], Resource.create({}))
+
+    assert isinstance(provider, trace.NoOpTracerProvider)
+
+
+def test_create_tracer_provider_サンプリング率を反映する():
+    provider = create_tracer_provider(PROFILES["sampled"], Resource.create({}), endpoint="http://127.0.0.1:1")
+    try:
+        assert isinstance(provider, TracerProvider)
+        assert "TraceIdRatioBased{0.1}" in provider.sampler.get_description()
+    finally:
+        provider.shutdown()
+
+
+def test_DroppingSpanExporter_失敗後はクールダウン中のバッチを捨てる():
+    clock = FakeClock()
+    inner = FakeExporter([SpanExportResult.FAILURE, SpanExportResult.SUCCESS])
+    exporter = DroppingSpanExporter(inner, cooldown=30, clock=clock)
+
+    assert exporter.export([object()] * 2) == SpanExportResult.FAILURE
+    clock.now = 10
+    assert exporter.export([object()] * 3) == SpanExportResult.FAILURE
+    assert inner.calls == 1
+    assert exporter.dropped == 5
+
+    clock.now = 31
+    assert exporter.export([object()]) == SpanExportResult.SUCCESS
+    assert inner.calls == 2
+
+
+def test_DroppingSpanExporter_例外も失敗として扱う():
+    inner = FakeExporter([ConnectionError("refused")])
+    exporter = DroppingSpanExporter(inner, cooldown=30, clock=FakeClock())
+
+    assert exporter.export([object()]) == SpanExportResult.FAILURE
+    assert exporter.dropped == 1
+
+
+def test_DroppingMetricExporter_失敗後はクールダウン中のエクスポートを捨てる():
+    clock = FakeClock()
+    inner = MagicMock(_preferred_temporality={}, _preferred_aggregation={})
+    inner.export.side_effect = [ConnectionError("refused"), MetricExportResult.SUCCESS]
+    exporter = DroppingMetricExporter(inner, cooldown=30, clock=clock)
+
+    assert exporter.export(MagicMock()) == MetricExportResult.FAILURE
+    clock.now = 10
+    assert exporter.export(MagicMock()) == MetricExportResult.FAILURE
+    assert inner.export.call_count == 1
+    assert exporter.dropped == 2
+
+    clock.now = 31
+    assert exporter.export(MagicMock()) == MetricExportResult.SUCCESS
+    assert inner.export.call_count == 2
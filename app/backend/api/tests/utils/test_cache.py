@@ -0,0 +1,69 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src')))
+
+from utils.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_get_ヒットとミスを数える():
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.put("a", 1)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.hit_ratio == 0.5
+
+
+def test_put_最も古く使われたエントリを追い出す():
+    evicted = []
+    cache = TTLCache(maxsize=2, ttl=10, on_evict=lambda k, v: evicted.append((k, v)))
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert evicted == [("b", 2)]
+    assert "a" in cache and "c" in cache
+    assert cache.evictions == 1
+
+
+def test_get_期限切れのエントリは追い出される():
+    clock = FakeClock()
+    evicted = []
+    cache = TTLCache(maxsize=2, ttl=10, on_evict=lambda k, v: evicted.append(k), clock=clock)
+    cache.put("a", 1)
+    clock.now = 11
+
+    assert cache.get("a") is None
+    assert evicted == ["a"]
+
+
+def test_purge_expired_期限切れのみ削除する():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=3, ttl=10, clock=clock)
+    cache.put("a", 1)
+    clock.now = 5
+    cache.put("b", 2)
+    clock.now = 12
+
+    assert cache.purge_expired() == 1
+    assert "a" not in cache and "b" in cache
+
+
+def test_pop_は追い出し通知をしない():
+    evicted = []
+    cache = TTLCache(maxsize=2, ttl=10, on_evict=lambda k, v: evicted.append(k))
+    cache.put("a", 1)
+
+    assert cache.pop("a") == 1
+    assert evicted == []
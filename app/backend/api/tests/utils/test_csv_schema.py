@@ -0,0 +1,30 @@
+import os
+import sys
+from io import BytesIO
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src')))
+
+from utils.csv_schema import csv_schema_fingerprint, read_csv_schema
+
+
+def test_read_csv_schema_列名と型を返す():
+    file = BytesIO("﻿Name,Sales,Margin,Note\nA,1057,1.5,\nB,2,3,x\n".encode("utf-8"))
+
+    columns = read_csv_schema(file, "data.csv")
+
+    assert columns == [("Name", "str"), ("Sales", "int"), ("Margin", "float"), ("Note", "str")]
+    assert file.tell() == 0
+
+
+def test_read_csv_schema_CSV以外はNone():
+    assert read_csv_schema(BytesIO(b"a,b\n1,2\n"), "data.xlsx") is None
+    assert read_csv_schema(BytesIO(b""), "empty.csv") is None
+
+
+def test_csv_schema_fingerprint_値が違っても同じ列なら一致する():
+    q1 = BytesIO(b"Company,Revenue\nA,100\nB,200\n")
+    q2 = BytesIO(b"Company,Revenue\nC,300\n")
+    renamed = BytesIO(b"Company,Income\nC,300\n")
+
+    assert csv_schema_fingerprint(q1, "q1.csv") == csv_schema_fingerprint(q2, "uploads/q2.csv")
+    assert csv_schema_fingerprint(q1, "q1.csv") != csv_schema_fingerprint(renamed, "q2.csv")
@@ -0,0 +1,80 @@
+import os
+import sys
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src')))
+
+from utils.disk_cache import DiskCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def write(path: Path, size: int) -> str:
+    path.write_bytes(b"x" * size)
+    return str(path)
+
+
+def test_put_ファイルをキャッシュに移動する(tmp_path: Path):
+    cache = DiskCache(tmp_path / "cache", max_bytes=100, max_entries=10, ttl_seconds=60)
+    source = write(tmp_path / "image.png", 10)
+
+    cached = cache.put("key1", source, ".png")
+
+    assert not os.path.exists(source)
+    assert cache.get("key1") == cached
+    assert Path(cached).read_bytes() == b"x" * 10
+    assert cache.stats()["size_bytes"] == 10
+
+
+def test_put_容量を超えたら古いものから追い出す(tmp_path: Path):
+    cache = DiskCache(tmp_path / "cache", max_bytes=25, max_entries=10, ttl_seconds=60)
+    first = cache.put("key1", write(tmp_path / "1.png", 10))
+    cache.put("key2", write(tmp_path / "2.png", 10))
+    cache.get("key1")
+    cache.put("key3", write(tmp_path / "3.png", 10))
+
+    assert cache.get("key2") is None
+    assert cache.get("key1") == first
+    assert cache.evictions == 1
+    assert cache.size_bytes == 20
+
+
+def test_get_期限切れは削除される(tmp_path: Path):
+    clock = FakeClock()
+    cache = DiskCache(tmp_path / "cache", max_bytes=100, max_entries=10, ttl_seconds=60, clock=clock)
+    cached = cache.put("key1", write(tmp_path / "1.png", 10))
+    clock.now += 61
+
+    assert cache.get("key1") is None
+    assert not os.path.exists(cached)
+    assert cache.stats()["misses"] == 1
+
+
+def test_init_既存のエントリを読み込む(tmp_path: Path):
+    cache = DiskCache(tmp_path / "cache", max_bytes=100, max_entries=10, ttl_seconds=60)
+    cached = cache.put("key1", write(tmp_path / "1.png", 10), ".png")
+
+    reloaded = DiskCache(tmp_path / "cache", max_bytes=100, max_entries=10, ttl_seconds=60)
+
+    assert reloaded.get("key1") == cached
+    assert reloaded.size_bytes == 10
+
+
+def test_link_追い出された後もリンク先は残る(tmp_path: Path):
+    cache = DiskCache(tmp_path / "cache", max_bytes=15, max_entries=10, ttl_seconds=60)
+    cache.put("key1", write(tmp_path / "1.png", 10), ".png")
+    destination = tmp_path / "pinned.png"
+
+    assert cache.link("key1", str(destination))
+    cache.put("key2", write(tmp_path / "2.png", 10), ".png")
+
+    assert cache.get("key1") is None
+    assert destination.read_bytes() == b"x" * 10
+    assert not cache.link("key1", str(tmp_path / "missing.png"))
+    assert not (tmp_path / "missing.png").exists()
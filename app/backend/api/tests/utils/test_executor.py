@@ -0,0 +1,54 @@
+import asyncio
+import os
+import sys
+import threading
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src')))
+
+import pytest
+
+from utils.executor import BlockingExecutor
+
+
+def test_run_別スレッドで実行される():
+    executor = BlockingExecutor(max_workers=2)
+
+    async def main():
+        return await executor.run(lambda: threading.current_thread().name)
+
+    try:
+        thread_name = asyncio.run(main())
+    finally:
+        executor.shutdown()
+
+    assert thread_name.startswith("blocking-sdk")
+    assert thread_name != threading.current_thread().name
+
+
+def test_run_並行に実行される():
+    executor = BlockingExecutor(max_workers=4)
+    barrier = threading.Barrier(4, timeout=5)
+
+    async def main():
+        # 4 calls can only pass the barrier if they run at the same time.
+        return await asyncio.gather(*(executor.run(barrier.wait) for _ in range(4)))
+
+    try:
+        results = asyncio.run(main())
+    finally:
+        executor.shutdown()
+
+    assert sorted(results) == [0, 1, 2, 3]
+
+
+def test_run_例外が伝播する():
+    executor = BlockingExecutor(max_workers=1)
+
+    def fail():
+        raise ValueError("boom")
+
+    try:
+        with pytest.raises(ValueError):
+            asyncio.run(executor.run(fail))
+    finally:
+        executor.shutdown()
@@ -0,0 +1,56 @@
+import os
+import sys
+import tempfile
+from io import BytesIO
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src')))
+
+from utils.file_copy import copy_upload
+
+
+def test_copy_upload_実ファイル同士はカーネル内でコピーする(tmp_path: Path):
+    content = os.urandom(300_000)
+    source_path = tmp_path / "source.bin"
+    source_path.write_bytes(content)
+
+    with open(source_path, "rb") as source, open(tmp_path / "target.bin", "wb") as target:
+        source.read(100)
+        size, method = copy_upload(source, target, chunk_size=64 * 1024)
+
+    assert method in ("copy_file_range", "sendfile")
+    assert size == len(content) - 100
+    assert (tmp_path / "target.bin").read_bytes() == content[100:]
+
+
+def test_copy_upload_ディスクに退避済みのスプールファイル(tmp_path: Path):
+    content = os.urandom(10_000)
+    source = tempfile.SpooledTemporaryFile(max_size=1024)
+    source.write(content)
+    source.seek(0)
+
+    with open(tmp_path / "target.bin", "wb") as target:
+        size, method = copy_upload(source, target)
+
+    assert method != "copyfileobj"
+    assert (tmp_path / "target.bin").read_bytes() == content
+
+
+def test_copy_upload_メモリ上のデータはチャンクコピーする(tmp_path: Path):
+    source = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    source.write(b"small")
+    source.seek(0)
+
+    with open(tmp_path / "target.bin", "wb") as target:
+        size, method = copy_upload(source, target)
+
+    assert (size, method) == (5, "copyfileobj")
+    assert not source._rolled
+    assert (tmp_path / "target.bin").read_bytes() == b"small"
+
+
+def test_copy_upload_BytesIOはチャンクコピーする(tmp_path: Path):
+    with open(tmp_path / "target.bin", "wb") as target:
+        size, method = copy_upload(BytesIO(b"test content"), target)
+
+    assert (size, method) == (12, "copyfileobj")
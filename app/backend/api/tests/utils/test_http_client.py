@@ -0,0 +1,64 @@
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src')))
+
+import httpx
+
+from utils.http_client import HttpClientManager, borrow_client
+
+
+def test_get_同じ名前なら同じクライアントを返す():
+    manager = HttpClientManager(connect_timeout=1, read_timeout=2, max_connections_per_host=3)
+
+    sidecar = manager.get("sidecar")
+
+    assert manager.get("sidecar") is sidecar
+    assert manager.get("dynamic_sessions") is not sidecar
+    assert sidecar.timeout == httpx.Timeout(2, connect=1)
+    asyncio.run(manager.aclose())
+    assert sidecar.is_closed
+
+
+def test_get_上流ごとに読み込みタイムアウトを変えられる():
+    manager = HttpClientManager(connect_timeout=1, read_timeout=2)
+
+    client = manager.get("sidecar", read_timeout=300)
+
+    assert client.timeout.read == 300
+    assert client.timeout.connect == 1
+
+
+def test_init_h2が無ければHTTP1にフォールバックする(monkeypatch):
+    monkeypatch.setattr("utils.http_client.importlib.util.find_spec", lambda name: None)
+
+    manager = HttpClientManager(http2=True)
+
+    assert manager.http2 is False
+
+
+def test_borrow_client_共有クライアントは閉じない():
+    client = httpx.AsyncClient()
+
+    async def main():
+        async with borrow_client(client) as borrowed:
+            assert borrowed is client
+        async with borrow_client(None) as transient:
+            assert transient is not client
+        return transient
+
+    transient = asyncio.run(main())
+    assert not client.is_closed
+    assert transient.is_closed
+
+
+def test_borrow_client_一時クライアントにもタイムアウトを設定する(monkeypatch):
+    monkeypatch.setenv("HTTP_CONNECT_TIMEOUT", "1")
+    monkeypatch.setenv("HTTP_READ_TIMEOUT", "2")
+
+    async def main():
+        async with borrow_client(None) as transient:
+            return transient.timeout
+
+    assert asyncio.run(main()) == httpx.Timeout(2, connect=1)
@@ -0,0 +1,39 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src')))
+
+from utils.startup_profile import StartupProfile
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_step_各ステップの所要時間を記録する():
+    clock = FakeClock()
+    profile = StartupProfile(clock=clock)
+
+    with profile.step("create_app"):
+        clock.now += 0.5
+    profile.record("import", 1.0)
+
+    assert profile.report() == {"steps": {"create_app": 0.5, "import": 1.0}, "total": 1.5}
+
+
+def test_step_例外でも記録する():
+    clock = FakeClock()
+    profile = StartupProfile(clock=clock)
+
+    try:
+        with profile.step("configure_tracing"):
+            clock.now += 0.25
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+
+    assert profile.steps == {"configure_tracing": 0.25}
@@ -0,0 +1,110 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src')))
+
+from utils.temp_storage import TempStorage
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def write(path: str, size: int = 1) -> str:
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    return path
+
+
+def age(path: str, seconds: float, clock: FakeClock):
+    os.utime(path, (clock.now - seconds, clock.now - seconds))
+
+
+def make_storage(tmp_path, **kwargs) -> TempStorage:
+    options = {"max_age": 60, "max_bytes": 1024, "sweep_budget": 100, "clock": FakeClock()}
+    options.update(kwargs)
+    return TempStorage(str(tmp_path), **options)
+
+
+def test_allocate_同じファイル名でも衝突しない(tmp_path):
+    storage = make_storage(tmp_path)
+
+    first = storage.allocate("data.csv")
+    second = storage.allocate("../../etc/data.csv")
+
+    assert first != second
+    assert os.path.basename(first) == os.path.basename(second) == "data.csv"
+    assert all(p.startswith(str(tmp_path)) for p in (first, second))
+    assert storage.is_leased(first)
+
+
+def test_sweep_古くて使われていないファイルだけを削除する(tmp_path):
+    storage = make_storage(tmp_path)
+    clock = storage.clock
+    leased = write(storage.allocate("leased.csv"))
+    released = write(storage.allocate("released.csv"))
+    fresh = write(storage.allocate("fresh.csv"))
+    orphan = write(os.path.join(tmp_path, "orphan.csv"))
+    storage.release(released)
+    storage.release(fresh)
+    for path in (leased, released, orphan):
+        age(path, 120, clock)
+
+    removed = storage.sweep()
+
+    assert removed == 2
+    assert os.path.exists(leased) and os.path.exists(fresh)
+    assert not os.path.exists(released) and not os.path.exists(orphan)
+    # The emptied per-request directory is removed as well.
+    assert not os.path.exists(os.path.dirname(released))
+
+
+def test_sweep_一回の走査量を制限し次回に続きから再開する(tmp_path):
+    storage = make_storage(tmp_path, sweep_budget=3)
+    for i in range(6):
+        age(write(os.path.join(tmp_path, f"old-{i}.csv")), 120, storage.clock)
+
+    first = storage.sweep()
+    second = storage.sweep()
+
+    assert first == 3
+    assert second == 3
+    assert os.listdir(tmp_path) == []
+
+
+def test_record_容量を超えたら使われていない古いファイルから削除する(tmp_path):
+    storage = make_storage(tmp_path, max_bytes=12)
+    clock = storage.clock
+    paths = []
+    for name in ("a", "b", "c"):
+        path = write(storage.allocate(name), 4)
+        storage.record(path, 4)
+        storage.release(path)
+        clock.now += 1
+        paths.append(path)
+    # Using "a" again makes "b" the least recently used file.
+    storage.acquire(paths[0])
+    storage.release(paths[0])
+
+    path = write(storage.allocate("d"), 4)
+    storage.record(path, 4)
+
+    assert [os.path.exists(p) for p in paths] == [True, False, True]
+    assert storage.size_bytes == 12
+    assert storage.evicted == 1
+
+
+def test_delete_リースに関係なく削除する(tmp_path):
+    storage = make_storage(tmp_path)
+    path = write(storage.allocate("data.csv"), 8)
+    storage.record(path, 8)
+
+    storage.delete(path)
+
+    assert not os.path.exists(path)
+    assert not storage.is_leased(path)
+    assert storage.size_bytes == 0
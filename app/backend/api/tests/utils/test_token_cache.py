@@ -0,0 +1,125 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from unittest.mock import MagicMock
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src')))
+
+from utils.token_cache import AccessTokenCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeCredential:
+    def __init__(self, clock: FakeClock, lifetime: float = 3600):
+        self.clock = clock
+        self.lifetime = lifetime
+        self.calls = 0
+        self.refreshed = threading.Event()
+
+    def get_token(self, scope):
+        self.calls += 1
+        if self.calls > 1:
+            self.refreshed.set()
+        return MagicMock(token=f"token-{self.calls}", expires_on=self.clock() + self.lifetime)
+
+
+def test_get_token_スコープごとにキャッシュする():
+    clock = FakeClock()
+    credential = FakeCredential(clock)
+    cache = AccessTokenCache(credential=credential, refresh_margin=300, clock=clock)
+
+    try:
+        assert cache.get_token("scope-a") == "token-1"
+        assert cache.get_token("scope-a") == "token-1"
+        assert cache.get_token("scope-b") == "token-2"
+    finally:
+        cache.close()
+
+    assert credential.calls == 2
+
+
+def test_get_token_期限前にバックグラウンドで更新する():
+    clock = FakeClock()
+    credential = FakeCredential(clock, lifetime=0.2)
+    cache = AccessTokenCache(credential=credential, refresh_margin=300, clock=clock)
+
+    try:
+        assert cache.get_token("scope") == "token-1"
+        # The 0.2s token is refreshed halfway through its lifetime.
+        assert credential.refreshed.wait(timeout=5)
+        assert cache.get_token("scope") == "token-2"
+    finally:
+        cache.close()
+
+
+def test_get_token_更新失敗時は期限まででリトライをやめる():
+    credential = FakeCredential(time.time, lifetime=1)
+    failures = []
+    fetch = credential.get_token
+
+    def get_token(scope):
+        if credential.calls:
+            failures.append(time.time())
+            raise RuntimeError("unavailable")
+        return fetch(scope)
+
+    credential.get_token = get_token
+    cache = AccessTokenCache(credential=credential, refresh_margin=300, retry_interval=0.1)
+
+    try:
+        assert cache.get_token("scope") == "token-1"
+        time.sleep(2)
+        # Refresh at 0.5s, retries after 0.1s and 0.2s; a 0.4s backoff
+        # would end after the token expires, so retrying stops there.
+        assert len(failures) == 3
+        assert failures[2] - failures[1] > failures[1] - failures[0]
+        assert cache._timers == {}
+    finally:
+        cache.close()
+
+
+def test_get_token_期限切れなら同期的に取得する():
+    clock = FakeClock()
+    credential = FakeCredential(clock, lifetime=3600)
+    cache = AccessTokenCache(credential=credential, refresh_margin=300, clock=clock)
+
+    try:
+        cache.get_token("scope")
+        cache.close()  # stop the background refresh
+        clock.now += 3601
+        assert cache.get_token("scope") == "token-2"
+    finally:
+        cache.close()
+
+
+def test_get_token_async_キャッシュ済みならスレッドを使わない():
+    clock = FakeClock()
+    credential = FakeCredential(clock)
+    cache = AccessTokenCache(credential=credential, clock=clock)
+
+    try:
+        assert asyncio.run(cache.get_token_async("scope")) == "token-1"
+        assert asyncio.run(cache.get_token_async("scope")) == "token-1"
+    finally:
+        cache.close()
+
+    assert credential.calls == 1
+
+
+def test_credential_初回利用時に作成する():
+    factory = MagicMock()
+    cache = AccessTokenCache(credential_factory=factory)
+
+    factory.assert_not_called()
+    assert cache.credential is factory.return_value
+    assert cache.credential is factory.return_value
+    factory.assert_called_once()